@@ -1,34 +1,111 @@
-import json
 import argparse
 import random
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, Set
+from typing import Dict, Any, Set, Tuple, Optional, List
 from functools import reduce
 
+from instrumentation import phase, add_instrumentation_args, instrumented
+from snapshots import cached, decode_json, snapshot_path
+
+class LatencyHistogram:
+    """A thread-safe histogram of call latencies in power-of-two nanosecond buckets."""
+
+    def __init__(self):
+        # buckets[k] counts calls that took [2^(k-1), 2^k) nanoseconds.
+        self.buckets: List[int] = [0] * 64
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ns: int):
+        with self._lock:
+            self.buckets[min(elapsed_ns.bit_length(), 63)] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {f"<{1 << k}": count for k, count in enumerate(self.buckets) if count}
+
+class AffinityCache:
+    """
+    A bounded LRU cache for affinity scores keyed on a sorted tuple of character IDs,
+    with hit/miss/eviction counters. Safe to share between threads.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, ...], int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, ...]) -> Optional[int]:
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def put(self, key: Tuple[int, ...], score: int):
+        with self._lock:
+            self._entries[key] = score
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
 class AffinityCalculator:
     """Calculates Uma Musume affinity using the strict 'Relationship Group' method."""
 
-    def __init__(self, data_path: Path):
+    def __init__(self, data_path: Path, cache_size: int = 0, use_snapshots: bool = False):
         if not data_path.exists():
             raise FileNotFoundError(
                 f"Data file not found: {data_path}. "
                 "Please run 'scripts/prepare_raw_affinity_components.py' first."
             )
         print(f"Loading data from {data_path}...")
-        with open(data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            self.relation_points: Dict[int, int] = {
-                int(k): v for k, v in data.get("relation_points", {}).items()
-            }
-            self.chara_relations: Dict[int, Set[int]] = {
-                int(k): set(v) for k, v in data.get("chara_relations", {}).items()
-            }
-            self.chara_map: Dict[int, str] = {
-                int(k): v for k, v in data.get("chara_map", {}).items()
-            }
+        # With use_snapshots the int-keyed tables are snapshotted as-is next to the data
+        # file, so warm starts skip both the JSON parse and the conversion below. It is
+        # off by default so that library callers never write into the data directory.
+        self.relation_points: Dict[int, int]
+        self.chara_relations: Dict[int, Set[int]]
+        self.chara_map: Dict[int, str]
+        self.relation_points, self.chara_relations, self.chara_map = cached(
+            snapshot_path(data_path.parent, data_path.stem), [data_path],
+            lambda: self._build_tables(data_path), use_snapshots,
+        )
         print("Data loaded successfully.")
+        # Memoization is opt-in; a cache_size of 0 keeps the original uncached behavior.
+        self.cache: Optional[AffinityCache] = AffinityCache(cache_size) if cache_size > 0 else None
+        # Recorded with and without the cache, so the two configurations can be compared.
+        self.latency = LatencyHistogram()
 
-    def _calculate_affinity_score(self, *char_ids: int) -> int:
+    @staticmethod
+    def _build_tables(data_path: Path):
+        with phase('load', file=data_path.name):
+            data = decode_json(data_path.read_bytes())
+        with phase('index build'):
+            relation_points = {int(k): v for k, v in data.get("relation_points", {}).items()}
+            chara_relations = {int(k): set(v) for k, v in data.get("chara_relations", {}).items()}
+            chara_map = {int(k): v for k, v in data.get("chara_map", {}).items()}
+        return relation_points, chara_relations, chara_map
+
+    def score(self, *char_ids: int) -> int:
         """
         Calculates the affinity score for a group of characters by finding the
         intersection of their relationship groups and summing the points.
@@ -41,6 +118,21 @@ class AffinityCalculator:
         if len(valid_ids) != len(set(valid_ids)):
             return 0
 
+        start = time.perf_counter_ns()
+        if self.cache is None:
+            score = self._score_valid_ids(valid_ids)
+        else:
+            # The score only depends on which characters are involved, not their order.
+            key = tuple(sorted(valid_ids))
+            score = self.cache.get(key)
+            if score is None:
+                score = self._score_valid_ids(valid_ids)
+                self.cache.put(key, score)
+        self.latency.record(time.perf_counter_ns() - start)
+        return score
+
+    def _score_valid_ids(self, valid_ids: List[int]) -> int:
+        """Scores a list of distinct, known character IDs."""
         # Get the relationship group sets for all valid characters
         relation_sets = [self.chara_relations[cid] for cid in valid_ids]
 
@@ -56,15 +148,15 @@ class AffinityCalculator:
         Calculates the total affinity score using strict 3-way calculation for grandparents.
         """
         # --- 2-Way Affinities ---
-        trainee_p1_score = self._calculate_affinity_score(trainee_id, p1_id)
-        trainee_p2_score = self._calculate_affinity_score(trainee_id, p2_id)
-        cross_parent_score = self._calculate_affinity_score(p1_id, p2_id)
+        trainee_p1_score = self.score(trainee_id, p1_id)
+        trainee_p2_score = self.score(trainee_id, p2_id)
+        cross_parent_score = self.score(p1_id, p2_id)
 
         # --- 3-Way Grandparent Affinities ---
-        p1_gp1_score = self._calculate_affinity_score(trainee_id, p1_id, p1_gp1_id)
-        p1_gp2_score = self._calculate_affinity_score(trainee_id, p1_id, p1_gp2_id)
-        p2_gp1_score = self._calculate_affinity_score(trainee_id, p2_id, p2_gp1_id)
-        p2_gp2_score = self._calculate_affinity_score(trainee_id, p2_id, p2_gp2_id)
+        p1_gp1_score = self.score(trainee_id, p1_id, p1_gp1_id)
+        p1_gp2_score = self.score(trainee_id, p1_id, p1_gp2_id)
+        p2_gp1_score = self.score(trainee_id, p2_id, p2_gp1_id)
+        p2_gp2_score = self.score(trainee_id, p2_id, p2_gp2_id)
 
         # --- Totals ---
         p1_slot_total = trainee_p1_score + p1_gp1_score + p1_gp2_score
@@ -95,6 +187,32 @@ class AffinityCalculator:
         }
         return breakdown
 
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Returns the scoring latency histogram, plus the cache counters when memoization
+        is enabled ('cache' is None otherwise).
+        """
+        return {
+            'cache': self.cache.stats() if self.cache else None,
+            'latency_ns': self.latency.stats(),
+        }
+
+def print_cache_stats(stats: Dict[str, Any]):
+    """Prints the memoization counters and latency histogram."""
+    print("\n--- Affinity Cache Stats ---")
+    cache = stats['cache']
+    if cache is None:
+        print("Caching is disabled (use --cache-size to enable it).")
+    else:
+        print(f"Entries:   {cache['size']} / {cache['max_size']}")
+        print(f"Hits:      {cache['hits']}")
+        print(f"Misses:    {cache['misses']}")
+        print(f"Evictions: {cache['evictions']}")
+        print(f"Hit rate:  {cache['hit_rate']:.1%}")
+    print("Latency histogram (ns):")
+    for bucket, count in stats['latency_ns'].items():
+        print(f"  {bucket:>10}: {count}")
+
 def print_affinity_tree(result: Dict[str, Any]):
     """Prints the affinity breakdown in a formatted tree."""
     scores = result['scores']
@@ -136,45 +254,55 @@ def main():
     parser.add_argument("--p2_gp1", type=int, default=0, help="Parent 2's first grandparent.")
     parser.add_argument("--p2_gp2", type=int, default=0, help="Parent 2's second grandparent.")
     parser.add_argument("--random", action="store_true", help="Generate a random set of 7 characters for the calculation.")
+    parser.add_argument("--cache-size", type=int, default=0, help="Memoize up to this many affinity scores (0 disables caching).")
+    parser.add_argument("--stats", action="store_true", help="Print cache hit/miss/eviction counters and latency histogram.")
+    parser.add_argument("--no-snapshots", action="store_true", help="Always parse the data file instead of using a cached snapshot.")
+    add_instrumentation_args(parser)
 
     args = parser.parse_args()
     
     if not args.random and (args.trainee_id == 0 or args.p1_id == 0 or args.p2_id == 0):
         parser.error("trainee_id, p1_id, and p2_id are required when not using --random")
 
-    try:
-        calculator = AffinityCalculator(args.data_path)
+    with instrumented(args, 'affinity_calculator'):
+        try:
+            calculator = AffinityCalculator(args.data_path, cache_size=args.cache_size, use_snapshots=not args.no_snapshots)
 
-        if args.random:
-            print("\n--- Generating Random Combination ---")
-            all_ids = list(calculator.chara_map.keys())
-            if len(all_ids) < 7:
-                raise ValueError("Not enough characters in the data source to select 7 unique ones.")
+            if args.random:
+                print("\n--- Generating Random Combination ---")
+                all_ids = list(calculator.chara_map.keys())
+                if len(all_ids) < 7:
+                    raise ValueError("Not enough characters in the data source to select 7 unique ones.")
             
-            random_ids = random.sample(all_ids, 7)
-            args.trainee_id, args.p1_id, args.p2_id, args.p1_gp1, args.p1_gp2, args.p2_gp1, args.p2_gp2 = random_ids
-
-            print(f"Trainee : {calculator.chara_map.get(args.trainee_id)} ({args.trainee_id})")
-            print(f"Parent 1: {calculator.chara_map.get(args.p1_id)} ({args.p1_id})")
-            print(f"  GP 1.1: {calculator.chara_map.get(args.p1_gp1)} ({args.p1_gp1})")
-            print(f"  GP 1.2: {calculator.chara_map.get(args.p1_gp2)} ({args.p1_gp2})")
-            print(f"Parent 2: {calculator.chara_map.get(args.p2_id)} ({args.p2_id})")
-            print(f"  GP 2.1: {calculator.chara_map.get(args.p2_gp1)} ({args.p2_gp1})")
-            print(f"  GP 2.2: {calculator.chara_map.get(args.p2_gp2)} ({args.p2_gp2})")
+                random_ids = random.sample(all_ids, 7)
+                args.trainee_id, args.p1_id, args.p2_id, args.p1_gp1, args.p1_gp2, args.p2_gp1, args.p2_gp2 = random_ids
+
+                print(f"Trainee : {calculator.chara_map.get(args.trainee_id)} ({args.trainee_id})")
+                print(f"Parent 1: {calculator.chara_map.get(args.p1_id)} ({args.p1_id})")
+                print(f"  GP 1.1: {calculator.chara_map.get(args.p1_gp1)} ({args.p1_gp1})")
+                print(f"  GP 1.2: {calculator.chara_map.get(args.p1_gp2)} ({args.p1_gp2})")
+                print(f"Parent 2: {calculator.chara_map.get(args.p2_id)} ({args.p2_id})")
+                print(f"  GP 2.1: {calculator.chara_map.get(args.p2_gp1)} ({args.p2_gp1})")
+                print(f"  GP 2.2: {calculator.chara_map.get(args.p2_gp2)} ({args.p2_gp2})")
         
-        result = calculator.calculate_total_affinity(
-            args.trainee_id, args.p1_id, args.p1_gp1, args.p1_gp2,
-            args.p2_id, args.p2_gp1, args.p2_gp2
-        )
+            with phase('query'):
+                result = calculator.calculate_total_affinity(
+                    args.trainee_id, args.p1_id, args.p1_gp1, args.p1_gp2,
+                    args.p2_id, args.p2_gp1, args.p2_gp2
+                )
         
-        print_affinity_tree(result)
+            with phase('output'):
+                print_affinity_tree(result)
+
+                print("\nNote: This score does not include bonuses from mutual G1 race wins.")
 
-        print("\nNote: This score does not include bonuses from mutual G1 race wins.")
+            if args.stats:
+                print_cache_stats(calculator.cache_stats())
 
-    except FileNotFoundError as e:
-        print(f"Error: {e}")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,275 @@
+import argparse
+import time
+from array import array
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Any, Collection, Iterator, List, Optional, Set, Tuple
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+from affinity_calculator import AffinityCalculator
+from snapshots import cached, snapshot_path
+
+# --- Constants ---
+# Bump when the persisted layout changes so stale snapshots are rebuilt.
+INDEX_FORMAT = 1
+DEFAULT_K = 10
+
+# --- Score Tables ---
+
+def score_tables(relation_points: Dict[int, int], chara_relations: Dict[int, Set[int]]) -> Tuple[List[int], array, array]:
+    """
+    Scores every pair and triple in one pass, returning (sorted chara_ids, pair, triple)
+    where pair[a * n + b] and triple[(a * n + b) * n + c] are indexed by position in
+    chara_ids. Repeated characters score 0, as in AffinityCalculator.
+
+    Each character's groups become a bitmask with groups of equal points in contiguous
+    bits, so a score is a handful of ANDs and popcounts instead of a set intersection.
+    """
+    chara_ids = sorted(chara_relations)
+    n = len(chara_ids)
+    with phase('index build', step='bitmasks'):
+        by_points: Dict[int, List[int]] = {}
+        for group in sorted({g for groups in chara_relations.values() for g in groups}):
+            by_points.setdefault(relation_points.get(group, 0), []).append(group)
+        bit_of, classes = {}, []
+        for points, groups in by_points.items():
+            first = len(bit_of)
+            bit_of.update((group, first + i) for i, group in enumerate(groups))
+            if points:
+                classes.append((points, ((1 << len(groups)) - 1) << first))
+        masks = [sum(1 << bit_of[g] for g in chara_relations[cid]) for cid in chara_ids]
+
+    def score(mask: int) -> int:
+        return sum(points * (mask & class_mask).bit_count() for points, class_mask in classes)
+
+    with phase('index build', step='scores'):
+        pair = array('i', bytes(4 * n * n))
+        triple = array('i', bytes(4 * n * n * n))
+        for t in range(n):
+            for p in range(t + 1, n):
+                shared = masks[t] & masks[p]
+                if not shared:
+                    continue
+                pair[t * n + p] = pair[p * n + t] = score(shared)
+                for g in range(p + 1, n):
+                    s = score(shared & masks[g])
+                    if s:
+                        # A triple's score doesn't depend on the order of its members.
+                        for a, b, c in ((t, p, g), (t, g, p), (p, t, g), (p, g, t), (g, t, p), (g, p, t)):
+                            triple[(a * n + b) * n + c] = s
+    return chara_ids, pair, triple
+
+# --- Index ---
+
+class AffinityIndex:
+    """
+    Precomputed neighbor lists over `chara_relations`, for questions like "who should I
+    farm as a parent for this trainee" without scoring every combination.
+
+    Characters are addressed by their position in the sorted `chara_ids`. Every list is
+    ordered by descending score, then ascending character ID:
+      partners      row t:             the other n - 1 characters by 2-way score with t
+      grandparents  row t * n + p:     the other n - 2 characters by 3-way score with t and p
+      slots         row t:             parents by best slot total (2-way + two best 3-way)
+    Rows with t == p are unused. Scores are stored alongside in parallel arrays.
+    """
+
+    def __init__(self, chara_ids: List[int], partner_order: array, partner_scores: array,
+                 gp_order: array, gp_scores: array, slot_order: array, slot_scores: array):
+        self.chara_ids = chara_ids
+        self.position = {chara_id: i for i, chara_id in enumerate(chara_ids)}
+        self.partner_order = partner_order
+        self.partner_scores = partner_scores
+        self.gp_order = gp_order
+        self.gp_scores = gp_scores
+        self.slot_order = slot_order
+        self.slot_scores = slot_scores
+
+    # --- Building ---
+
+    @classmethod
+    def build(cls, relation_points: Dict[int, int], chara_relations: Dict[int, Set[int]]) -> 'AffinityIndex':
+        chara_ids, pair, triple = score_tables(relation_points, chara_relations)
+        n = len(chara_ids)
+        with phase('index build', step='sort'):
+            partner_order, partner_scores = array('H'), array('i')
+            gp_order, gp_scores = array('H'), array('i')
+            slot_order, slot_scores = array('H'), array('i')
+            for t in range(n):
+                partners = sorted((i for i in range(n) if i != t), key=lambda i: -pair[t * n + i])
+                partner_order.extend(partners)
+                partner_scores.extend(pair[t * n + i] for i in partners)
+                slot_totals = []
+                for p in range(n):
+                    base = (t * n + p) * n
+                    if p == t:
+                        gp_order.extend([0] * (n - 2))
+                        gp_scores.extend([0] * (n - 2))
+                        continue
+                    # Python's sort is stable and candidates start in ID order, so ties stay ID-ordered.
+                    grandparents = sorted((g for g in range(n) if g != t and g != p), key=lambda g: -triple[base + g])
+                    gp_order.extend(grandparents)
+                    gp_scores.extend(triple[base + g] for g in grandparents)
+                    slot_totals.append((p, pair[t * n + p] + sum(triple[base + g] for g in grandparents[:2])))
+                slot_totals.sort(key=lambda item: -item[1])
+                slot_order.extend(p for p, _ in slot_totals)
+                slot_scores.extend(total for _, total in slot_totals)
+        return cls(chara_ids, partner_order, partner_scores, gp_order, gp_scores, slot_order, slot_scores)
+
+    @classmethod
+    def for_calculator(cls, calculator: AffinityCalculator) -> 'AffinityIndex':
+        return cls.build(calculator.relation_points, calculator.chara_relations)
+
+    @classmethod
+    def load(cls, data_path: Path, calculator: Optional[AffinityCalculator] = None,
+             use_snapshots: bool = False) -> 'AffinityIndex':
+        """
+        Returns the index for an affinity_*.json file. With use_snapshots it is read from
+        a snapshot next to the file while the file is unchanged; like AffinityCalculator,
+        that is opt-in so library callers never write into the data directory. Pass the
+        file's calculator, if one is loaded, to build from its tables.
+        """
+        def build():
+            tables = ((calculator.relation_points, calculator.chara_relations) if calculator
+                      else AffinityCalculator._build_tables(data_path)[:2])
+            return cls.build(*tables).to_state()
+
+        state = cached(snapshot_path(data_path.parent, f"{data_path.stem}.index{INDEX_FORMAT}"), [data_path], build, use_snapshots)
+        return cls.from_state(state)
+
+    # --- Persistence ---
+
+    def to_state(self) -> Tuple:
+        """A marshal-friendly form of the index."""
+        arrays = (self.partner_order, self.partner_scores, self.gp_order, self.gp_scores,
+                  self.slot_order, self.slot_scores)
+        return (INDEX_FORMAT, self.chara_ids) + tuple(a.tobytes() for a in arrays)
+
+    @classmethod
+    def from_state(cls, state: Tuple) -> 'AffinityIndex':
+        if state[0] != INDEX_FORMAT:
+            raise ValueError(f"Unsupported affinity index format: {state[0]}")
+        arrays = []
+        for typecode, raw in zip('HiHiHi', state[2:]):
+            values = array(typecode)
+            values.frombytes(raw)
+            arrays.append(values)
+        return cls(list(state[1]), *arrays)
+
+    # --- Queries ---
+
+    def _row(self, order: array, scores: array, start: int, size: int,
+             exclude: Collection[int]) -> Iterator[Tuple[int, int]]:
+        chara_ids = self.chara_ids
+        for i in range(start, start + size):
+            chara_id = chara_ids[order[i]]
+            if chara_id not in exclude:
+                yield chara_id, scores[i]
+
+    def top_partners(self, trainee: int, k: int = DEFAULT_K, exclude: Collection[int] = ()) -> List[Tuple[int, int]]:
+        """The k best parents for `trainee` by 2-way score, as (chara_id, score)."""
+        t = self.position.get(trainee)
+        if t is None:
+            return []
+        size = len(self.chara_ids) - 1
+        return list(islice(self._row(self.partner_order, self.partner_scores, t * size, size, exclude), k))
+
+    def top_grandparents(self, trainee: int, parent: int, k: int = DEFAULT_K,
+                         exclude: Collection[int] = ()) -> List[Tuple[int, int]]:
+        """The k best grandparents under `parent` for `trainee` by 3-way score, as (chara_id, score)."""
+        t, p = self.position.get(trainee), self.position.get(parent)
+        if t is None or p is None or t == p:
+            return []
+        n = len(self.chara_ids)
+        size = n - 2
+        return list(islice(self._row(self.gp_order, self.gp_scores, (t * n + p) * size, size, exclude), k))
+
+    def top_slots(self, trainee: int, k: int = DEFAULT_K, exclude: Collection[int] = ()) -> List[Dict[str, Any]]:
+        """
+        The k best parent slots for `trainee`: a parent and the two grandparents that
+        maximize 2-way + both 3-way scores.
+        """
+        t = self.position.get(trainee)
+        if t is None:
+            return []
+        size = len(self.chara_ids) - 1
+        if not exclude:
+            slots = []
+            for p, total in islice(zip(self.slot_order[t * size:(t + 1) * size],
+                                       self.slot_scores[t * size:(t + 1) * size]), k):
+                grandparents = self.top_grandparents(trainee, self.chara_ids[p], 2)
+                slots.append(_slot(self.chara_ids[p], total - sum(score for _, score in grandparents), grandparents))
+            return slots
+
+        # Exclusions can change which grandparents are best, so re-rank from the rows.
+        slots = []
+        for parent, pair_score in self._row(self.partner_order, self.partner_scores, t * size, size, exclude):
+            slots.append(_slot(parent, pair_score, self.top_grandparents(trainee, parent, 2, exclude)))
+        slots.sort(key=lambda slot: (-slot['total'], slot['parent']))
+        return slots[:k]
+
+def _slot(parent: int, score: int, grandparents: List[Tuple[int, int]]) -> Dict[str, Any]:
+    return {'parent': parent, 'score': score, 'grandparents': grandparents,
+            'total': score + sum(gp_score for _, gp_score in grandparents)}
+
+# --- Main CLI Logic ---
+
+def print_ranking(title: str, rows: List[Tuple[int, int]], chara_map: Dict[int, str]):
+    print(f"\n--- {title} ---")
+    for rank, (chara_id, score) in enumerate(rows, 1):
+        print(f"{rank:>3}. {chara_map.get(chara_id, 'Unknown')} ({chara_id}): {score}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Lists the best parents and grandparents for a trainee from a precomputed affinity index."
+    )
+    parser.add_argument("data_path", type=Path, help="Path to an affinity_*.json file.")
+    parser.add_argument("trainee_id", type=int, help="The ID of the character being trained.")
+    parser.add_argument("--parent", type=int, help="List the best grandparents under this parent instead.")
+    parser.add_argument("--slots", action="store_true", help="List the best parent + grandparents slots.")
+    parser.add_argument("-k", type=int, default=DEFAULT_K, help="Number of results to show.")
+    parser.add_argument("--exclude", type=int, nargs='+', default=[], help="Character IDs to leave out.")
+    parser.add_argument("--no-snapshots", action="store_true", help="Rebuild the index instead of using a cached snapshot.")
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    with instrumented(args, 'affinity_index'):
+        try:
+            calculator = AffinityCalculator(args.data_path, use_snapshots=not args.no_snapshots)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            return
+        index = AffinityIndex.load(args.data_path, calculator, use_snapshots=not args.no_snapshots)
+        chara_map = calculator.chara_map
+        if args.trainee_id not in index.position:
+            print(f"Error: Unknown trainee ID {args.trainee_id}.")
+            return
+        exclude = set(args.exclude)
+
+        with phase('query'):
+            start = time.perf_counter_ns()
+            if args.slots:
+                results = index.top_slots(args.trainee_id, args.k, exclude)
+            elif args.parent:
+                results = index.top_grandparents(args.trainee_id, args.parent, args.k, exclude)
+            else:
+                results = index.top_partners(args.trainee_id, args.k, exclude)
+            elapsed_us = (time.perf_counter_ns() - start) / 1000
+
+        with phase('output'):
+            trainee = f"{chara_map.get(args.trainee_id, 'Unknown')} ({args.trainee_id})"
+            if args.slots:
+                print(f"\n--- Best Parent Slots for {trainee} ---")
+                for rank, slot in enumerate(results, 1):
+                    gps = ', '.join(f"{chara_map.get(cid, 'Unknown')} ({cid}) {score}" for cid, score in slot['grandparents'])
+                    print(f"{rank:>3}. {chara_map.get(slot['parent'], 'Unknown')} ({slot['parent']}) "
+                          f"{slot['score']} + [{gps}] = {slot['total']}")
+            elif args.parent:
+                print_ranking(f"Best Grandparents for {trainee} under "
+                              f"{chara_map.get(args.parent, 'Unknown')} ({args.parent}) (3-way)", results, chara_map)
+            else:
+                print_ranking(f"Best Parents for {trainee} (2-way)", results, chara_map)
+            print(f"\nQuery took {elapsed_us:.1f}µs.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+import argparse
+import json
+import sys
+import tracemalloc
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+RAW_DATA_DIR = PROJECT_ROOT / 'raw_data'
+MIN_MEMORY_RATIO = 5.0
+
+INT32_MIN, INT32_MAX = -(1 << 31), (1 << 31) - 1
+
+# Marks a column value that was absent from the source record. Ellipsis never occurs
+# in JSON and, unlike a plain object() sentinel, survives marshal snapshots.
+MISSING = ...
+
+# Columns every record level always has, as (field, kind). Other keys get a column
+# too when most records at that level carry an int or str for them (see
+# discover_fields). Anything left over, or any value that doesn't fit its column, is
+# kept in that level's sparse overrides, so the conversion is lossless for arbitrary
+# skill_data.json content.
+SKILL_FIELDS = (('rarity', 'int'),)
+ALTERNATIVE_FIELDS = (('precondition', 'str'), ('condition', 'str'), ('baseDuration', 'int'))
+EFFECT_FIELDS = (('type', 'int'), ('modifier', 'int'), ('target', 'int'))
+LEVELS = ((SKILL_FIELDS, 'alternatives'), (ALTERNATIVE_FIELDS, 'effects'), (EFFECT_FIELDS, None))
+
+# --- Storage ---
+
+class StringTable:
+    """Deduplicated strings packed into one UTF-8 buffer, addressed by integer index."""
+    def __init__(self):
+        self.offsets = array('I', [0])
+        self.blob = bytearray()
+        self._index: Optional[Dict[str, int]] = {}
+
+    def intern(self, value: str) -> int:
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.offsets) - 1
+            self.blob += value.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return index
+
+    def freeze(self):
+        """Drops the build-time lookup dict and the buffer's spare capacity."""
+        self.blob = bytes(self.blob)
+        self._index = None
+
+    def __getitem__(self, index: int) -> str:
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+class RecordTable:
+    """
+    Struct-of-arrays storage for one record level (skills, alternatives or effects).
+    Children of record i are the child level's records child_offsets[i]:child_offsets[i + 1].
+    """
+    __slots__ = ('fields', 'kinds', 'columns', 'child_key', 'child_offsets', 'overrides')
+
+    def __init__(self, fields: Tuple[Tuple[str, str], ...], child_key: Optional[str] = None):
+        self.fields = fields
+        self.kinds = dict(fields)
+        self.columns = {name: array('i') for name, _ in fields}
+        self.child_key = child_key
+        self.child_offsets = array('I', [0]) if child_key else None
+        self.overrides: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.columns[self.fields[0][0]])
+
+    def append(self, record: Dict[str, Any], strings: StringTable) -> List[Dict[str, Any]]:
+        """Stores a record's columns and returns its children for the caller to append."""
+        index = len(self)
+        extra = {}
+        for name, kind in self.fields:
+            value = record.get(name, MISSING)
+            if kind == 'str' and type(value) is str:
+                self.columns[name].append(strings.intern(value))
+            elif kind == 'int' and type(value) is int and INT32_MIN <= value <= INT32_MAX:
+                self.columns[name].append(value)
+            else:
+                self.columns[name].append(0)
+                extra[name] = value
+        children: List[Dict[str, Any]] = []
+        for key, value in record.items():
+            if key in self.kinds:
+                continue
+            if key == self.child_key and type(value) is list and all(type(c) is dict for c in value):
+                children = value
+            else:
+                extra[key] = value
+        if self.child_key and self.child_key not in record:
+            extra[self.child_key] = MISSING
+        if extra:
+            self.overrides[index] = extra
+        return children
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'columns': {name: column.tobytes() for name, column in self.columns.items()},
+            'child_offsets': self.child_offsets.tobytes() if self.child_key else None,
+            'overrides': self.overrides,
+        }
+
+    def load_state(self, state: Dict[str, Any]):
+        for name, raw in state['columns'].items():
+            self.columns[name] = array('i', raw)
+        if self.child_key:
+            self.child_offsets = array('I', state['child_offsets'])
+        self.overrides = state['overrides']
+
+# --- Views ---
+
+class RecordView:
+    """
+    A read-only, dict-like view of one stored record. Supports the `get` and `[]`
+    lookups the display code uses; `to_dict` rebuilds the original JSON object.
+    """
+    __slots__ = ('_store', '_level', '_index')
+
+    def __init__(self, store: 'CompactSkillData', level: int, index: int):
+        self._store = store
+        self._level = level
+        self._index = index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        table = self._store.tables[self._level]
+        override = table.overrides.get(self._index)
+        if override is not None and key in override:
+            value = override[key]
+            return default if value is MISSING else value
+        kind = table.kinds.get(key)
+        if kind is not None:
+            value = table.columns[key][self._index]
+            return self._store.strings[value] if kind == 'str' else value
+        if key == table.child_key:
+            return self._store.children(self._level, self._index)
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+    def keys(self) -> List[str]:
+        table = self._store.tables[self._level]
+        override = table.overrides.get(self._index, {})
+        keys = [name for name, _ in table.fields if override.get(name) is not MISSING]
+        if table.child_key and override.get(table.child_key) is not MISSING and table.child_key not in keys:
+            keys.append(table.child_key)
+        keys += [key for key, value in override.items() if key not in keys and value is not MISSING]
+        return keys
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {}
+        for key in self.keys():
+            value = self.get(key)
+            if isinstance(value, list):
+                value = [v.to_dict() if isinstance(v, RecordView) else v for v in value]
+            result[key] = value
+        return result
+
+    def __repr__(self) -> str:
+        return f"RecordView({self.to_dict()!r})"
+
+# --- Store ---
+
+class CompactSkillData:
+    """
+    A compact, read-only replacement for the merged `skill_data` dict.
+
+    Skills, alternatives and effects are stored column-wise in typed arrays, skill ids
+    as a sorted int array searched by bisection, and condition strings deduplicated
+    into a single buffer. `get(skill_id)` accepts string or integer ids and returns a
+    `RecordView`, so code written against the JSON dicts keeps working unchanged.
+    """
+    def __init__(self, level_fields: Optional[List[Tuple[Tuple[str, str], ...]]] = None):
+        self.ids = array('i')
+        self.strings = StringTable()
+        level_fields = level_fields or [fields for fields, _ in LEVELS]
+        self.tables = tuple(RecordTable(fields, child_key) for fields, (_, child_key) in zip(level_fields, LEVELS))
+        # Skills whose ids aren't integers (never seen in practice) stay as plain dicts.
+        self.other: Dict[str, Any] = {}
+
+    @classmethod
+    def from_dict(cls, skill_data: Dict[str, Any]) -> 'CompactSkillData':
+        numeric, other = [], {}
+        for skill_id, skill in skill_data.items():
+            if (skill_id.isdigit() and str(int(skill_id)) == skill_id and int(skill_id) <= INT32_MAX
+                    and isinstance(skill, dict)):
+                numeric.append((int(skill_id), skill))
+            else:
+                other[skill_id] = skill
+        numeric.sort(key=lambda item: item[0])
+
+        store = cls(discover_fields([skill for _, skill in numeric]))
+        store.other = other
+        for skill_id, skill in numeric:
+            store.ids.append(skill_id)
+            store._append(0, skill)
+        store.strings.freeze()
+        return store
+
+    def _append(self, level: int, record: Dict[str, Any]):
+        table = self.tables[level]
+        children = table.append(record, self.strings)
+        if table.child_key:
+            for child in children:
+                self._append(level + 1, child)
+            table.child_offsets.append(len(self.tables[level + 1]))
+
+    # --- Lookup API ---
+
+    def children(self, level: int, index: int) -> List[RecordView]:
+        offsets = self.tables[level].child_offsets
+        return [RecordView(self, level + 1, i) for i in range(offsets[index], offsets[index + 1])]
+
+    def _position(self, skill_id) -> int:
+        try:
+            key = int(skill_id)
+        except (TypeError, ValueError):
+            return -1
+        pos = bisect_left(self.ids, key)
+        return pos if pos < len(self.ids) and self.ids[pos] == key else -1
+
+    def get(self, skill_id, default: Any = None) -> Any:
+        pos = self._position(skill_id)
+        if pos >= 0:
+            return RecordView(self, 0, pos)
+        return self.other.get(str(skill_id), default)
+
+    def __getitem__(self, skill_id) -> Any:
+        value = self.get(skill_id, MISSING)
+        if value is MISSING:
+            raise KeyError(skill_id)
+        return value
+
+    def __contains__(self, skill_id) -> bool:
+        return self._position(skill_id) >= 0 or str(skill_id) in self.other
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.other)
+
+    def __iter__(self):
+        for skill_id in self.ids:
+            yield str(skill_id)
+        yield from self.other
+
+    def keys(self):
+        return iter(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {skill_id: as_plain(self.get(skill_id)) for skill_id in self}
+
+    # --- Snapshots ---
+
+    def to_state(self) -> Dict[str, Any]:
+        """Returns the store as builtin types only, suitable for marshal snapshots."""
+        return {
+            'fields': [table.fields for table in self.tables],
+            'ids': self.ids.tobytes(),
+            'strings': (bytes(self.strings.blob), self.strings.offsets.tobytes()),
+            'tables': [table.to_state() for table in self.tables],
+            'other': self.other,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'CompactSkillData':
+        store = cls([tuple(tuple(field) for field in fields) for fields in state['fields']])
+        store.ids = array('i', state['ids'])
+        blob, offsets = state['strings']
+        store.strings.blob, store.strings.offsets = blob, array('I', offsets)
+        store.strings.freeze()
+        for table, table_state in zip(store.tables, state['tables']):
+            table.load_state(table_state)
+        store.other = state['other']
+        return store
+
+def discover_fields(skills: List[Dict[str, Any]]) -> List[Tuple[Tuple[str, str], ...]]:
+    """
+    Returns the columns for each record level: the fixed fields plus any other key
+    that holds an int (or a str) in at least half of that level's records.
+    """
+    level_fields = []
+    records = skills
+    for fields, child_key in LEVELS:
+        counts: Dict[Tuple[str, str], int] = {}
+        children = []
+        for record in records:
+            for key, value in record.items():
+                if key == child_key:
+                    if type(value) is list:
+                        children.extend(c for c in value if type(c) is dict)
+                    continue
+                kind = 'int' if type(value) is int else 'str' if type(value) is str else None
+                if kind:
+                    counts[(key, kind)] = counts.get((key, kind), 0) + 1
+        known = {name for name, _ in fields}
+        extra = tuple(sorted(field for field, count in counts.items()
+                             if field[0] not in known and field[0] != child_key and count * 2 >= len(records)))
+        level_fields.append(fields + extra)
+        records = children
+    return level_fields
+
+def as_plain(value: Any) -> Any:
+    """Converts a RecordView back to plain JSON types; anything else is returned as-is."""
+    return value.to_dict() if isinstance(value, RecordView) else value
+
+# --- Verification ---
+
+def measure_memory(skill_data: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Returns the bytes retained by the nested dict form (as json.loads builds it) and by
+    the compact form of the same data, both measured with tracemalloc.
+    """
+    encoded = json.dumps(skill_data, ensure_ascii=False)
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        as_dicts = json.loads(encoded)
+        dict_bytes = tracemalloc.get_traced_memory()[0] - before
+
+        before = tracemalloc.get_traced_memory()[0]
+        compact = CompactSkillData.from_dict(as_dicts)
+        compact_bytes = tracemalloc.get_traced_memory()[0] - before
+        del compact, as_dicts
+    finally:
+        if started:
+            tracemalloc.stop()
+    return dict_bytes, compact_bytes
+
+def find_mismatches(skill_data: Dict[str, Any], compact: CompactSkillData) -> List[str]:
+    """Returns the ids whose compact form doesn't reproduce the original record."""
+    mismatches = [skill_id for skill_id, skill in skill_data.items() if as_plain(compact.get(skill_id)) != skill]
+    if len(compact) != len(skill_data):
+        mismatches.append(f"<count {len(compact)} != {len(skill_data)}>")
+    return mismatches
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Checks that the compact skill data model round-trips the merged skill_data.json "
+                    "and reports its memory footprint against the nested dict form."
+    )
+    parser.add_argument("--raw-data", type=Path, default=RAW_DATA_DIR, help="The raw_data directory to load.")
+    parser.add_argument("--min-ratio", type=float, default=MIN_MEMORY_RATIO,
+                        help="Fail unless the compact form is at least this many times smaller.")
+    args = parser.parse_args()
+
+    from query_data import GameData
+    skill_data = GameData(args.raw_data, use_snapshots=False).skill_data
+    if not skill_data:
+        print(f"Error: No skill data found under {args.raw_data}.")
+        sys.exit(1)
+
+    compact = CompactSkillData.from_dict(skill_data)
+    mismatches = find_mismatches(skill_data, compact)
+    dict_bytes, compact_bytes = measure_memory(skill_data)
+    ratio = dict_bytes / compact_bytes if compact_bytes else float('inf')
+
+    print(f"\nSkills: {len(skill_data)}, alternatives: {len(compact.tables[1])}, "
+          f"effects: {len(compact.tables[2])}, distinct strings: {len(compact.strings)}")
+    print(f"Nested dicts: {dict_bytes / 1024:,.1f} KiB")
+    print(f"Compact:      {compact_bytes / 1024:,.1f} KiB ({ratio:.1f}x smaller)")
+
+    failed = False
+    if mismatches:
+        print(f"FAIL: {len(mismatches)} skill(s) did not round-trip, e.g. {', '.join(mismatches[:5])}")
+        failed = True
+    if ratio < args.min_ratio:
+        print(f"FAIL: Memory reduction {ratio:.1f}x is below the required {args.min_ratio:.1f}x.")
+        failed = True
+    if not failed:
+        print("PASS: All skills round-trip and the memory target is met.")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
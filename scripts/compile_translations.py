@@ -0,0 +1,256 @@
+import argparse
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+from generate_translation_file import (
+    CATEGORIES, FACTOR_MAP_PATH, PROJECT_ROOT, RAW_DATA_DIR, TRANSLATIONS_DIR,
+    scenario_factor_id, skill_category,
+)
+from snapshots import SNAPSHOT_DIRNAME, write_atomic
+
+# --- Constants ---
+OUTPUT_DIR = PROJECT_ROOT / 'public' / 'translations'
+MANIFEST_NAME = 'manifest.json'
+BUILD_CACHE_DIR = RAW_DATA_DIR / SNAPSHOT_DIRNAME
+LOCALES = ('en', 'jp')
+# Bump when the bundle format or name resolution changes to invalidate every shard.
+COMPILER_VERSION = 1
+
+# Raw files each category is compiled from, besides its community translation file.
+CATEGORY_SOURCES = {
+    'characters': [('jp', 'umas.json'), ('global', 'umas.json')],
+    'outfits': [('jp', 'umas.json'), ('global', 'umas.json')],
+    'skills_unique': [('jp', 'skillnames.json'), ('global', 'skillnames.json')],
+    'skills_normal': [('jp', 'skillnames.json'), ('global', 'skillnames.json')],
+    'skills_misc': [('jp', 'scenarios.json'), (None, FACTOR_MAP_PATH.name)],
+}
+
+# --- Source Loading ---
+
+class Sources:
+    """Locates and lazily loads the files bundles are compiled from."""
+    def __init__(self, raw_data_dir: Path, translations_dir: Path):
+        self.raw_data_dir = raw_data_dir
+        self.translations_dir = translations_dir
+        self._cache: Dict[Path, Any] = {}
+
+    def raw_path(self, version: Optional[str], filename: str) -> Path:
+        return self.raw_data_dir / version / filename if version else self.raw_data_dir / filename
+
+    def category_paths(self, category: str) -> List[Path]:
+        paths = [self.raw_path(version, filename) for version, filename in CATEGORY_SOURCES[category]]
+        return paths + [self.translations_dir / CATEGORIES[category]]
+
+    def load(self, path: Path) -> Any:
+        if path not in self._cache:
+            try:
+                with phase('load', file=path.name), open(path, 'r', encoding='utf-8') as f:
+                    self._cache[path] = json.load(f)
+            except FileNotFoundError:
+                self._cache[path] = {}
+        return self._cache[path]
+
+    def raw(self, version: Optional[str], filename: str) -> Any:
+        return self.load(self.raw_path(version, filename))
+
+    def community(self, category: str) -> Dict[str, Dict[str, str]]:
+        return self.load(self.translations_dir / CATEGORIES[category])
+
+def inputs_digest(sources: Sources, category: str) -> str:
+    """A content hash of everything a category's shards are compiled from."""
+    digest = hashlib.blake2b(f"v{COMPILER_VERSION}:{category}".encode('utf-8'), digest_size=16)
+    for path in sources.category_paths(category):
+        digest.update(path.name.encode('utf-8'))
+        try:
+            digest.update(path.read_bytes())
+        except FileNotFoundError:
+            digest.update(b'\0missing')
+    return digest.hexdigest()
+
+# --- Name Resolution ---
+
+def collect_names(sources: Sources, category: str) -> Dict[str, Tuple[str, str, str]]:
+    """
+    Returns id -> (jp name, official Global name, community translation) for one category.
+    Any of the three may be empty.
+    """
+    names: Dict[str, List[str]] = {}
+
+    def add(entry_id: str, index: int, text: Optional[str]):
+        if text:
+            names.setdefault(entry_id, ['', '', ''])[index] = text
+
+    if category in ('characters', 'outfits'):
+        for index, version in ((0, 'jp'), (1, 'global')):
+            for char_id, uma in sources.raw(version, 'umas.json').items():
+                if category == 'characters':
+                    add(char_id, index, (uma.get('name') or [None, None])[index])
+                else:
+                    for outfit_id, outfit_name in (uma.get('outfits') or {}).items():
+                        add(outfit_id, index, outfit_name)
+    elif category in ('skills_unique', 'skills_normal'):
+        for index, version in ((0, 'jp'), (1, 'global')):
+            for skill_id, skill_names in sources.raw(version, 'skillnames.json').items():
+                if skill_category(skill_id) == category:
+                    add(skill_id, index, skill_names[index])
+    else:
+        factor_map = sources.raw(None, FACTOR_MAP_PATH.name)
+        for factor_names in (factor_map.get('scenarios') or {}).values():
+            factor_id = scenario_factor_id(factor_names['jp'])
+            add(factor_id, 0, factor_names['jp'])
+            add(factor_id, 1, factor_names.get('en'))
+        for factor_name in sources.raw('jp', 'scenarios.json'):
+            add(scenario_factor_id(factor_name), 0, factor_name)
+
+    for entry_id, entry in sources.community(category).items():
+        add(entry_id, 0, entry.get('jp_text'))
+        add(entry_id, 2, entry.get('unofficialTranslation'))
+    return {entry_id: tuple(values) for entry_id, values in names.items()}
+
+def resolve(locale: str, jp_name: str, global_name: str, community_name: str) -> str:
+    """
+    English prefers the official Global name, then the community translation, then JP.
+    Japanese uses the JP name, falling back to whatever English name exists.
+    """
+    if locale == 'jp':
+        return jp_name or global_name or community_name
+    return global_name or community_name or jp_name
+
+def render_bundle(names: Dict[str, Tuple[str, str, str]], locale: str) -> bytes:
+    bundle = {entry_id: resolve(locale, *values) for entry_id, values in names.items()}
+    bundle = {entry_id: text for entry_id, text in bundle.items() if text}
+    return json.dumps(bundle, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+# --- Compilation ---
+
+def shard_filename(category: str, content: bytes) -> str:
+    return f"{category}.{hashlib.blake2b(content, digest_size=8).hexdigest()}.json"
+
+def compile_locale(locale: str, categories: List[str], raw_data_dir: Path,
+                   translations_dir: Path, output_dir: Path) -> Dict[str, str]:
+    """
+    Compiles and writes one locale's shards for the given categories, returning
+    category -> shard filename. Runs in a worker process.
+    """
+    sources = Sources(raw_data_dir, translations_dir)
+    locale_dir = output_dir / locale
+    locale_dir.mkdir(parents=True, exist_ok=True)
+    written = {}
+    for category in categories:
+        with phase('merge', locale=locale, category=category):
+            content = render_bundle(collect_names(sources, category), locale)
+        filename = shard_filename(category, content)
+        # Content-hashed names make identical output a no-op, even on a forced rebuild.
+        if not (locale_dir / filename).exists():
+            with phase('output', file=f"{locale}/{filename}"):
+                write_atomic(locale_dir / filename, content)
+        written[category] = filename
+    return written
+
+def _load_json_or(path: Path, default: Any) -> Any:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+def build_cache_path(output_dir: Path) -> Path:
+    """
+    Input digests for one output directory. They are kept under raw_data/.snapshots
+    rather than next to the published bundles, so they are keyed by the output path.
+    """
+    key = hashlib.blake2b(str(output_dir.resolve()).encode('utf-8'), digest_size=8).hexdigest()
+    return BUILD_CACHE_DIR / f"translation_bundles.{key}.json"
+
+def compile_bundles(raw_data_dir: Path = RAW_DATA_DIR, translations_dir: Path = TRANSLATIONS_DIR,
+                    output_dir: Path = OUTPUT_DIR, cache_path: Optional[Path] = None,
+                    locales: Tuple[str, ...] = LOCALES, jobs: Optional[int] = None,
+                    force: bool = False) -> Dict[str, Any]:
+    """
+    Brings the bundles in `output_dir` up to date and returns a summary. A shard is
+    only recompiled when the content hash of its category's inputs has changed (or
+    its file is missing); locales with work to do are compiled in parallel.
+    """
+    cache_path = cache_path or build_cache_path(output_dir)
+    sources = Sources(raw_data_dir, translations_dir)
+    with phase('load', file='inputs'):
+        digests = {category: inputs_digest(sources, category) for category in CATEGORIES}
+
+    manifest = _load_json_or(output_dir / MANIFEST_NAME, {})
+    cache = _load_json_or(cache_path, {})
+    shards: Dict[str, Dict[str, str]] = {locale: dict(manifest.get(locale, {})) for locale in locales}
+
+    dirty: Dict[str, List[str]] = {}
+    for locale in locales:
+        for category in CATEGORIES:
+            current = shards[locale].get(category)
+            up_to_date = (not force and current and cache.get(f"{locale}/{category}") == digests[category]
+                          and (output_dir / locale / current).exists())
+            if not up_to_date:
+                dirty.setdefault(locale, []).append(category)
+
+    if dirty:
+        workers = min(jobs or len(dirty), len(dirty))
+        tasks = [(locale, categories, raw_data_dir, translations_dir, output_dir)
+                 for locale, categories in dirty.items()]
+        if workers <= 1:
+            results = [compile_locale(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(compile_locale, *zip(*tasks)))
+        for (locale, categories, *_), written in zip(tasks, results):
+            shards[locale].update(written)
+            for category in categories:
+                cache[f"{locale}/{category}"] = digests[category]
+
+        with phase('output', file=MANIFEST_NAME):
+            new_manifest = {**manifest, **shards}
+            write_atomic(output_dir / MANIFEST_NAME, (json.dumps(new_manifest, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+            write_atomic(cache_path, json.dumps(cache, indent=2, sort_keys=True).encode('utf-8'))
+            _prune_shards(output_dir, new_manifest)
+
+    return {'compiled': {locale: categories for locale, categories in dirty.items()},
+            'shards': sum(len(c) for c in dirty.values()),
+            'total': len(locales) * len(CATEGORIES)}
+
+def _prune_shards(output_dir: Path, manifest: Dict[str, Dict[str, str]]):
+    """Removes shard files that the manifest no longer references."""
+    for locale, categories in manifest.items():
+        locale_dir = output_dir / locale
+        if not locale_dir.is_dir():
+            continue
+        live = set(categories.values())
+        for path in locale_dir.glob('*.json'):
+            if path.name not in live:
+                path.unlink()
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compiles community translations, official Global names and JP fallbacks into "
+                    "minified, per-locale, per-category, content-hashed bundles."
+    )
+    parser.add_argument("--locales", nargs='+', default=list(LOCALES), choices=LOCALES, help="Locales to compile.")
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR, help="Output directory for bundles and manifest.json.")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (defaults to one per locale with changes).")
+    parser.add_argument("--force", action="store_true", help="Recompile every shard even if its inputs are unchanged.")
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    with instrumented(args, 'compile_translations'):
+        summary = compile_bundles(output_dir=args.out, locales=tuple(args.locales), jobs=args.jobs, force=args.force)
+
+    if not summary['shards']:
+        print(f"All {summary['total']} bundle shard(s) are up to date.")
+        return
+    for locale, categories in summary['compiled'].items():
+        print(f"  [{locale}] compiled {', '.join(categories)}")
+    print(f"Compiled {summary['shards']} of {summary['total']} shard(s) into {args.out}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+import argparse
+import copy
+import hashlib
+import json
+import struct
+import time
+from collections import defaultdict
+from functools import reduce
+from operator import xor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, FrozenSet, Iterable
+
+from inventory_io import (
+    load_export, save_export, parent_digest, serialize_grandparent, canonical_parent_string
+)
+
+# --- Constants ---
+DEFAULT_NUM_PERM = 32
+DEFAULT_BANDS = 8
+DEFAULT_THRESHOLD = 0.8
+# Tokens two parents may differ by and still match under the default threshold: one spark
+# swapped for another, or one star count changed, is a single token out and one in.
+DEFAULT_MAX_DIFFERENCE = 2
+DEFAULT_MAX_BUCKET = 500
+
+# An entry is addressed by (source index, position in that source's inventory).
+EntryRef = Tuple[int, int]
+GRANDPARENT_KEYS = ('grandparent1', 'grandparent2')
+
+# --- Digests ---
+# A numeric grandparent is an ID scoped to its own export: `id:5` in one backup and `id:5`
+# in another can be different parents. Before digesting, such references are replaced
+# by the referenced parent's own (recursively resolved) digest, so digests compare
+# across exports. Parents without numeric references keep the plain parent_digest.
+
+def _digest_with_refs(parent: Dict[str, Any], ref_digests: Dict[int, bytes]) -> bytes:
+    resolved = {key: ref_digests[parent[key]] for key in GRANDPARENT_KEYS
+                if isinstance(parent.get(key), int) and parent[key] in ref_digests}
+    if not resolved:
+        return parent_digest(parent)
+    canonical = canonical_parent_string({**parent, **{key: None for key in resolved}})
+    canonical += ''.join(f";{key}:ref:{digest.hex()}" for key, digest in resolved.items())
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+
+def resolved_digests(inventory: List[Dict[str, Any]]) -> List[bytes]:
+    """
+    Digests of every parent in one export, with numeric grandparent references resolved.
+    References to unknown IDs, or that form a cycle, are left as plain IDs.
+    """
+    positions: Dict[int, int] = {}
+    for position, parent in enumerate(inventory):
+        if isinstance(parent.get('id'), int):
+            positions.setdefault(parent['id'], position)
+
+    def references(parent: Dict[str, Any]) -> List[int]:
+        return [parent[key] for key in GRANDPARENT_KEYS
+                if isinstance(parent.get(key), int) and parent[key] in positions]
+
+    digests: List[Optional[bytes]] = [None] * len(inventory)
+    # Depth-first without recursion, since grandparent chains can be arbitrarily long.
+    for root in range(len(inventory)):
+        stack, expanded = [root], set()
+        while stack:
+            position = stack[-1]
+            if digests[position] is not None:
+                stack.pop()
+                continue
+            parent = inventory[position]
+            if position not in expanded:
+                expanded.add(position)
+                stack.extend(positions[gp] for gp in references(parent)
+                             if digests[positions[gp]] is None and positions[gp] not in expanded)
+                continue
+            stack.pop()
+            digests[position] = _digest_with_refs(parent, {
+                gp: digests[positions[gp]] for gp in references(parent) if digests[positions[gp]] is not None})
+    return digests
+
+# --- MinHash / LSH ---
+
+def spark_tokens(parent: Dict[str, Any], ref_digests: Optional[Dict[int, bytes]] = None) -> FrozenSet[str]:
+    """
+    The set of features compared for near-duplicate detection. Numeric grandparents found
+    in `ref_digests` (ID -> resolved digest) are compared by digest rather than by ID.
+    """
+    blue = parent.get('blueSpark', {})
+    pink = parent.get('pinkSpark', {})
+
+    def grandparent(gp: Any) -> str:
+        if ref_digests and isinstance(gp, int) and gp in ref_digests:
+            return f"ref:{ref_digests[gp].hex()}"
+        return serialize_grandparent(gp)
+
+    tokens = {
+        f"uma:{parent.get('umaId')}",
+        f"blue:{blue.get('type')}|{blue.get('stars')}",
+        f"pink:{pink.get('type')}|{pink.get('stars')}",
+        f"gp1:{grandparent(parent.get('grandparent1'))}",
+        f"gp2:{grandparent(parent.get('grandparent2'))}",
+    }
+    tokens.update(f"unique:{s['name']}|{s['stars']}" for s in parent.get('uniqueSparks') or [])
+    tokens.update(f"white:{s['name']}|{s['stars']}" for s in parent.get('whiteSparks') or [])
+    return frozenset(tokens)
+
+class MinHasher:
+    """
+    MinHash over string token sets. Each token's 32-bit hash values for all
+    permutations come from a single SHAKE-128 digest, and since spark tokens repeat
+    heavily across an inventory they are cached; a parent's signature is then just
+    an element-wise min over its tokens.
+    """
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        self.num_perm = num_perm
+        self._salt = seed.to_bytes(8, 'little')
+        self._unpack = struct.Struct(f'<{num_perm}I').unpack
+        self._token_cache: Dict[str, Tuple[int, ...]] = {}
+        self._hash_cache: Dict[str, int] = {}
+
+    def _token_signature(self, token: str) -> Tuple[int, ...]:
+        sig = self._token_cache.get(token)
+        if sig is None:
+            sig = self._unpack(hashlib.shake_128(self._salt + token.encode('utf-8')).digest(self.num_perm * 4))
+            self._token_cache[token] = sig
+        return sig
+
+    def signature(self, tokens: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(map(min, zip(*map(self._token_signature, tokens))))
+
+    def token_hash(self, token: str) -> int:
+        """A 64-bit hash of one token, reusing its cached signature."""
+        h = self._hash_cache.get(token)
+        if h is None:
+            sig = self._token_signature(token)
+            h = self._hash_cache[token] = sig[0] << 32 | sig[1]
+        return h
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+# --- Index ---
+
+class DedupIndex:
+    """A digest index over one or many inventory exports."""
+    def __init__(self):
+        self.sources: List[Path] = []
+        self.inventories: List[List[Dict[str, Any]]] = []
+        # Per source: each entry's resolved digest, and parent ID -> resolved digest.
+        self.digests: List[List[bytes]] = []
+        self.id_digests: List[Dict[int, bytes]] = []
+        # (server, digest) -> every entry with that exact genetic makeup, in load order
+        self.by_digest: Dict[Tuple[str, bytes], List[EntryRef]] = defaultdict(list)
+
+    def add_export(self, path: Path, data: Dict[str, Any]):
+        source_index = len(self.sources)
+        self.sources.append(path)
+        inventory = data['inventory']
+        self.inventories.append(inventory)
+        digests = resolved_digests(inventory)
+        self.digests.append(digests)
+        id_digests: Dict[int, bytes] = {}
+        for position, (parent, digest) in enumerate(zip(inventory, digests)):
+            if isinstance(parent.get('id'), int):
+                id_digests.setdefault(parent['id'], digest)
+            self.by_digest[(parent.get('server', 'jp'), digest)].append((source_index, position))
+        self.id_digests.append(id_digests)
+
+    def key(self, ref: EntryRef) -> Tuple[str, bytes]:
+        """The (server, resolved digest) an entry is grouped under."""
+        source_index, position = ref
+        return self.inventories[source_index][position].get('server', 'jp'), self.digests[source_index][position]
+
+    def parent(self, ref: EntryRef) -> Dict[str, Any]:
+        source_index, position = ref
+        return self.inventories[source_index][position]
+
+    def describe(self, ref: EntryRef) -> Dict[str, Any]:
+        parent = self.parent(ref)
+        return {
+            'source': str(self.sources[ref[0]]),
+            'id': parent.get('id'),
+            'name': parent.get('name'),
+        }
+
+    @property
+    def total_parents(self) -> int:
+        return sum(len(inv) for inv in self.inventories)
+
+    def exact_duplicates(self) -> List[Tuple[bytes, List[EntryRef]]]:
+        return [(digest, refs) for (_, digest), refs in self.by_digest.items() if len(refs) > 1]
+
+    def near_duplicates(self, threshold: Optional[float] = None, num_perm: int = DEFAULT_NUM_PERM,
+                        bands: int = DEFAULT_BANDS,
+                        max_bucket: int = DEFAULT_MAX_BUCKET) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Finds distinct parents whose spark sets overlap by at least `threshold` (Jaccard).
+        Only one representative per exact-duplicate group is hashed, and candidates are
+        verified exactly. Returns the matching pairs and the number of LSH buckets skipped
+        for holding more than `max_bucket` entries.
+
+        A fixed Jaccard cutoff misses small parents: with three white sparks, swapping one
+        leaves 8 of 10 tokens shared, and fewer sparks score lower still. So by default
+        (`threshold` None) a pair also matches when it differs by at most
+        DEFAULT_MAX_DIFFERENCE tokens, and such pairs are found through an exact index of
+        every spark set with one token removed rather than left to LSH chance.
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands}).")
+        rows = num_perm // bands
+        hasher = MinHasher(num_perm)
+
+        representatives: List[EntryRef] = []
+        token_sets: List[FrozenSet[str]] = []
+        buckets: Dict[Tuple, List[int]] = defaultdict(list)
+        # Single-edit key -> the first representative that produced it. Groups sharing an
+        # edit key are exact candidates, so unlike LSH buckets they are never capped.
+        edit_keys: Dict[int, int] = {}
+        edit_buckets: Dict[int, List[int]] = defaultdict(list)
+        for (server, _), refs in self.by_digest.items():
+            rep_index = len(representatives)
+            tokens = spark_tokens(self.parent(refs[0]), self.id_digests[refs[0][0]])
+            representatives.append(refs[0])
+            token_sets.append(tokens)
+            sig = hasher.signature(tokens)
+            for band in range(bands):
+                buckets[(server, band, sig[band * rows:(band + 1) * rows])].append(rep_index)
+            if threshold is None:
+                # Sets are keyed by the XOR of their token hashes (and the server's), so
+                # removing a token is one more XOR. A swap leaves both sets equal minus one
+                # token each; an added token leaves the smaller set equal to the larger minus
+                # one. Only keys seen twice get a bucket, keeping the common case allocation-free.
+                token_hashes = list(map(hasher.token_hash, tokens))
+                full = reduce(xor, token_hashes, hasher.token_hash(f"server:{server}"))
+                for key in (full, *(full ^ h for h in token_hashes)):
+                    first = edit_keys.setdefault(key, rep_index)
+                    if first != rep_index:
+                        group = edit_buckets[key]
+                        if not group:
+                            group.append(first)
+                        group.append(rep_index)
+
+        candidates = set()
+        skipped_buckets = 0
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            if len(members) > max_bucket:
+                skipped_buckets += 1
+                continue
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    candidates.add((a, b))
+        for members in edit_buckets.values():
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    # A set can share an edit key with itself if two token hashes collide.
+                    if a != b:
+                        candidates.add((a, b))
+
+        results = []
+        for a, b in candidates:
+            score = jaccard(token_sets[a], token_sets[b])
+            if threshold is not None:
+                matched = score >= threshold
+            else:
+                matched = score >= DEFAULT_THRESHOLD or len(token_sets[a] ^ token_sets[b]) <= DEFAULT_MAX_DIFFERENCE
+            if matched:
+                results.append({
+                    'jaccard': round(score, 4),
+                    'a': self.describe(representatives[a]),
+                    'b': self.describe(representatives[b]),
+                    'only_in_a': sorted(token_sets[a] - token_sets[b]),
+                    'only_in_b': sorted(token_sets[b] - token_sets[a]),
+                })
+        results.sort(key=lambda r: -r['jaccard'])
+        return results, skipped_buckets
+
+# --- Merging ---
+
+def merge_exports(index: DedupIndex, exports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merges several exports into the first one, keeping the first occurrence of each
+    exact duplicate, including duplicates within the first export. Kept parents get
+    fresh IDs if theirs are missing or collide, and numeric grandparent references are
+    remapped to the surviving parent.
+    """
+    merged = copy.deepcopy({**exports[0], 'inventory': []})
+    merged_inventory = merged['inventory']
+    used_ids = set()
+    # Fresh IDs start past every ID in the first export, so none of its parents are renumbered.
+    next_id = max((p['id'] for p in index.inventories[0] if isinstance(p.get('id'), int)), default=0) + 1
+
+    # The surviving parent for every entry, keyed by the canonical group.
+    survivor_id: Dict[Tuple[str, bytes], int] = {}
+    for source_index in range(len(exports)):
+        id_remap: Dict[int, int] = {}
+        kept: List[Dict[str, Any]] = []
+        for position, parent in enumerate(index.inventories[source_index]):
+            key = index.key((source_index, position))
+            if key in survivor_id:
+                if 'id' in parent:
+                    id_remap.setdefault(parent['id'], survivor_id[key])
+                continue
+            new_parent = copy.deepcopy(parent)
+            if new_parent.get('id') is None or new_parent['id'] in used_ids:
+                new_parent['id'] = next_id
+                next_id += 1
+            used_ids.add(new_parent['id'])
+            if 'id' in parent:
+                id_remap.setdefault(parent['id'], new_parent['id'])
+            survivor_id[key] = new_parent['id']
+            kept.append(new_parent)
+
+        for parent in kept:
+            remapped = False
+            for gp_key in GRANDPARENT_KEYS:
+                gp = parent.get(gp_key)
+                if isinstance(gp, int) and gp in id_remap and id_remap[gp] != gp:
+                    parent[gp_key] = id_remap[gp]
+                    remapped = True
+            if remapped and 'hash' in parent:
+                parent['hash'] = canonical_parent_string(parent)
+        merged_inventory.extend(kept)
+
+    return merged
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Finds exact and near-duplicate parents across inventory exports.")
+    parser.add_argument("exports", type=Path, nargs='+', help="One or more exported data files (v12 JSON).")
+    parser.add_argument("--near", action="store_true", help="Also search for near-duplicates with MinHash/LSH.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        help=f"Minimum Jaccard similarity for near-duplicates (default: {DEFAULT_THRESHOLD}, or any pair "
+             f"differing by a single spark, whichever is looser)."
+    )
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM, help="Number of MinHash permutations.")
+    parser.add_argument("--bands", type=int, default=DEFAULT_BANDS, help="Number of LSH bands (must divide --num-perm).")
+    parser.add_argument("--report", type=Path, help="Write the full duplicate report to this JSON file.")
+    parser.add_argument("--merge-out", type=Path, help="Write a merged export with exact duplicates removed.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every duplicate group.")
+    args = parser.parse_args()
+
+    try:
+        start = time.perf_counter()
+        index = DedupIndex()
+        exports = []
+        for path in args.exports:
+            data = load_export(path)
+            exports.append(data)
+            index.add_export(path, data)
+        print(f"Indexed {index.total_parents} parent(s) from {len(exports)} file(s) "
+              f"into {len(index.by_digest)} unique digest(s) in {time.perf_counter() - start:.2f}s.")
+
+        exact = index.exact_duplicates()
+        print(f"\nFound {len(exact)} exact duplicate group(s).")
+        if args.verbose:
+            for digest, refs in exact:
+                print(f"  - {digest.hex()}:")
+                for ref in refs:
+                    info = index.describe(ref)
+                    print(f"    - {info['name']} (id {info['id']}) in {info['source']}")
+
+        near = []
+        if args.near:
+            near_start = time.perf_counter()
+            near, skipped_buckets = index.near_duplicates(args.threshold, args.num_perm, args.bands)
+            if skipped_buckets:
+                print(f"Warning: skipped {skipped_buckets} LSH bucket(s) larger than {DEFAULT_MAX_BUCKET} entries.")
+            criterion = f"Jaccard >= {args.threshold}" if args.threshold is not None else \
+                f"Jaccard >= {DEFAULT_THRESHOLD} or a single-spark difference"
+            print(f"\nFound {len(near)} near-duplicate pair(s) at {criterion} "
+                  f"in {time.perf_counter() - near_start:.2f}s.")
+            if args.verbose:
+                for pair in near:
+                    print(f"  - [{pair['jaccard']:.2f}] {pair['a']['name']} (id {pair['a']['id']}) "
+                          f"<-> {pair['b']['name']} (id {pair['b']['id']})")
+                    print(f"    only in first: {', '.join(pair['only_in_a']) or '-'}")
+                    print(f"    only in second: {', '.join(pair['only_in_b']) or '-'}")
+
+        if args.report:
+            report = {
+                'exact': [
+                    {'digest': digest.hex(), 'entries': [index.describe(ref) for ref in refs]}
+                    for digest, refs in exact
+                ],
+                'near': near,
+            }
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"\nReport written to {args.report}")
+
+        if args.merge_out:
+            merged = merge_exports(index, exports)
+            save_export(args.merge_out, merged)
+            print(f"\nMerged inventory ({len(merged['inventory'])} parent(s)) written to {args.merge_out}")
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+
+if __name__ == "__main__":
+    main()
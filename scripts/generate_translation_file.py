@@ -4,6 +4,8 @@ import argparse
 import re
 import hashlib
 
+from instrumentation import phase, add_instrumentation_args, instrumented
+
 # --- PATHS ---
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
@@ -20,17 +22,27 @@ CATEGORIES = {
     'skills_misc': 'skills_misc.json', # For races, scenarios, etc.
 }
 
+def skill_category(skill_id: str) -> str:
+    """Returns the translation category a skill id belongs to."""
+    if skill_id.startswith('9') or (skill_id.startswith('1') and len(skill_id) > 4): # Heuristic for uniques
+        return 'skills_unique'
+    return 'skills_normal'
+
+def scenario_factor_id(factor_name: str) -> str:
+    """Scenario factors have no id in the game data, so they are keyed by a hash of their JP name."""
+    return f"scenario_{hashlib.md5(factor_name.encode('utf-8')).hexdigest()}"
+
 def _load_raw_json(version: str, filename: str):
     file_path = RAW_DATA_DIR / version / filename
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with phase('load', file=f"{version}/{filename}"), open(file_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
         
 def _load_root_json(filepath: Path):
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with phase('load', file=filepath.name), open(filepath, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
@@ -62,73 +74,73 @@ def main():
     parser = argparse.ArgumentParser(
         description="Generates categorized template files for providing unofficial English translations."
     )
-    parser.parse_args()
-
-    print("--- Generating community translation files ---")
-
-    translations = load_existing_translations()
-    print(f"Loaded existing translations from: {TRANSLATIONS_DIR.relative_to(PROJECT_ROOT)}")
-
-    # Load raw data
-    jp_skill_names = _load_raw_json('jp', 'skillnames.json')
-    gl_skill_names = _load_raw_json('global', 'skillnames.json')
-    jp_umas = _load_raw_json('jp', 'umas.json')
-    gl_umas = _load_raw_json('global', 'umas.json')
-    factor_map = _load_root_json(FACTOR_MAP_PATH)
-    jp_scenario_factors = set(_load_raw_json('jp', 'scenarios.json'))
-
-    new_entries_count = 0
-
-    # Process Skills
-    for skill_id, names in jp_skill_names.items():
-        jp_name = names[0]
-        gl_name = gl_skill_names.get(skill_id, [None, None])[1]
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    with instrumented(args, 'generate_translation_file'):
+        print("--- Generating community translation files ---")
+
+        with phase('load', file='community_translations'):
+            translations = load_existing_translations()
+        print(f"Loaded existing translations from: {TRANSLATIONS_DIR.relative_to(PROJECT_ROOT)}")
+
+        # Load raw data
+        jp_skill_names = _load_raw_json('jp', 'skillnames.json')
+        gl_skill_names = _load_raw_json('global', 'skillnames.json')
+        jp_umas = _load_raw_json('jp', 'umas.json')
+        gl_umas = _load_raw_json('global', 'umas.json')
+        factor_map = _load_root_json(FACTOR_MAP_PATH)
+        jp_scenario_factors = set(_load_raw_json('jp', 'scenarios.json'))
+
+        new_entries_count = 0
+
+        with phase('merge'):
+            # Process Skills
+            for skill_id, names in jp_skill_names.items():
+                jp_name = names[0]
+                gl_name = gl_skill_names.get(skill_id, [None, None])[1]
         
-        if jp_name and not gl_name:
-            # Determine category
-            if skill_id.startswith('9') or (skill_id.startswith('1') and len(skill_id) > 4): # Heuristic for uniques
-                category = 'skills_unique'
-            else:
-                category = 'skills_normal'
+                if jp_name and not gl_name:
+                    category = skill_category(skill_id)
             
-            if skill_id not in translations[category]:
-                translations[category][skill_id] = { "jp_text": jp_name, "unofficialTranslation": "" }
-                new_entries_count += 1
+                    if skill_id not in translations[category]:
+                        translations[category][skill_id] = { "jp_text": jp_name, "unofficialTranslation": "" }
+                        new_entries_count += 1
             
-    # Process Characters and Outfits
-    for char_id, uma_info in jp_umas.items():
-        jp_char_name = uma_info.get("name", [None, None])[0]
-        gl_char_info = gl_umas.get(char_id, {})
-        gl_char_name = gl_char_info.get("name", [None, None])[1]
-
-        if jp_char_name and not gl_char_name and char_id not in translations["characters"]:
-            translations["characters"][char_id] = { "jp_text": jp_char_name, "unofficialTranslation": "" }
-            new_entries_count += 1
-
-        for outfit_id, jp_outfit_name in uma_info.get("outfits", {}).items():
-            gl_outfit_name = gl_char_info.get("outfits", {}).get(outfit_id)
-            if jp_outfit_name and not gl_outfit_name and outfit_id not in translations["outfits"]:
-                 translations["outfits"][outfit_id] = { "jp_text": jp_outfit_name, "unofficialTranslation": "" }
-                 new_entries_count += 1
-
-    # Process unmapped JP Scenario Factors
-    processed_scenario_jp_names = {names['jp'] for names in factor_map.get('scenarios', {}).values()}
-    unmapped_jp_scenarios = jp_scenario_factors - processed_scenario_jp_names
+            # Process Characters and Outfits
+            for char_id, uma_info in jp_umas.items():
+                jp_char_name = uma_info.get("name", [None, None])[0]
+                gl_char_info = gl_umas.get(char_id, {})
+                gl_char_name = gl_char_info.get("name", [None, None])[1]
+
+                if jp_char_name and not gl_char_name and char_id not in translations["characters"]:
+                    translations["characters"][char_id] = { "jp_text": jp_char_name, "unofficialTranslation": "" }
+                    new_entries_count += 1
+
+                for outfit_id, jp_outfit_name in uma_info.get("outfits", {}).items():
+                    gl_outfit_name = gl_char_info.get("outfits", {}).get(outfit_id)
+                    if jp_outfit_name and not gl_outfit_name and outfit_id not in translations["outfits"]:
+                         translations["outfits"][outfit_id] = { "jp_text": jp_outfit_name, "unofficialTranslation": "" }
+                         new_entries_count += 1
+
+            # Process unmapped JP Scenario Factors
+            processed_scenario_jp_names = {names['jp'] for names in factor_map.get('scenarios', {}).values()}
+            unmapped_jp_scenarios = jp_scenario_factors - processed_scenario_jp_names
     
-    for factor_name in sorted(list(unmapped_jp_scenarios)):
-        factor_hash = hashlib.md5(factor_name.encode('utf-8')).hexdigest()
-        factor_id = f"scenario_{factor_hash}"
-        category = 'skills_misc'
-        if factor_id not in translations[category]:
-            translations[category][factor_id] = { "jp_text": factor_name, "unofficialTranslation": "" }
-            new_entries_count += 1
-
-    save_translations(translations)
+            for factor_name in sorted(list(unmapped_jp_scenarios)):
+                factor_id = scenario_factor_id(factor_name)
+                category = 'skills_misc'
+                if factor_id not in translations[category]:
+                    translations[category][factor_id] = { "jp_text": factor_name, "unofficialTranslation": "" }
+                    new_entries_count += 1
+
+        with phase('output'):
+            save_translations(translations)
     
-    print(f"\nProcess complete. Added {new_entries_count} new untranslated entries.")
-    print(f"Translation files saved in: {TRANSLATIONS_DIR.relative_to(PROJECT_ROOT)}")
-    if new_entries_count > 0:
-        print("Please edit the relevant JSON files to add translations, then run 'prepare_data.py'.")
+        print(f"\nProcess complete. Added {new_entries_count} new untranslated entries.")
+        print(f"Translation files saved in: {TRANSLATIONS_DIR.relative_to(PROJECT_ROOT)}")
+        if new_entries_count > 0:
+            print("Please edit the relevant JSON files to add translations, then run 'prepare_data.py'.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
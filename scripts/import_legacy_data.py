@@ -0,0 +1,274 @@
+import argparse
+import json
+import time
+from array import array
+from functools import lru_cache
+from itertools import chain, accumulate
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from inventory_io import save_export, canonical_parent_string
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+DATA_DIR = PROJECT_ROOT / 'src' / 'data'
+SKILL_LIST_PATH = DATA_DIR / 'skill-list.json'
+UMA_LIST_PATH = DATA_DIR / 'uma-list.json'
+
+APP_DATA_VERSION = 12
+ID_GENERATION_BASE = 1700000000000
+DEFAULT_BLUE = {'type': 'Speed', 'stars': 1}
+DEFAULT_PINK = {'type': 'Turf', 'stars': 1}
+
+# (name, stars, category), as produced by `createFactorMap` in legacyImport.worker.ts
+FactorEntry = Tuple[str, int, str]
+# (parent field, spark object), e.g. ('whiteSparks', {'name': 'Groundwork', 'stars': 2})
+SparkRecord = Tuple[str, Dict[str, Any]]
+
+# --- Factor Lookup Table ---
+
+# Where each category's sparks go on a parent, and whether they are keyed by 'type' or 'name'.
+CATEGORY_FIELDS = {
+    'blue': ('blue', 'type'),
+    'pink': ('pink', 'type'),
+    'unique': ('uniqueSparks', 'name'),
+    'white': ('whiteSparks', 'name'),
+}
+
+class FactorTable:
+    """
+    A dense lookup table from factor ID to (name, stars, category).
+
+    Rather than hashing every ID through a dict, `codes` is an unsigned array indexed
+    directly by factor ID whose values point into the small `entries` list (code 0 is
+    "unknown"). Whole batches of IDs are then resolved with C-level `map` calls.
+    `sparks` holds the ready-made spark object for each entry; they are shared between
+    parents, so callers must copy them before mutating.
+    """
+    def __init__(self, skill_list: List[Dict[str, Any]]):
+        self.entries: List[Optional[FactorEntry]] = [None]
+        mapping: Dict[int, int] = {}
+        for skill in skill_list:
+            for rarity_info in skill.get('rarities') or []:
+                factor_id = rarity_info['factorId']
+                entry = (skill.get('name_en') or skill.get('name_jp'), rarity_info['rarity'], skill['category'])
+                if factor_id in mapping:
+                    self.entries[mapping[factor_id]] = entry
+                else:
+                    mapping[factor_id] = len(self.entries)
+                    self.entries.append(entry)
+
+        self.sparks: List[Optional[SparkRecord]] = [None]
+        for name, stars, category in self.entries[1:]:
+            field = CATEGORY_FIELDS.get(category)
+            self.sparks.append((field[0], {field[1]: name, 'stars': stars}) if field else None)
+
+        typecode = 'H' if len(self.entries) <= 0xFFFF else 'I'
+        self.size = max(mapping, default=0) + 1
+        self.codes = array(typecode, bytes(array(typecode).itemsize * self.size))
+        for factor_id, code in mapping.items():
+            self.codes[factor_id] = code
+
+    def _resolve(self, factor_ids: List[int], table: List[Any]) -> List[Any]:
+        if not factor_ids:
+            return []
+        if min(factor_ids) >= 0 and max(factor_ids) < self.size:
+            return list(map(table.__getitem__, map(self.codes.__getitem__, factor_ids)))
+        # Slow path for dumps containing IDs outside the known range.
+        size, codes = self.size, self.codes
+        return [table[codes[fid]] if 0 <= fid < size else None for fid in factor_ids]
+
+    def lookup(self, factor_ids: List[int]) -> List[Optional[FactorEntry]]:
+        """Resolves a flat list of factor IDs in one pass."""
+        return self._resolve(factor_ids, self.entries)
+
+    def lookup_sparks(self, factor_arrays: List[List[int]]) -> List[List[Optional[SparkRecord]]]:
+        """Resolves many factor arrays to spark records at once and splits the result back per array."""
+        flat = self._resolve(list(chain.from_iterable(factor_arrays)), self.sparks)
+        bounds = list(accumulate(map(len, factor_arrays), initial=0))
+        return [flat[bounds[i]:bounds[i + 1]] for i in range(len(factor_arrays))]
+
+@lru_cache(maxsize=4)
+def _cached_factor_table(path: Path, mtime_ns: int) -> FactorTable:
+    with open(path, 'r', encoding='utf-8') as f:
+        return FactorTable(json.load(f))
+
+def load_factor_table(path: Path = SKILL_LIST_PATH) -> FactorTable:
+    """Builds the factor table once per skill list version and reuses it afterwards."""
+    return _cached_factor_table(path, path.stat().st_mtime_ns)
+
+# --- Parent Construction (mirrors legacyImport.worker.ts) ---
+
+def get_uma_display_name(uma: Dict[str, Any]) -> str:
+    base_name = uma.get('base_name_en') or uma.get('base_name_jp')
+    outfit_name = uma.get('outfit_name_en') or uma.get('outfit_name_jp')
+    return f"{outfit_name} {base_name}" if outfit_name else base_name
+
+def group_sparks(records: List[Optional[SparkRecord]]) -> Dict[str, List[Dict[str, Any]]]:
+    sparks = {'blue': [], 'pink': [], 'uniqueSparks': [], 'whiteSparks': []}
+    for record in records:
+        if record is not None:
+            sparks[record[0]].append(record[1])
+    return sparks
+
+def select_representative_spark(sparks: List[Dict[str, Any]], default: Dict[str, Any]) -> Dict[str, Any]:
+    # max() keeps the first of several equal-star sparks, same as the worker's reduce.
+    return max(sparks, key=lambda s: s['stars']) if sparks else default
+
+def create_manual_grandparent(succession_chara: Dict[str, Any], records: List[Optional[SparkRecord]]) -> Dict[str, Any]:
+    sparks = group_sparks(records)
+    return {
+        'umaId': str(succession_chara.get('card_id')),
+        'blueSpark': select_representative_spark(sparks['blue'], DEFAULT_BLUE),
+        'pinkSpark': select_representative_spark(sparks['pink'], DEFAULT_PINK),
+        'uniqueSparks': sparks['uniqueSparks'],
+        'whiteSparks': sparks['whiteSparks'],
+    }
+
+def convert_legacy_data(legacy_data: Dict[str, Any], factor_table: FactorTable,
+                        uma_map: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Converts a legacy account dump to a v12 app data structure.
+    Returns the app data and decode stats (factor ID count and time spent decoding).
+    """
+    trained = sorted((legacy_data.get('data') or {}).get('trained_chara_array') or [],
+                     key=lambda c: c['trained_chara_id'])
+    owned_ids = {c['trained_chara_id'] for c in trained}
+
+    # Gather every factor array in the file (each character plus its succession
+    # parents at positions 10/20) so they can be decoded in a single batch.
+    factor_arrays: List[List[int]] = []
+    layout: List[Tuple[int, Dict[int, Tuple[Dict[str, Any], int]]]] = []
+    for chara in trained:
+        own_index = len(factor_arrays)
+        factor_arrays.append(chara.get('factor_id_array') or [])
+        slots = {}
+        for succession in chara.get('succession_chara_array') or []:
+            if succession.get('position_id') in (10, 20):
+                slots[succession['position_id']] = (succession, len(factor_arrays))
+                factor_arrays.append(succession.get('factor_id_array') or [])
+        layout.append((own_index, slots))
+    decode_start = time.perf_counter()
+    decoded = factor_table.lookup_sparks(factor_arrays)
+    stats = {'factor_ids': sum(map(len, factor_arrays)), 'decode_seconds': time.perf_counter() - decode_start}
+
+    parents: List[Dict[str, Any]] = []
+    for chara, (own_index, slots) in zip(trained, layout):
+        sparks = group_sparks(decoded[own_index])
+        uma_id = str(chara.get('card_id'))
+        uma_info = uma_map.get(uma_id)
+        if not uma_info:
+            print(f"Warning: Uma with card_id {uma_id} not found. Skipping character.")
+            continue
+
+        grandparents = []
+        for trained_key, position in (('succession_trained_chara_id_1', 10), ('succession_trained_chara_id_2', 20)):
+            gp_id = chara.get(trained_key)
+            if gp_id and gp_id in owned_ids:
+                grandparents.append(gp_id)
+            elif position in slots:
+                succession, decoded_index = slots[position]
+                grandparents.append(create_manual_grandparent(succession, decoded[decoded_index]))
+            else:
+                grandparents.append(None)
+
+        parent = {
+            'umaId': uma_id,
+            'name': get_uma_display_name(uma_info),
+            'blueSpark': select_representative_spark(sparks['blue'], DEFAULT_BLUE),
+            'pinkSpark': select_representative_spark(sparks['pink'], DEFAULT_PINK),
+            'uniqueSparks': sparks['uniqueSparks'],
+            'whiteSparks': sparks['whiteSparks'],
+            'isBorrowed': chara.get('owner_viewer_id') != 0,  # Missing counts as borrowed, like the worker.
+            'id': chara['trained_chara_id'],  # Temporary old ID
+            'gen': 1,
+            'score': 0,
+            'server': 'global',
+        }
+        for gp_key, gp in zip(('grandparent1', 'grandparent2'), grandparents):
+            if gp is not None:
+                parent[gp_key] = gp
+        parents.append(parent)
+
+    old_to_new = {}
+    for i, parent in enumerate(parents):
+        old_to_new[parent['id']] = ID_GENERATION_BASE + i
+        parent['id'] = ID_GENERATION_BASE + i
+    for parent in parents:
+        for gp_key in ('grandparent1', 'grandparent2'):
+            gp = parent.get(gp_key)
+            if isinstance(gp, int) and gp in old_to_new:
+                parent[gp_key] = old_to_new[gp]
+        parent['hash'] = canonical_parent_string(parent)
+
+    return create_import_file_structure(parents), stats
+
+def create_import_file_structure(inventory: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # v11 removed per-profile rosters, so the imported profile only carries a goal.
+    profile_id = ID_GENERATION_BASE - 1
+    new_profile = {
+        'id': profile_id,
+        'name': "Imported Parents",
+        'goal': {'primaryBlue': [], 'secondaryBlue': [], 'primaryPink': [], 'uniqueWishlist': [], 'wishlist': []},
+        'isPinned': False,
+    }
+    return {
+        'version': APP_DATA_VERSION,
+        'activeServer': 'global',
+        'inventory': inventory,
+        'skillPresets': [],
+        'serverData': {
+            'jp': {'activeProfileId': None, 'profiles': [], 'folders': [], 'layout': []},
+            'global': {'activeProfileId': profile_id, 'profiles': [new_profile], 'folders': [], 'layout': [profile_id]},
+        },
+    }
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Converts legacy account dumps into v12 inventory exports.")
+    parser.add_argument("dumps", type=Path, nargs='+', help="One or more legacy JSON dumps.")
+    parser.add_argument("-o", "--output", type=Path, help="Output file (only valid with a single dump).")
+    parser.add_argument("--out-dir", type=Path, help="Directory for outputs; defaults to next to each dump.")
+    parser.add_argument("--skill-list", type=Path, default=SKILL_LIST_PATH, help="Path to skill-list.json.")
+    parser.add_argument("--uma-list", type=Path, default=UMA_LIST_PATH, help="Path to uma-list.json.")
+    args = parser.parse_args()
+
+    if args.output and len(args.dumps) > 1:
+        parser.error("--output can only be used with a single dump; use --out-dir instead.")
+
+    try:
+        start = time.perf_counter()
+        factor_table = load_factor_table(args.skill_list)
+        with open(args.uma_list, 'r', encoding='utf-8') as f:
+            uma_map = {u['id']: u for u in json.load(f)}
+        print(f"Built factor table ({len(factor_table.entries) - 1} factors) in {time.perf_counter() - start:.3f}s.")
+
+        for dump_path in args.dumps:
+            with open(dump_path, 'r', encoding='utf-8') as f:
+                legacy_data = json.load(f)
+            convert_start = time.perf_counter()
+            app_data, stats = convert_legacy_data(legacy_data, factor_table, uma_map)
+            elapsed = time.perf_counter() - convert_start
+
+            if args.output:
+                out_path = args.output
+            else:
+                out_dir = args.out_dir or dump_path.parent
+                out_dir.mkdir(parents=True, exist_ok=True)
+                out_path = out_dir / f"{dump_path.stem}.v{APP_DATA_VERSION}.json"
+            save_export(out_path, app_data)
+
+            decode_seconds = stats['decode_seconds']
+            rate = stats['factor_ids'] / decode_seconds if decode_seconds > 0 else float('inf')
+            print(f"{dump_path.name}: {len(app_data['inventory'])} parent(s) in {elapsed:.3f}s, "
+                  f"{stats['factor_ids']} factor ID(s) decoded at {rate:,.0f} ids/s -> {out_path}")
+
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+    except (ValueError, KeyError) as e:
+        print(f"Error: Could not parse legacy data: {e}")
+
+if __name__ == "__main__":
+    main()
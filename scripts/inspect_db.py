@@ -1,6 +1,20 @@
 import sqlite3
 import argparse
+import csv
+import json
+import time
+from itertools import chain, islice
 from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+
+# --- Constants ---
+FETCH_SIZE = 4096
+# Rows examined to size print_table's columns; later rows wider than this just overflow.
+WIDTH_SAMPLE_ROWS = 1000
+STATEMENT_CACHE_SIZE = 64
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
 
 def inspect_database(db_path: Path):
     """
@@ -14,13 +28,14 @@ def inspect_database(db_path: Path):
     print(f"--- Inspecting Database: {db_path.name} ---")
 
     try:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with phase('load', file=db_path.name):
+            conn = sqlite3.connect(db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
 
-        # Get all table names
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-        tables = [row['name'] for row in cursor.fetchall()]
+            # Get all table names
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
+            tables = [row['name'] for row in cursor.fetchall()]
         
         if not tables:
             print("No tables found in the database.")
@@ -47,15 +62,17 @@ def inspect_database(db_path: Path):
             # Get sample rows
             query = f'SELECT {", ".join(f"`{c}`" for c in display_columns)} FROM "{table_name}" LIMIT 5;'
             try:
-                cursor.execute(query)
-                rows = cursor.fetchall()
+                with phase('query', table=table_name):
+                    cursor.execute(query)
+                    rows = cursor.fetchall()
                 
                 if not rows:
                     print("-> Table is empty or contains no data in the first 5 rows.\n")
                     continue
 
                 # Format and print the table
-                print_table(display_columns, [dict(row) for row in rows])
+                with phase('output', table=table_name):
+                    print_table(display_columns, rows)
 
             except sqlite3.OperationalError as e:
                 print(f"Could not query table '{table_name}': {e}\n")
@@ -66,31 +83,241 @@ def inspect_database(db_path: Path):
         if 'conn' in locals() and conn:
             conn.close()
 
-def print_table(headers, data):
+def print_table(headers, data, sample_size: int = WIDTH_SAMPLE_ROWS):
     """
-    Formats and prints a list of dictionaries in a padded, tabular format.
+    Formats and prints rows in a padded, tabular format. Rows are sequences matched to
+    `headers` by position, so results with repeated column names print correctly. `data`
+    may be any iterable; column widths are computed from the first `sample_size` rows
+    only, so long results are printed as they stream in rather than held in memory.
     """
+    rows = iter(data)
+    sample = list(islice(rows, sample_size))
+
     # Calculate column widths
-    col_widths = {h: len(h) for h in headers}
-    for row in data:
-        for h in headers:
-            cell_value = str(row.get(h, 'NULL'))
-            col_widths[h] = max(col_widths[h], len(cell_value))
+    col_widths = [len(h) for h in headers]
+    for row in sample:
+        for i, cell in enumerate(row):
+            col_widths[i] = max(col_widths[i], len(str(cell)))
 
     # Print header
-    header_line = " | ".join(h.ljust(col_widths[h]) for h in headers)
+    header_line = " | ".join(h.ljust(w) for h, w in zip(headers, col_widths))
     print(header_line)
     
     # Print separator
-    separator_line = "-+-".join("-" * col_widths[h] for h in headers)
+    separator_line = "-+-".join("-" * w for w in col_widths)
     print(separator_line)
 
     # Print rows
-    for row in data:
-        row_line = " | ".join(str(row.get(h, 'NULL')).ljust(col_widths[h]) for h in headers)
+    for row in chain(sample, rows):
+        row_line = " | ".join(str(cell).ljust(w) for cell, w in zip(row, col_widths))
         print(row_line)
     print()
 
+# --- Query / Export ---
+
+class QueryRunner:
+    """
+    Runs ad-hoc SQL against a database opened read-only. sqlite3 keeps up to `cache_size`
+    compiled statements keyed by their text, so re-running a statement with new parameters
+    skips parsing and planning.
+    """
+
+    def __init__(self, db_path: Path, cache_size: int = STATEMENT_CACHE_SIZE):
+        self.conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True, cached_statements=cache_size)
+        self.conn.execute("PRAGMA query_only = ON")
+
+    def close(self):
+        self.conn.close()
+
+    def execute(self, sql: str, params: Union[Sequence, Dict[str, Any]] = ()) -> Tuple[List[str], Iterator[List[Tuple]]]:
+        """Returns the result columns and an iterator over batches of up to FETCH_SIZE rows."""
+        cursor = self.conn.execute(sql, params)
+        if cursor.description is None:
+            raise sqlite3.ProgrammingError("Statement returns no rows")
+        return unique_columns([d[0] for d in cursor.description]), self._batches(cursor)
+
+    @staticmethod
+    def _batches(cursor: sqlite3.Cursor) -> Iterator[List[Tuple]]:
+        while True:
+            batch = cursor.fetchmany(FETCH_SIZE)
+            if not batch:
+                return
+            yield batch
+
+def unique_columns(names: List[str]) -> List[str]:
+    """
+    Renames repeated result columns (a join of tables sharing `id` yields `id`, `id_1`) so
+    name-keyed outputs like JSON Lines and Parquet don't silently drop values.
+    """
+    taken = set(names)
+    seen = set()
+    unique = []
+    for name in names:
+        if name in seen:
+            suffix = 1
+            while f"{name}_{suffix}" in taken:
+                suffix += 1
+            name = f"{name}_{suffix}"
+            taken.add(name)
+        seen.add(name)
+        unique.append(name)
+    return unique
+
+def _json_value(value: Any) -> Any:
+    # SQLite BLOBs have no JSON equivalent; they are written as hex strings.
+    return value.hex() if isinstance(value, bytes) else value
+
+class CsvWriter:
+    def __init__(self, path: Path, columns: List[str]):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, batch: List[Tuple]):
+        self.writer.writerows(batch)
+
+    def close(self):
+        self.file.close()
+
+class JsonlWriter:
+    def __init__(self, path: Path, columns: List[str]):
+        self.file = open(path, 'wb')
+        self.columns = columns
+        # orjson is several times faster than json.dumps per row; both emit compact UTF-8 lines.
+        try:
+            import orjson
+            self.dumps = orjson.dumps
+        except ImportError:
+            self.dumps = lambda row: json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def write(self, batch: List[Tuple]):
+        columns, dumps = self.columns, self.dumps
+        self.file.writelines(
+            dumps({c: _json_value(v) for c, v in zip(columns, row)}) + b'\n'
+            for row in batch
+        )
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    """
+    Writes each fetched batch as a Parquet row group. SQLite columns are dynamically typed,
+    so the schema is taken from the first batch; a column that is entirely NULL there is
+    held back until later batches reveal its type.
+    """
+
+    def __init__(self, path: Path, columns: List[str]):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.path = path
+        self.columns = columns
+        self.writer = None
+        self.pending: List[Any] = []
+
+    def _table(self, batch: List[Tuple]):
+        return self.pa.Table.from_arrays(
+            [self.pa.array(list(column)) for column in zip(*batch)], names=self.columns)
+
+    def write(self, batch: List[Tuple]):
+        table = self._table(batch)
+        if self.writer is not None:
+            self.writer.write_table(table.cast(self.writer.schema))
+            return
+        self.pending.append(table)
+        if not any(self.pa.types.is_null(field.type) for field in table.schema):
+            self._flush()
+
+    def _flush(self):
+        # Merging promotes NULL-only columns to the type seen in any pending batch.
+        schema = self.pa.unify_schemas([t.schema for t in self.pending], promote_options='permissive')
+        self.writer = self.pq.ParquetWriter(self.path, schema)
+        for table in self.pending:
+            self.writer.write_table(table.cast(schema))
+        self.pending = []
+
+    def close(self):
+        if self.writer is None:
+            if self.pending:
+                self._flush()
+            else:
+                self.writer = self.pq.ParquetWriter(self.path, self.pa.schema(
+                    [(c, self.pa.null()) for c in self.columns]))
+        self.writer.close()
+
+WRITERS = {'csv': CsvWriter, 'jsonl': JsonlWriter, 'parquet': ParquetWriter}
+
+def export_format(output: Path, fmt: Optional[str]) -> str:
+    """The requested format, or the one implied by the output file's extension."""
+    if fmt:
+        return fmt
+    suffix = output.suffix.lower().lstrip('.')
+    return {'json': 'jsonl', 'ndjson': 'jsonl', 'pq': 'parquet'}.get(suffix, suffix)
+
+def load_params(path: Path) -> Iterator[Union[List, Dict[str, Any]]]:
+    """Parameter sets from a JSON Lines file, one array (positional) or object (named) per line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def run_query(db_path: Path, sql: str, output: Optional[Path] = None, fmt: Optional[str] = None,
+              param_sets: Iterable[Union[Sequence, Dict[str, Any]]] = ((),)) -> int:
+    """
+    Runs `sql` once per parameter set and streams every row to `output` (or the console),
+    never holding more than one fetch batch. Returns the number of rows written.
+    Raises FileNotFoundError for a missing database, ValueError for an unsupported
+    format or bad parameters, RuntimeError for a missing optional writer dependency,
+    and sqlite3.Error for query failures.
+    """
+    if not db_path.exists():
+        raise FileNotFoundError(f"Database file not found at '{db_path}'")
+    if output:
+        fmt = export_format(output, fmt)
+        if fmt not in WRITERS:
+            raise ValueError(f"Unsupported export format '{fmt}' (expected one of: {', '.join(EXPORT_FORMATS)})")
+
+    runner = QueryRunner(db_path)
+    writer = None
+    row_count = 0
+    start = time.perf_counter()
+    try:
+        with phase('query', output=output.name if output else 'console'):
+            param_sets = iter(param_sets)
+            columns, first = runner.execute(sql, next(param_sets, ()))
+
+            def batches() -> Iterator[List[Tuple]]:
+                yield from first
+                for params in param_sets:
+                    yield from runner.execute(sql, params)[1]
+
+            if output:
+                writer = WRITERS[fmt](output, columns)
+                for batch in batches():
+                    writer.write(batch)
+                    row_count += len(batch)
+            else:
+                def rows() -> Iterator[Tuple]:
+                    nonlocal row_count
+                    for batch in batches():
+                        row_count += len(batch)
+                        yield from batch
+                print_table(columns, rows())
+    finally:
+        if writer:
+            writer.close()
+        runner.close()
+
+    elapsed = time.perf_counter() - start
+    rate = row_count / elapsed if elapsed > 0 else 0
+    destination = f" to {output} ({fmt})" if output else ""
+    print(f"{row_count} rows{destination} in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    return row_count
+
 def main():
     parser = argparse.ArgumentParser(
         description="Inspects an Uma Musume master.mdb file and prints a sample of its contents."
@@ -100,8 +327,33 @@ def main():
         type=Path,
         help="Path to the master.mdb file (JP or Global)."
     )
+    query_group = parser.add_mutually_exclusive_group()
+    query_group.add_argument("-q", "--query", help="Run this read-only SQL instead of the table preview.")
+    query_group.add_argument("--query-file", type=Path, help="Run the SQL in this file instead of the table preview.")
+    parser.add_argument("-o", "--output", type=Path, help="Stream the query result to this file instead of the console.")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Export format (defaults to the output file's extension).")
+    parser.add_argument(
+        "--params",
+        type=Path,
+        help="JSON Lines file of parameter sets; the query is run once per line and all rows are exported together."
+    )
+    add_instrumentation_args(parser)
     args = parser.parse_args()
-    inspect_database(args.db_path)
+
+    if (args.output or args.format or args.params) and not (args.query or args.query_file):
+        parser.error("--output, --format and --params require --query or --query-file")
+
+    with instrumented(args, 'inspect_db'):
+        if args.query or args.query_file:
+            sql = args.query or args.query_file.read_text(encoding='utf-8')
+            param_sets = load_params(args.params) if args.params else ((),)
+            try:
+                run_query(args.db_path, sql, args.output, args.format, param_sets)
+            except (FileNotFoundError, ValueError, RuntimeError, sqlite3.Error) as e:
+                print(f"Error: {e}")
+                raise SystemExit(1)
+        else:
+            inspect_database(args.db_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# cProfile and pstats are imported only when --profile is used; pulling them in
+# unconditionally would add tens of milliseconds to every script's start-up.
+
+# --- Constants ---
+PROFILE_TOP_FUNCTIONS = 25
+PROFILE_TOP_ALLOCATIONS = 10
+
+# --- Phase Tracing ---
+
+class Tracer:
+    """
+    Records nested phase timings (load, merge, index build, query, output) as
+    Chrome trace-event "complete" events, viewable in chrome://tracing or Perfetto.
+    """
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.events: List[Dict[str, Any]] = []
+        self._origin_ns = time.perf_counter_ns()
+        # Nesting depth is tracked per thread so phases in worker threads nest correctly.
+        self._local = threading.local()
+
+    @contextmanager
+    def phase(self, name: str, **args: Any):
+        start_ns = time.perf_counter_ns()
+        start_mem = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            end_ns = time.perf_counter_ns()
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                args = {**args, 'mem_delta_bytes': current - start_mem, 'mem_peak_bytes': peak}
+            self.events.append({
+                'name': name,
+                'cat': 'phase',
+                'ph': 'X',
+                'ts': (start_ns - self._origin_ns) / 1000,
+                'dur': (end_ns - start_ns) / 1000,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': {**args, 'depth': depth},
+            })
+
+    def write_trace(self, path: Path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+    def print_summary(self, out=sys.stderr):
+        print("\n--- Phase Timings ---", file=out)
+        # Events are appended when a phase ends; sort by thread (main thread first), then
+        # by start time to restore nesting order.
+        main_tid = threading.main_thread().ident
+        for event in sorted(self.events, key=lambda e: (e['tid'] != main_tid, e['tid'], e['ts'], -e['dur'])):
+            details = ', '.join(f"{k}={v}" for k, v in event['args'].items()
+                                if k not in ('depth', 'mem_delta_bytes', 'mem_peak_bytes'))
+            memory = ''
+            if 'mem_delta_bytes' in event['args']:
+                memory = f" [mem {event['args']['mem_delta_bytes'] / 1024:+,.0f} KiB]"
+            label = f"{event['name']} ({details})" if details else event['name']
+            print(f"{'  ' * event['args']['depth']}{label}: {event['dur'] / 1000:.2f}ms{memory}", file=out)
+
+_active_tracer: Optional[Tracer] = None
+
+def phase(name: str, **args: Any):
+    """Times a block as a named phase when instrumentation is enabled; free otherwise."""
+    if _active_tracer is None:
+        return nullcontext()
+    return _active_tracer.phase(name, **args)
+
+# --- CLI Integration ---
+
+def add_instrumentation_args(parser: argparse.ArgumentParser):
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument("--timings", action="store_true", help="Print nested phase timings when done.")
+    group.add_argument("--trace", type=Path, help="Write phase timings as a Chrome trace-event JSON file.")
+    group.add_argument("--profile", action="store_true", help="Run under cProfile and tracemalloc and print the hottest functions and allocation sites.")
+    group.add_argument("--profile-out", type=Path, help="Also save raw cProfile stats to this file (implies --profile).")
+
+@contextmanager
+def instrumented(args: argparse.Namespace, name: str):
+    """
+    Wraps a script's main body according to the instrumentation flags. Reports are
+    written to stderr so they never mix with a script's regular output.
+    """
+    global _active_tracer
+    profile = args.profile or args.profile_out is not None
+    if not (profile or args.timings or args.trace):
+        yield None
+        return
+
+    profiler = None
+    if profile:
+        import cProfile
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+    tracer = Tracer(trace_memory=profile)
+    _active_tracer = tracer
+    if profiler:
+        profiler.enable()
+    try:
+        with tracer.phase(name):
+            yield tracer
+    finally:
+        if profiler:
+            profiler.disable()
+        _active_tracer = None
+
+        if args.timings or profile:
+            tracer.print_summary()
+        if args.trace:
+            tracer.write_trace(args.trace)
+            print(f"Trace written to {args.trace}", file=sys.stderr)
+        if profiler:
+            _report_profile(profiler, args.profile_out)
+            _report_allocations()
+            tracemalloc.stop()
+
+def _report_profile(profiler, out_path: Optional[Path]):
+    import io
+    import pstats
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream).sort_stats('cumulative')
+    stats.print_stats(PROFILE_TOP_FUNCTIONS)
+    print("\n--- cProfile (by cumulative time) ---", file=sys.stderr)
+    print(stream.getvalue().strip(), file=sys.stderr)
+    if out_path:
+        stats.dump_stats(out_path)
+        print(f"Profile stats written to {out_path}", file=sys.stderr)
+
+def _report_allocations():
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    print(f"\n--- tracemalloc (peak {peak / (1024 * 1024):.1f} MiB) ---", file=sys.stderr)
+    for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+        print(f"  {stat}", file=sys.stderr)
@@ -0,0 +1,83 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+# --- Types ---
+
+Grandparent = Union[int, Dict[str, Any], None]
+
+# --- Export Loading ---
+
+def load_export(path: Path) -> Dict[str, Any]:
+    """Loads an exported app data file (see docs/data_schema.md)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('inventory'), list):
+        raise ValueError(f"{path} does not look like an exported inventory (missing 'inventory' array).")
+    return data
+
+def save_export(path: Path, data: Dict[str, Any]):
+    """Writes app data in the same pretty-printed layout the app exports."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+def build_inventory_map(inventory: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    return {p['id']: p for p in inventory if 'id' in p}
+
+def resolve_grandparent(gp: Grandparent, inventory_map: Dict[int, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Resolves a grandparent reference (ID or manual object) to its data, mirroring src/utils/affinity.ts."""
+    if not gp:
+        return None
+    if isinstance(gp, int):
+        return inventory_map.get(gp)
+    return gp
+
+# --- Canonicalization (mirrors src/utils/hashing.ts) ---
+
+def _sorted_sparks(sparks: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # The app sorts with localeCompare; a plain code point sort is stable across runs,
+    # which is all the Python tooling needs since digests are only compared with each other.
+    return sorted(sparks or [], key=lambda s: s.get('name') or '')
+
+def _spark_list_string(sparks: Optional[List[Dict[str, Any]]]) -> str:
+    return ','.join(f"{s['name']}|{s['stars']}" for s in _sorted_sparks(sparks))
+
+def serialize_grandparent(gp: Grandparent) -> str:
+    """Stable string representation of a grandparent, matching `serializeGrandparent`."""
+    if not gp:
+        return 'none'
+    if isinstance(gp, int):
+        return f"id:{gp}"
+    blue = gp.get('blueSpark', {})
+    pink = gp.get('pinkSpark', {})
+    return (
+        f"manual:{gp.get('umaId') or 'none'}:"
+        f"{blue.get('type')}|{blue.get('stars')}:"
+        f"{pink.get('type')}|{pink.get('stars')}:"
+        f"{_spark_list_string(gp.get('uniqueSparks'))}:"
+        f"{_spark_list_string(gp.get('whiteSparks'))}"
+    )
+
+def canonical_parent_string(parent: Dict[str, Any]) -> str:
+    """
+    Builds the same key as `generateParentHash`. The score, gen, name, and id are
+    excluded as they don't define the parent's "genetic" makeup.
+    """
+    blue = parent.get('blueSpark', {})
+    pink = parent.get('pinkSpark', {})
+    components = [
+        f"uma:{parent.get('umaId')}",
+        f"blue:{blue.get('type')}|{blue.get('stars')}",
+        f"pink:{pink.get('type')}|{pink.get('stars')}",
+        f"unique:{_spark_list_string(parent.get('uniqueSparks'))}",
+        f"white:{_spark_list_string(parent.get('whiteSparks'))}",
+        f"gp1:{serialize_grandparent(parent.get('grandparent1'))}",
+        f"gp2:{serialize_grandparent(parent.get('grandparent2'))}",
+    ]
+    return ';'.join(components)
+
+def parent_digest(parent: Dict[str, Any]) -> bytes:
+    """A compact 128-bit digest of the canonical parent string."""
+    return hashlib.blake2b(canonical_parent_string(parent).encode('utf-8'), digest_size=16).digest()
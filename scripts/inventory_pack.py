@@ -0,0 +1,549 @@
+import argparse
+import json
+import struct
+import sys
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+from inventory_io import load_export, save_export, canonical_parent_string
+from snapshots import write_atomic
+
+# --- Constants ---
+DEFAULT_BLOCK_SIZE = 256
+BLOCK_CACHE_SIZE = 4
+ZSTD_LEVEL = 19
+ZLIB_LEVEL = 9
+
+# --- File Format ---
+# All integers are little-endian. A packed inventory is:
+#   header          magic, format, codec, block size, parent count, then the byte length of
+#                   each section below
+#   meta            compressed JSON of the export with 'inventory' set to null, which keeps
+#                   every other key (and the key order) exactly as exported
+#   strings         compressed string dictionary: uint32 offsets + UTF-8 blob
+#   shapes          compressed JSON list of the key orders used by parents and manual grandparents
+#   id index        int64 ids sorted ascending + uint32 inventory positions
+#   block index     (uint64 offset, uint32 length) per block, relative to the first block
+#   blocks          each compressed on its own so one parent can be read by decompressing
+#                   only its block
+#
+# A block holds up to `block size` consecutive parents as columns (see BLOCK_COLUMNS).
+# Grandparents that are inventory IDs are stored as positions in the inventory; manual
+# grandparents get a row in the block's spark columns after the parents. A parent whose
+# fields don't fit the columns (unknown keys, unexpected types) is kept verbatim as JSON.
+MAGIC = b'UMAINV'
+FORMAT = 1
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+_HEADER = struct.Struct('<6sHBxII5I')
+_ARRAY_HEADER = struct.Struct('<cI')
+_BLOCK_ENTRY = struct.Struct('<QI')
+
+BLOCK_COLUMNS = (
+    ('ids', 'q'),            # per parent, delta from the previous parent's id
+    ('shape', 'H'),          # per parent, index into shapes
+    ('flags', 'B'),          # per parent, FLAG_* bits
+    ('uma', 'i'),            # per parent, string index (-1 = absent)
+    ('name', 'i'),
+    ('server', 'i'),
+    ('hash', 'i'),           # -1 when absent or equal to the canonical parent string
+    ('gen', 'q'),
+    ('score', 'd'),
+    ('gp_kind', 'B'),        # two per parent, GP_* kinds
+    ('gp_value', 'q'),
+    ('blue_type', 'i'),      # per spark row: parents, then manual grandparents
+    ('blue_stars', 'B'),
+    ('pink_type', 'i'),
+    ('pink_stars', 'B'),
+    ('unique_offsets', 'I'),  # CSR offsets into unique_names/unique_stars, one more than rows
+    ('unique_names', 'i'),
+    ('unique_stars', 'B'),
+    ('white_offsets', 'I'),
+    ('white_names', 'i'),
+    ('white_stars', 'B'),
+    ('manual_shape', 'H'),   # per manual grandparent
+    ('manual_uma', 'i'),
+    ('raw', 'B'),            # UTF-8 JSON list of the parents kept verbatim
+)
+
+FLAG_BORROWED = 1
+FLAG_FLOAT_SCORE = 2
+FLAG_RAW = 4
+
+GP_NULL = 0
+GP_POSITION = 1
+GP_ID = 2
+GP_MANUAL = 3
+
+PARENT_KEYS = frozenset(('id', 'umaId', 'name', 'gen', 'blueSpark', 'pinkSpark', 'uniqueSparks', 'whiteSparks',
+                         'score', 'server', 'grandparent1', 'grandparent2', 'hash', 'isBorrowed'))
+MANUAL_KEYS = frozenset(('umaId', 'blueSpark', 'pinkSpark', 'uniqueSparks', 'whiteSparks'))
+MAX_EXACT_FLOAT_INT = 1 << 53
+MAX_INT64 = 1 << 63
+MAX_ID = 1 << 62
+
+# --- Compression ---
+
+def _zstd():
+    """The zstd bindings if installed: the zstandard package, or compression.zstd on Python 3.14+."""
+    try:
+        import zstandard
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress, zstandard.ZstdDecompressor().decompress
+    except ImportError:
+        pass
+    try:
+        from compression import zstd
+        return (lambda data: zstd.compress(data, level=ZSTD_LEVEL)), zstd.decompress
+    except ImportError:
+        return None
+
+def default_codec() -> int:
+    return CODEC_ZSTD if _zstd() else CODEC_ZLIB
+
+def _codec(codec: int):
+    if codec == CODEC_ZLIB:
+        return (lambda data: zlib.compress(data, ZLIB_LEVEL)), zlib.decompress
+    if codec == CODEC_ZSTD:
+        functions = _zstd()
+        if functions is None:
+            raise ValueError("This file is zstd-compressed; install the 'zstandard' package to read it.")
+        return functions
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+# --- Column Helpers ---
+
+def _pack_arrays(columns: List[array]) -> bytes:
+    parts = []
+    for column in columns:
+        if sys.byteorder == 'big':
+            column = array(column.typecode, column)
+            column.byteswap()
+        parts.append(_ARRAY_HEADER.pack(column.typecode.encode('ascii'), len(column)))
+        parts.append(column.tobytes())
+    return b''.join(parts)
+
+def _unpack_arrays(data: bytes) -> List[array]:
+    columns, position = [], 0
+    view = memoryview(data)
+    while position < len(data):
+        typecode, count = _ARRAY_HEADER.unpack_from(data, position)
+        position += _ARRAY_HEADER.size
+        column = array(typecode.decode('ascii'))
+        end = position + count * column.itemsize
+        column.frombytes(view[position:end])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        columns.append(column)
+        position = end
+    return columns
+
+class _StringTable:
+    def __init__(self):
+        self.strings: List[str] = []
+        self.index: Dict[str, int] = {}
+
+    def add(self, text: str) -> int:
+        i = self.index.get(text)
+        if i is None:
+            i = self.index[text] = len(self.strings)
+            self.strings.append(text)
+        return i
+
+    def to_bytes(self) -> bytes:
+        offsets, blob = array('I', [0]), bytearray()
+        for text in self.strings:
+            blob += text.encode('utf-8')
+            offsets.append(len(blob))
+        return _pack_arrays([offsets, array('B', blob)])
+
+def _read_strings(data: bytes) -> List[str]:
+    offsets, blob = _unpack_arrays(data)
+    raw = blob.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+# --- Column Fit Checks ---
+
+def _is_int(value: Any) -> bool:
+    return type(value) is int and -MAX_INT64 <= value < MAX_INT64
+
+def _is_id(value: Any) -> bool:
+    # Ids are stored as deltas, so they're kept well inside int64.
+    return type(value) is int and 0 <= value < MAX_ID
+
+def _fits_spark(spark: Any, key: str) -> bool:
+    return (type(spark) is dict and list(spark) == [key, 'stars'] and type(spark[key]) is str
+            and _is_int(spark['stars']) and 0 <= spark['stars'] <= 255)
+
+def _fits_spark_list(sparks: Any) -> bool:
+    return type(sparks) is list and all(_fits_spark(s, 'name') for s in sparks)
+
+def _fits_record(record: Dict[str, Any]) -> bool:
+    """The fields parents and manual grandparents share."""
+    return (type(record.get('umaId')) in (str, type(None))
+            and ('blueSpark' not in record or _fits_spark(record['blueSpark'], 'type'))
+            and ('pinkSpark' not in record or _fits_spark(record['pinkSpark'], 'type'))
+            and ('uniqueSparks' not in record or _fits_spark_list(record['uniqueSparks']))
+            and ('whiteSparks' not in record or _fits_spark_list(record['whiteSparks'])))
+
+def _fits_columns(parent: Any) -> bool:
+    if type(parent) is not dict or not PARENT_KEYS.issuperset(parent) or not _is_id(parent.get('id')):
+        return False
+    for key in ('name', 'server', 'hash'):
+        if key in parent and type(parent[key]) is not str:
+            return False
+    if 'gen' in parent and not _is_int(parent['gen']):
+        return False
+    if 'score' in parent:
+        score = parent['score']
+        if not (type(score) is float or (_is_int(score) and abs(score) < MAX_EXACT_FLOAT_INT)):
+            return False
+    if 'isBorrowed' in parent and type(parent['isBorrowed']) is not bool:
+        return False
+    for key in ('grandparent1', 'grandparent2'):
+        gp = parent.get(key)
+        if type(gp) is dict:
+            if not MANUAL_KEYS.issuperset(gp) or not _fits_record(gp):
+                return False
+        elif gp is not None and not _is_int(gp):
+            return False
+    return _fits_record(parent)
+
+# --- Encoding ---
+
+def _encode_block(parents: List[Dict[str, Any]], positions: Dict[int, int],
+                  strings: _StringTable, shapes: Dict[Tuple[str, ...], int]) -> bytes:
+    cols = {name: array(typecode) for name, typecode in BLOCK_COLUMNS}
+    cols['unique_offsets'].append(0)
+    cols['white_offsets'].append(0)
+    raw: List[Dict[str, Any]] = []
+    manual: List[Dict[str, Any]] = []
+
+    def string(value: Optional[str]) -> int:
+        return -1 if value is None else strings.add(value)
+
+    def shape(record: Dict[str, Any]) -> int:
+        return shapes.setdefault(tuple(record), len(shapes))
+
+    def add_sparks(record: Dict[str, Any]):
+        for key, type_col, stars_col in (('blueSpark', 'blue_type', 'blue_stars'), ('pinkSpark', 'pink_type', 'pink_stars')):
+            spark = record.get(key)
+            cols[type_col].append(string(spark['type']) if spark else -1)
+            cols[stars_col].append(spark['stars'] if spark else 0)
+        for key, prefix in (('uniqueSparks', 'unique'), ('whiteSparks', 'white')):
+            for spark in record.get(key) or ():
+                cols[f"{prefix}_names"].append(strings.add(spark['name']))
+                cols[f"{prefix}_stars"].append(spark['stars'])
+            cols[f"{prefix}_offsets"].append(len(cols[f"{prefix}_names"]))
+
+    previous_id = 0
+    for parent in parents:
+        fits = _fits_columns(parent)
+        parent_id = parent['id'] if fits else (parent.get('id') if type(parent) is dict and _is_id(parent.get('id')) else 0)
+        cols['ids'].append(parent_id - previous_id)
+        previous_id = parent_id
+        if not fits:
+            raw.append(parent)
+            cols['flags'].append(FLAG_RAW)
+            cols['shape'].append(0)
+            for name in ('uma', 'name', 'server', 'hash'):
+                cols[name].append(-1)
+            cols['gen'].append(0)
+            cols['score'].append(0.0)
+            cols['gp_kind'].extend((GP_NULL, GP_NULL))
+            cols['gp_value'].extend((0, 0))
+            add_sparks({})
+            continue
+
+        flags = (FLAG_BORROWED if parent.get('isBorrowed') else 0) | \
+                (FLAG_FLOAT_SCORE if type(parent.get('score')) is float else 0)
+        cols['flags'].append(flags)
+        cols['shape'].append(shape(parent))
+        cols['uma'].append(string(parent.get('umaId')))
+        cols['name'].append(string(parent.get('name')))
+        cols['server'].append(string(parent.get('server')))
+        parent_hash = parent.get('hash')
+        cols['hash'].append(-1 if parent_hash is None or parent_hash == canonical_parent_string(parent)
+                            else strings.add(parent_hash))
+        cols['gen'].append(parent.get('gen', 0))
+        cols['score'].append(parent.get('score', 0))
+        for key in ('grandparent1', 'grandparent2'):
+            gp = parent.get(key)
+            if gp is None:
+                cols['gp_kind'].append(GP_NULL)
+                cols['gp_value'].append(0)
+            elif type(gp) is dict:
+                cols['gp_kind'].append(GP_MANUAL)
+                cols['gp_value'].append(len(manual))
+                manual.append(gp)
+            elif gp in positions:
+                cols['gp_kind'].append(GP_POSITION)
+                cols['gp_value'].append(positions[gp])
+            else:
+                cols['gp_kind'].append(GP_ID)
+                cols['gp_value'].append(gp)
+        add_sparks(parent)
+
+    for gp in manual:
+        cols['manual_shape'].append(shape(gp))
+        cols['manual_uma'].append(string(gp.get('umaId')))
+        add_sparks(gp)
+    if raw:
+        cols['raw'].frombytes(json.dumps(raw, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return _pack_arrays([cols[name] for name, _ in BLOCK_COLUMNS])
+
+def encode_export(data: Dict[str, Any], codec: Optional[int] = None, block_size: int = DEFAULT_BLOCK_SIZE) -> bytes:
+    """Packs an exported app data file (see docs/data_schema.md) into the binary format."""
+    codec = codec or default_codec()
+    compress, _ = _codec(codec)
+    inventory = data['inventory']
+    positions: Dict[int, int] = {}
+    for i, parent in enumerate(inventory):
+        if type(parent) is dict and _is_id(parent.get('id')):
+            positions.setdefault(parent['id'], i)
+
+    strings = _StringTable()
+    shapes: Dict[Tuple[str, ...], int] = {}
+    with phase('encode', step='blocks'):
+        blocks = [compress(_encode_block(inventory[start:start + block_size], positions, strings, shapes))
+                  for start in range(0, len(inventory), block_size)]
+
+    with phase('encode', step='indexes'):
+        meta = compress(json.dumps({**data, 'inventory': None}, ensure_ascii=False).encode('utf-8'))
+        string_bytes = compress(strings.to_bytes())
+        shape_bytes = compress(json.dumps([list(s) for s in shapes], ensure_ascii=False).encode('utf-8'))
+        indexed = sorted((parent_id, i) for parent_id, i in positions.items())
+        id_index = _pack_arrays([array('q', (p for p, _ in indexed)), array('I', (i for _, i in indexed))])
+        block_index, offset = bytearray(), 0
+        for block in blocks:
+            block_index += _BLOCK_ENTRY.pack(offset, len(block))
+            offset += len(block)
+
+    header = _HEADER.pack(MAGIC, FORMAT, codec, block_size, len(inventory),
+                          len(meta), len(string_bytes), len(shape_bytes), len(id_index), len(block_index))
+    return b''.join([header, meta, string_bytes, shape_bytes, id_index, bytes(block_index)] + blocks)
+
+# --- Decoding ---
+
+class PackedInventory:
+    """
+    Reads a packed inventory. Opening one only decodes the header, string dictionary and
+    indexes; parents are decoded a block at a time, on demand.
+    """
+    def __init__(self, data: bytes):
+        (magic, version, codec, self.block_size, self.count,
+         meta_size, strings_size, shapes_size, ids_size, blocks_size) = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT:
+            raise ValueError("Not a packed inventory file (or an unsupported format version).")
+        _, self._decompress = _codec(codec)
+        self.codec = codec
+        self._data = data
+        position = _HEADER.size
+        sections = []
+        for size in (meta_size, strings_size, shapes_size, ids_size, blocks_size):
+            sections.append(data[position:position + size])
+            position += size
+        self._meta_bytes = sections[0]
+        self.strings = _read_strings(self._decompress(sections[1]))
+        self.shapes = [tuple(s) for s in json.loads(self._decompress(sections[2]))]
+        self._index_ids, self._index_positions = _unpack_arrays(sections[3])
+        self._blocks = [_BLOCK_ENTRY.unpack_from(sections[4], i) for i in range(0, len(sections[4]), _BLOCK_ENTRY.size)]
+        self._blocks_start = position
+        self._block_cache: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+        # Block-local ids are deltas, so ids at block boundaries are needed to resolve positions.
+        self._ids: Optional[List[int]] = None
+
+    @classmethod
+    def open(cls, path: Path) -> 'PackedInventory':
+        return cls(path.read_bytes())
+
+    def __len__(self) -> int:
+        return self.count
+
+    def meta(self) -> Dict[str, Any]:
+        return json.loads(self._decompress(self._meta_bytes))
+
+    def _inventory_ids(self) -> List[int]:
+        """Inventory ID at each position, for grandparent references stored as positions."""
+        if self._ids is None:
+            ids = [0] * self.count
+            for parent_id, position in zip(self._index_ids, self._index_positions):
+                ids[position] = parent_id
+            self._ids = ids
+        return self._ids
+
+    def block(self, number: int) -> List[Dict[str, Any]]:
+        """The decoded parents of one block. Recently used blocks are kept decoded."""
+        parents = self._block_cache.get(number)
+        if parents is not None:
+            self._block_cache.move_to_end(number)
+            return parents
+        offset, size = self._blocks[number]
+        start = self._blocks_start + offset
+        parents = self._decode_block(self._decompress(self._data[start:start + size]))
+        self._block_cache[number] = parents
+        if len(self._block_cache) > BLOCK_CACHE_SIZE:
+            self._block_cache.popitem(last=False)
+        return parents
+
+    def parent_at(self, position: int) -> Dict[str, Any]:
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        return self.block(position // self.block_size)[position % self.block_size]
+
+    def parent_by_id(self, parent_id: int) -> Optional[Dict[str, Any]]:
+        i = bisect_left(self._index_ids, parent_id)
+        if i == len(self._index_ids) or self._index_ids[i] != parent_id:
+            return None
+        return self.parent_at(self._index_positions[i])
+
+    def inventory(self) -> List[Dict[str, Any]]:
+        parents = []
+        for number in range(len(self._blocks)):
+            parents.extend(self.block(number))
+        return parents
+
+    def to_export(self) -> Dict[str, Any]:
+        data = self.meta()
+        data['inventory'] = self.inventory()
+        return data
+
+    def _decode_block(self, raw_block: bytes) -> List[Dict[str, Any]]:
+        c = dict(zip((name for name, _ in BLOCK_COLUMNS), _unpack_arrays(raw_block)))
+        strings = self.strings
+        uo, un, us = c['unique_offsets'], c['unique_names'], c['unique_stars']
+        wo, wn, ws = c['white_offsets'], c['white_names'], c['white_stars']
+        blue_type, blue_stars, pink_type, pink_stars = c['blue_type'], c['blue_stars'], c['pink_type'], c['pink_stars']
+        uma, name, server, gen, score = c['uma'], c['name'], c['server'], c['gen'], c['score']
+        flags, gp_kind, gp_value = c['flags'], c['gp_kind'], c['gp_value']
+        parent_count = len(c['ids'])
+        manual: List[Dict[str, Any]] = []
+        inventory_ids = self._inventory_ids() if GP_POSITION in gp_kind else None
+
+        def grandparent(slot: int) -> Any:
+            kind = gp_kind[slot]
+            if kind == GP_POSITION:
+                return inventory_ids[gp_value[slot]]
+            if kind == GP_MANUAL:
+                return manual[gp_value[slot]]
+            return gp_value[slot] if kind == GP_ID else None
+
+        # Spark rows are shared by parents and manual grandparents; `uma_of` maps a row to its umaId index.
+        getters = {
+            'blueSpark': lambda row: {'type': strings[blue_type[row]], 'stars': blue_stars[row]},
+            'pinkSpark': lambda row: {'type': strings[pink_type[row]], 'stars': pink_stars[row]},
+            'uniqueSparks': lambda row: [{'name': strings[un[j]], 'stars': us[j]} for j in range(uo[row], uo[row + 1])],
+            'whiteSparks': lambda row: [{'name': strings[wn[j]], 'stars': ws[j]} for j in range(wo[row], wo[row + 1])],
+            'id': lambda row: ids[row],
+            'name': lambda row: strings[name[row]],
+            'server': lambda row: strings[server[row]],
+            'gen': lambda row: gen[row],
+            'score': lambda row: score[row] if flags[row] & FLAG_FLOAT_SCORE else int(score[row]),
+            'isBorrowed': lambda row: bool(flags[row] & FLAG_BORROWED),
+            'grandparent1': lambda row: grandparent(2 * row),
+            'grandparent2': lambda row: grandparent(2 * row + 1),
+            # Filled in afterwards: the canonical string is derived from the other fields.
+            'hash': lambda row: None,
+        }
+        plans: Dict[Tuple[int, bool], List[Tuple[str, Any]]] = {}
+
+        def plan(shape: int, is_manual: bool) -> List[Tuple[str, Any]]:
+            key = (shape, is_manual)
+            if key not in plans:
+                uma_column = c['manual_uma'] if is_manual else uma
+                offset = parent_count if is_manual else 0
+                plans[key] = [(field, (lambda row, col=uma_column, offset=offset:
+                                       strings[col[row - offset]] if col[row - offset] >= 0 else None)
+                               if field == 'umaId' else getters[field]) for field in self.shapes[shape]]
+            return plans[key]
+
+        for m, shape in enumerate(c['manual_shape']):
+            row = parent_count + m
+            manual.append({field: get(row) for field, get in plan(shape, True)})
+
+        ids = array('q', c['ids'])
+        for row in range(1, parent_count):
+            ids[row] += ids[row - 1]
+
+        raw = iter(json.loads(c['raw'].tobytes()) if c['raw'] else ())
+        hashes, shapes = c['hash'], c['shape']
+        parents = []
+        for row in range(parent_count):
+            if flags[row] & FLAG_RAW:
+                parents.append(next(raw))
+                continue
+            parent = {field: get(row) for field, get in plan(shapes[row], False)}
+            if 'hash' in parent:
+                parent['hash'] = strings[hashes[row]] if hashes[row] >= 0 else canonical_parent_string(parent)
+            parents.append(parent)
+        return parents
+
+def decode_export(data: bytes) -> Dict[str, Any]:
+    """Unpacks a packed inventory back into the exported app data structure."""
+    return PackedInventory(data).to_export()
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converts inventory exports (v12 JSON) to and from a compact, randomly accessible binary format."
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    pack = subparsers.add_parser('pack', help="Convert a JSON export to the binary format.")
+    pack.add_argument("export", type=Path, help="Exported data file (v12 JSON).")
+    pack.add_argument("output", type=Path, help="Packed output file.")
+    pack.add_argument("--codec", choices=('zstd', 'zlib'), help="Compression (defaults to zstd when installed).")
+    pack.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="Parents per compressed block.")
+    unpack = subparsers.add_parser('unpack', help="Convert a packed file back to a JSON export.")
+    unpack.add_argument("packed", type=Path, help="Packed inventory file.")
+    unpack.add_argument("output", type=Path, help="JSON output file.")
+    show = subparsers.add_parser('show', help="Print single parents without decoding the whole file.")
+    show.add_argument("packed", type=Path, help="Packed inventory file.")
+    show.add_argument("ids", type=int, nargs='+', help="Parent IDs to print.")
+    for subparser in (pack, unpack, show):
+        add_instrumentation_args(subparser)
+    args = parser.parse_args()
+
+    with instrumented(args, f"inventory_pack.{args.command}"):
+        if args.command == 'pack':
+            with phase('load', file=args.export.name):
+                data = load_export(args.export)
+            codec = {'zstd': CODEC_ZSTD, 'zlib': CODEC_ZLIB}.get(args.codec)
+            if codec == CODEC_ZSTD and not _zstd():
+                print("Error: zstd is not available; install the 'zstandard' package or use --codec zlib.")
+                raise SystemExit(1)
+            packed = encode_export(data, codec, args.block_size)
+            # Fail loudly rather than leave a backup that can't be restored exactly.
+            with phase('verify'):
+                if decode_export(packed) != data:
+                    print("Error: the packed file does not round-trip to the same export.")
+                    raise SystemExit(1)
+            with phase('output', file=args.output.name):
+                write_atomic(args.output, packed)
+            source_size = args.export.stat().st_size
+            print(f"Packed {len(data['inventory'])} parents: {source_size:,} -> {len(packed):,} bytes "
+                  f"({source_size / max(len(packed), 1):.1f}x smaller, {'zstd' if PackedInventory(packed).codec == CODEC_ZSTD else 'zlib'}).")
+        elif args.command == 'unpack':
+            with phase('load', file=args.packed.name):
+                data = decode_export(args.packed.read_bytes())
+            with phase('output', file=args.output.name):
+                save_export(args.output, data)
+            print(f"Unpacked {len(data['inventory'])} parents to {args.output}.")
+        else:
+            start = time.perf_counter()
+            inventory = PackedInventory.open(args.packed)
+            for parent_id in args.ids:
+                parent = inventory.parent_by_id(parent_id)
+                if parent is None:
+                    print(f"Parent {parent_id} not found.")
+                else:
+                    print(json.dumps(parent, indent=2, ensure_ascii=False))
+            print(f"Read {len(args.ids)} parent(s) in {(time.perf_counter() - start) * 1000:.2f}ms.")
+
+if __name__ == "__main__":
+    main()
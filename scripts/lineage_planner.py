@@ -0,0 +1,260 @@
+import argparse
+import heapq
+import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import add
+from pathlib import Path
+from typing import Dict, Any, Collection, List, Optional, Set, Tuple
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+from affinity_calculator import AffinityCalculator
+from affinity_index import score_tables
+from inventory_io import load_export
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+UMA_LIST_PATH = PROJECT_ROOT / 'src' / 'data' / 'uma-list.json'
+DEFAULT_GENERATIONS = 4
+DEFAULT_BEAM_WIDTH = 64
+DEFAULT_TOP = 10
+# Worse than any reachable score; marks characters that may not be chosen.
+EXCLUDED = -(1 << 30)
+
+# --- Planner ---
+# A lineage is a chain c0, c1, ..., cN where each c(i) is trained with c(i-1) as its
+# parent and c(i-2) as that parent's grandparent slot, so every generation earns
+# 2-way(c(i), c(i-1)) + 3-way(c(i), c(i-1), c(i-2)). The 3-way term is 0 when the
+# grandparent is unknown (the starting trainee's parent wasn't given).
+
+class LineagePlanner:
+    """
+    Searches breeding chains over several generations for the highest cumulative affinity.
+
+    value(r, a, b), the best total obtainable in r more generations when the last trainee
+    is a and its parent was b, only depends on (a, b), so it is computed once per r for
+    all states by DP. Without a no-repeat rule following the DP is exact; with one the
+    state would have to include every character used so far, so a beam search over
+    chains ranks candidates by their score so far plus the DP value, which can only
+    overestimate the constrained optimum.
+    """
+
+    def __init__(self, chara_ids: List[int], pair: array, triple: array,
+                 allowed: Optional[Collection[int]] = None, no_repeats: bool = False,
+                 beam_width: int = DEFAULT_BEAM_WIDTH):
+        self.chara_ids = chara_ids
+        self.position = {chara_id: i for i, chara_id in enumerate(chara_ids)}
+        self.pair = pair
+        self.triple = triple
+        self.allowed = sorted(self.position[c] for c in allowed if c in self.position) if allowed is not None \
+            else list(range(len(chara_ids)))
+        self.no_repeats = no_repeats
+        self.beam_width = beam_width
+        # values[r][a * (n + 1) + b]; b == n stands for an unknown parent.
+        self.values: List[array] = [array('i', bytes(4 * len(chara_ids) * (len(chara_ids) + 1)))]
+
+    @classmethod
+    def for_calculator(cls, calculator: AffinityCalculator, **options) -> 'LineagePlanner':
+        chara_ids, pair, triple = score_tables(calculator.relation_points, calculator.chara_relations)
+        return cls(chara_ids, pair, triple, **options)
+
+    def to_state(self) -> Tuple:
+        """Everything a worker process needs to plan without rebuilding any table."""
+        return (self.chara_ids, self.pair.tobytes(), self.triple.tobytes(),
+                [self.chara_ids[i] for i in self.allowed], self.no_repeats, self.beam_width,
+                [values.tobytes() for values in self.values])
+
+    @classmethod
+    def from_state(cls, state: Tuple) -> 'LineagePlanner':
+        chara_ids, pair_bytes, triple_bytes, allowed, no_repeats, beam_width, values = state
+        pair, triple = array('i'), array('i')
+        pair.frombytes(pair_bytes)
+        triple.frombytes(triple_bytes)
+        planner = cls(chara_ids, pair, triple, allowed, no_repeats, beam_width)
+        planner.values = []
+        for raw in values:
+            planner.values.append(array('i'))
+            planner.values[-1].frombytes(raw)
+        return planner
+
+    def gain(self, d: int, a: int, b: int) -> int:
+        """Affinity earned by training d with parent a, whose own parent was b (n if unknown)."""
+        n = len(self.chara_ids)
+        return self.pair[d * n + a] + (self.triple[(a * n + b) * n + d] if b < n else 0)
+
+    def prepare(self, generations: int):
+        """Extends the DP value tables up to `generations` remaining."""
+        n = len(self.chara_ids)
+        pair, triple = self.pair, self.triple
+        while len(self.values) <= generations:
+            with phase('plan', step='dp', generation=len(self.values)):
+                previous = self.values[-1]
+                current = array('i', bytes(4 * n * (n + 1)))
+                for a in range(n):
+                    # base[d] is everything but the 3-way term for choosing d after a.
+                    base = [EXCLUDED] * n
+                    for d in self.allowed:
+                        if d != a:
+                            base[d] = pair[d * n + a] + previous[d * (n + 1) + a]
+                    best_unknown = max(base)
+                    current[a * (n + 1) + n] = max(best_unknown, 0)
+                    for b in range(n):
+                        # triple is symmetric, so the (d, a, b) scores for every d are one contiguous row.
+                        row = triple[(a * n + b) * n:(a * n + b + 1) * n]
+                        current[a * (n + 1) + b] = max(max(map(add, base, row)), 0)
+                self.values.append(current)
+
+    def plan(self, start: int, generations: int, parent: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        The best chain of `generations` trainees descending from `start`, whose own parent
+        is `parent` if known. Returns None if `start` is unknown or no chain satisfies
+        the constraints.
+        """
+        if start not in self.position or (parent and parent not in self.position):
+            return None
+        self.prepare(generations)
+        n = len(self.chara_ids)
+        s = self.position[start]
+        p = self.position[parent] if parent else n
+        prefix = (p, s) if parent else (s,)
+
+        # Without the no-repeat rule the DP value is exact, so the best candidate at each
+        # step is always on an optimal chain and a beam of one suffices.
+        width = self.beam_width if self.no_repeats else 1
+        # Beam entries are (priority, score, chain of positions).
+        beam = [(self.values[generations][s * (n + 1) + p], 0, prefix)]
+        for remaining in range(generations, 0, -1):
+            next_values = self.values[remaining - 1]
+            candidates = []
+            for _, score, chain in beam:
+                a, b = chain[-1], chain[-2] if len(chain) > 1 else n
+                used = set(chain) if self.no_repeats else ()
+                for d in self.allowed:
+                    if d == a or d in used:
+                        continue
+                    total = score + self.gain(d, a, b)
+                    candidates.append((total + next_values[d * (n + 1) + a], total, chain + (d,)))
+            if not candidates:
+                return None
+            beam = heapq.nlargest(width, candidates)
+
+        _, total, chain = max(beam, key=lambda entry: entry[1])
+        steps = []
+        for i in range(len(prefix), len(chain)):
+            d, a = chain[i], chain[i - 1]
+            b = chain[i - 2] if i >= 2 else n
+            steps.append({'trainee': self.chara_ids[d], 'parent': self.chara_ids[a],
+                          'grandparent': self.chara_ids[b] if b < n else 0, 'score': self.gain(d, a, b)})
+        return {'start': start, 'parent': parent, 'chain': [self.chara_ids[c] for c in chain[len(prefix) - 1:]],
+                'steps': steps, 'total': total}
+
+# --- Parallel Planning ---
+
+_worker_planner: Optional[LineagePlanner] = None
+
+def _init_worker(state: Tuple):
+    global _worker_planner
+    _worker_planner = LineagePlanner.from_state(state)
+
+def _plan_batch(starts: List[int], generations: int) -> List[Optional[Dict[str, Any]]]:
+    return [_worker_planner.plan(start, generations) for start in starts]
+
+def plan_all(planner: LineagePlanner, starts: List[int], generations: int,
+             jobs: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Plans from every starting trainee, spreading them over worker processes, and returns
+    the plans sorted by total affinity. The DP tables are built once and shipped to workers.
+    """
+    planner.prepare(generations)
+    jobs = min(jobs or os.cpu_count() or 1, len(starts))
+    if jobs <= 1:
+        plans = [planner.plan(start, generations) for start in starts]
+    else:
+        batches = [starts[i::jobs] for i in range(jobs)]
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(planner.to_state(),)) as pool:
+            plans = [plan for batch in pool.map(_plan_batch, batches, [generations] * jobs) for plan in batch]
+    plans = [plan for plan in plans if plan]
+    plans.sort(key=lambda plan: (-plan['total'], plan['start']))
+    return plans
+
+def owned_characters(inventory_path: Path, uma_list_path: Path = UMA_LIST_PATH) -> Set[int]:
+    """Character IDs of the non-borrowed parents in an inventory export."""
+    with open(uma_list_path, 'r', encoding='utf-8') as f:
+        outfit_to_chara = {u['id']: int(u['characterId']) for u in json.load(f)}
+    inventory = load_export(inventory_path)['inventory']
+    return {outfit_to_chara[str(p.get('umaId'))] for p in inventory
+            if not p.get('isBorrowed') and str(p.get('umaId')) in outfit_to_chara}
+
+# --- Main CLI Logic ---
+
+def print_plan(plan: Dict[str, Any], chara_map: Dict[int, str]):
+    def name(chara_id: int) -> str:
+        return f"{chara_map.get(chara_id, 'Unknown')} ({chara_id})"
+    print(f"\n--- {name(plan['start'])}: total affinity {plan['total']} ---")
+    for generation, step in enumerate(plan['steps'], 1):
+        grandparent = f" / GP {name(step['grandparent'])}" if step['grandparent'] else ""
+        print(f"  Gen {generation}: {name(step['trainee'])} <- P {name(step['parent'])}{grandparent}: {step['score']}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Plans multi-generation breeding chains that maximize cumulative affinity."
+    )
+    parser.add_argument("data_path", type=Path, help="Path to an affinity_*.json file.")
+    parser.add_argument("--start", type=int, nargs='+', help="Starting trainee ID(s) (defaults to every character).")
+    parser.add_argument("--parent", type=int, default=0, help="The starting trainee's own parent, if known.")
+    parser.add_argument("-g", "--generations", type=int, default=DEFAULT_GENERATIONS, help="Generations to plan ahead.")
+    parser.add_argument("--owned", type=int, nargs='+', help="Only breed these character IDs.")
+    parser.add_argument("--inventory", type=Path, help="Only breed characters owned in this inventory export.")
+    parser.add_argument("--no-repeats", action="store_true", help="Use each character at most once per chain.")
+    parser.add_argument("--beam", type=int, default=DEFAULT_BEAM_WIDTH, help="Beam width for the chain search.")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of plans to show.")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (defaults to the CPU count).")
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    if args.generations < 1:
+        parser.error("--generations must be at least 1")
+    if args.parent and (not args.start or len(args.start) != 1):
+        parser.error("--parent requires exactly one --start trainee")
+
+    with instrumented(args, 'lineage_planner'):
+        try:
+            calculator = AffinityCalculator(args.data_path, use_snapshots=True)
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            return
+
+        allowed: Optional[Set[int]] = None
+        if args.owned:
+            allowed = set(args.owned)
+        if args.inventory:
+            owned = owned_characters(args.inventory)
+            allowed = owned if allowed is None else allowed & owned
+
+        with phase('index build'):
+            planner = LineagePlanner.for_calculator(calculator, allowed=allowed, no_repeats=args.no_repeats,
+                                                    beam_width=args.beam)
+        starts = args.start or planner.chara_ids
+        unknown = [s for s in starts if s not in planner.position]
+        if unknown:
+            print(f"Error: Unknown character ID(s): {', '.join(map(str, unknown))}")
+            return
+
+        with phase('plan'):
+            if args.parent:
+                plan = planner.plan(starts[0], args.generations, args.parent)
+                plans = [plan] if plan else []
+            else:
+                plans = plan_all(planner, starts, args.generations, args.jobs)
+
+        with phase('output'):
+            if not plans:
+                print("No chain satisfies the constraints.")
+            for plan in plans[:args.top]:
+                print_plan(plan, calculator.chara_map)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+from snapshots import SNAPSHOT_DIRNAME, write_atomic
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+PUBLIC_DIR = PROJECT_ROOT / 'public'
+UMA_LIST_PATH = PROJECT_ROOT / 'src' / 'data' / 'uma-list.json'
+OUTPUT_DIR = PUBLIC_DIR / 'images' / 'umas-thumbs'
+BUILD_CACHE_DIR = PROJECT_ROOT / 'raw_data' / SNAPSHOT_DIRNAME
+
+# CSS pixel sizes the UI renders character images at (lineage, suggestions, modals, selection slots).
+SIZES = (32, 40, 64, 96)
+DENSITIES = (1, 2)
+FORMATS = ('webp', 'avif')
+# WebP method 6 and AVIF's default speed cost ~100x and ~3x the encode time for a few percent.
+ENCODER_OPTIONS = {'webp': {'quality': 82, 'method': 4}, 'avif': {'quality': 60, 'speed': 8}}
+# Bump when the rendering changes to invalidate every cached output.
+BUILDER_VERSION = 2
+
+# --- Pillow ---
+# Pillow is only needed by this script, so it is imported on demand and its absence is
+# reported instead of failing at import time.
+
+def load_pillow():
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+def supported_formats(requested: Tuple[str, ...]) -> Tuple[str, ...]:
+    """The requested formats this Pillow build can encode (AVIF needs Pillow 11.3+ or a plugin)."""
+    Image = load_pillow()
+    if Image is None:
+        return ()
+    extensions = Image.registered_extensions()
+    if '.avif' not in extensions:
+        try:
+            import pillow_avif  # noqa: F401 (registers the AVIF codec)
+            extensions = Image.registered_extensions()
+        except ImportError:
+            pass
+    return tuple(f for f in requested if f".{f}" in extensions and extensions[f".{f}"] in Image.SAVE)
+
+# --- Variants ---
+
+def variant_name(size: int, density: int) -> str:
+    return f"{size}@{density}x" if density > 1 else str(size)
+
+def variants(sizes: Tuple[int, ...], densities: Tuple[int, ...]) -> Dict[str, int]:
+    """Variant name -> pixel size, e.g. {'64': 64, '64@2x': 128}."""
+    return {variant_name(size, density): size * density for size in sizes for density in densities}
+
+def _resized(Image, image, pixels: int):
+    """
+    A square RGBA copy of `image` at `pixels`, or at the source size if that is smaller:
+    upscaling only makes files larger without adding detail, and the UI sizes images by CSS.
+    """
+    pixels = min(pixels, image.width, image.height)
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    return image.resize((pixels, pixels), Image.LANCZOS, reducing_gap=3.0)
+
+def _save(image, path: Path, fmt: str):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.upper(), **ENCODER_OPTIONS[fmt])
+    write_atomic(path, buffer.getvalue())
+
+# --- Workers ---
+
+def render_thumbnails(outfit_id: str, source: Path, output_dir: Path,
+                      variant_pixels: Dict[str, int], formats: Tuple[str, ...]) -> str:
+    """Writes every variant and format of one outfit's thumbnail. Runs in a worker process."""
+    Image = load_pillow()
+    with Image.open(source) as original:
+        original = original.convert('RGBA')
+        # Every variant is resized straight from the source so errors don't compound.
+        for variant, pixels in variant_pixels.items():
+            thumbnail = _resized(Image, original, pixels)
+            (output_dir / variant).mkdir(parents=True, exist_ok=True)
+            for fmt in formats:
+                _save(thumbnail, output_dir / variant / f"{outfit_id}.{fmt}", fmt)
+    return outfit_id
+
+def render_atlas(variant: str, pixels: int, sources: List[Tuple[str, Path]], output_dir: Path,
+                 formats: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Packs one variant of every outfit into a grid and writes it with a content-hashed name.
+    Tiles are capped at the smallest source so no sprite is upscaled. Returns the
+    coordinate map. Runs in a worker process.
+    """
+    Image = load_pillow()
+    for _, source in sources:
+        with Image.open(source) as image:  # Only reads the header.
+            pixels = min(pixels, image.width, image.height)
+    columns = max(1, math.ceil(math.sqrt(len(sources))))
+    rows = max(1, math.ceil(len(sources) / columns))
+    atlas = Image.new('RGBA', (columns * pixels, rows * pixels), (0, 0, 0, 0))
+    sprites = {}
+    for i, (outfit_id, source) in enumerate(sources):
+        x, y = (i % columns) * pixels, (i // columns) * pixels
+        with Image.open(source) as image:
+            atlas.paste(_resized(Image, image, pixels), (x, y))
+        sprites[outfit_id] = [x, y, pixels, pixels]
+
+    digest = hashlib.blake2b(atlas.tobytes(), digest_size=8).hexdigest()
+    images = {}
+    for fmt in formats:
+        filename = f"atlas-{variant}.{digest}.{fmt}"
+        if not (output_dir / filename).exists():
+            _save(atlas, output_dir / filename, fmt)
+        images[fmt] = filename
+    return {'variant': variant, 'tileSize': pixels, 'width': atlas.width, 'height': atlas.height,
+            'images': images, 'sprites': sprites}
+
+# --- Build ---
+
+def outfit_sources(uma_list_path: Path, public_dir: Path) -> Dict[str, Path]:
+    """Outfit ID -> source image for every outfit in uma-list.json that has one."""
+    with open(uma_list_path, 'r', encoding='utf-8') as f:
+        umas = json.load(f)
+    sources = {}
+    for uma in umas:
+        if uma.get('image'):
+            path = public_dir / uma['image'].lstrip('/')
+            if path.is_file():
+                sources[str(uma['id'])] = path
+    return dict(sorted(sources.items()))
+
+def _digest_file(path: Path) -> str:
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+def _load_json_or(path: Path, default: Any) -> Any:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+def _write_json(path: Path, data: Any):
+    write_atomic(path, (json.dumps(data, indent=2, sort_keys=True) + '\n').encode('utf-8'))
+
+def build_cache_path(output_dir: Path) -> Path:
+    """
+    Build state for one output directory. It is kept under raw_data/.snapshots rather
+    than next to the (published) outputs, so it is keyed by the output path instead.
+    """
+    key = hashlib.blake2b(str(output_dir.resolve()).encode('utf-8'), digest_size=8).hexdigest()
+    return BUILD_CACHE_DIR / f"uma_images.{key}.json"
+
+def build_images(uma_list_path: Path = UMA_LIST_PATH, public_dir: Path = PUBLIC_DIR,
+                 output_dir: Path = OUTPUT_DIR, cache_path: Optional[Path] = None,
+                 sizes: Tuple[int, ...] = SIZES, densities: Tuple[int, ...] = DENSITIES,
+                 formats: Tuple[str, ...] = FORMATS, jobs: Optional[int] = None,
+                 force: bool = False) -> Dict[str, Any]:
+    """
+    Brings thumbnails and atlases in `output_dir` up to date and returns a summary. An
+    outfit is only re-rendered when the content hash of its source image changed (or an
+    output is missing); atlases are only re-packed when the set of sources changed.
+    """
+    cache_path = cache_path or build_cache_path(output_dir)
+    variant_pixels = variants(sizes, densities)
+    settings = {'version': BUILDER_VERSION, 'variants': variant_pixels, 'formats': list(formats),
+                'encoder': {fmt: ENCODER_OPTIONS[fmt] for fmt in formats}}
+    cache = _load_json_or(cache_path, {})
+    if cache.get('settings') != settings or force:
+        cache = {'settings': settings, 'outfits': {}, 'atlases': {}}
+
+    with phase('load', file='sources'):
+        sources = outfit_sources(uma_list_path, public_dir)
+        digests = {outfit_id: _digest_file(path) for outfit_id, path in sources.items()}
+
+    def outputs_exist(outfit_id: str) -> bool:
+        return all((output_dir / variant / f"{outfit_id}.{fmt}").exists()
+                   for variant in variant_pixels for fmt in formats)
+
+    dirty = [outfit_id for outfit_id, digest in digests.items()
+             if cache['outfits'].get(outfit_id) != digest or not outputs_exist(outfit_id)]
+
+    # Atlases depend on every source, so one digest over all of them decides whether to re-pack.
+    sources_digest = hashlib.blake2b(json.dumps(digests, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+    dirty_atlases = [variant for variant in variant_pixels
+                     if cache['atlases'].get(variant) != sources_digest
+                     or not (output_dir / f"atlas-{variant}.json").exists()]
+
+    workers = min(jobs or os.cpu_count() or 1, max(len(dirty), len(dirty_atlases), 1))
+    with phase('render', outfits=len(dirty), atlases=len(dirty_atlases)):
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            run = pool.map if pool else map
+            for outfit_id in run(render_thumbnails, dirty, [sources[o] for o in dirty], [output_dir] * len(dirty),
+                                 [variant_pixels] * len(dirty), [formats] * len(dirty)):
+                cache['outfits'][outfit_id] = digests[outfit_id]
+
+            atlas_sources = list(sources.items())
+            for atlas in run(render_atlas, dirty_atlases, [variant_pixels[v] for v in dirty_atlases],
+                             [atlas_sources] * len(dirty_atlases), [output_dir] * len(dirty_atlases),
+                             [formats] * len(dirty_atlases)):
+                _write_json(output_dir / f"atlas-{atlas['variant']}.json", atlas)
+                cache['atlases'][atlas['variant']] = sources_digest
+        finally:
+            if pool:
+                pool.shutdown()
+
+    with phase('output', file=cache_path.name):
+        removed = _prune(output_dir, set(sources), variant_pixels, formats)
+        cache['outfits'] = {o: d for o, d in cache['outfits'].items() if o in sources}
+        _write_json(cache_path, cache)
+
+    return {'outfits': len(sources), 'rendered': len(dirty), 'atlases': dirty_atlases,
+            'removed': removed, 'formats': formats}
+
+def _prune(output_dir: Path, live: set, variant_pixels: Dict[str, int], formats: Tuple[str, ...]) -> int:
+    """Removes thumbnails of outfits that no longer exist and atlas images no map references."""
+    removed = 0
+    for variant in variant_pixels:
+        for path in (output_dir / variant).glob('*.*') if (output_dir / variant).is_dir() else ():
+            if path.stem not in live or path.suffix[1:] not in formats:
+                path.unlink()
+                removed += 1
+    referenced = set()
+    for map_path in output_dir.glob('atlas-*.json'):
+        referenced.update(_load_json_or(map_path, {}).get('images', {}).values())
+    for path in output_dir.glob('atlas-*.*'):
+        if path.suffix != '.json' and path.name not in referenced:
+            path.unlink()
+            removed += 1
+    return removed
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Renders resized WebP/AVIF thumbnails and sprite atlases for the character images "
+                    "in public/images/umas, re-rendering only outfits whose source image changed."
+    )
+    parser.add_argument("--out", type=Path, default=OUTPUT_DIR, help="Output directory for thumbnails and atlases.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=list(SIZES), help="CSS pixel sizes to render.")
+    parser.add_argument("--densities", type=int, nargs='+', default=list(DENSITIES), help="Pixel densities to render each size at.")
+    parser.add_argument("--formats", nargs='+', default=list(FORMATS), choices=FORMATS, help="Output formats.")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (defaults to the CPU count).")
+    parser.add_argument("--force", action="store_true", help="Re-render everything even if the sources are unchanged.")
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    if load_pillow() is None:
+        print("Error: Pillow is required to build images. Install it with 'pip install Pillow'.")
+        raise SystemExit(1)
+    formats = supported_formats(tuple(args.formats))
+    for fmt in args.formats:
+        if fmt not in formats:
+            print(f"Warning: this Pillow build cannot write {fmt.upper()}; skipping it.")
+    if not formats:
+        print("Error: none of the requested formats can be written.")
+        raise SystemExit(1)
+
+    with instrumented(args, 'optimize_uma_images'):
+        summary = build_images(output_dir=args.out, sizes=tuple(args.sizes), densities=tuple(args.densities),
+                               formats=formats, jobs=args.jobs, force=args.force)
+
+    if not summary['rendered'] and not summary['atlases']:
+        print(f"All {summary['outfits']} outfit image(s) are up to date.")
+        return
+    print(f"Rendered {summary['rendered']} of {summary['outfits']} outfit(s) as {', '.join(summary['formats'])}.")
+    if summary['atlases']:
+        print(f"Packed atlases: {', '.join(summary['atlases'])}")
+    if summary['removed']:
+        print(f"Removed {summary['removed']} stale file(s).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+import argparse
+import hashlib
+import json
+import marshal
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+from generate_translation_file import CATEGORIES, scenario_factor_id, skill_category
+from snapshots import SNAPSHOT_DIRNAME, decode_json, write_atomic
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+RAW_DATA_DIR = PROJECT_ROOT / 'raw_data'
+DATA_DIR = PROJECT_ROOT / 'src' / 'data'
+TRANSLATIONS_DIR = DATA_DIR / 'community_translations'
+EXCLUSIONS_PATH = DATA_DIR / 'skill-exclusions.json'
+UMA_IMAGES_DIR = PROJECT_ROOT / 'public' / 'images' / 'umas'
+CACHE_DIR = RAW_DATA_DIR / SNAPSHOT_DIRNAME / 'pipeline'
+
+# Bump when any stage's output format changes to invalidate every cached result.
+PIPELINE_VERSION = 1
+CACHE_ENTRIES_PER_STAGE = 4
+VERSIONS = ('jp', 'global')
+
+# Per-version raw files read by the game_data stage, with the value used when a file is missing.
+# factors.json is written by prepare_raw_factors.py and holds rows of the succession_factor
+# table joined with their text and hinted skill:
+#   {"factor_id", "factor_group_id", "factor_type", "rarity", "grade", "name", "description", "skill_id"?}
+# affinity_components.json is written by prepare_raw_affinity_components.py.
+RAW_FILES = {
+    'umas': {},
+    'skillnames': {},
+    'skill_meta': {},
+    'skilldescs': {},
+    'factors': [],
+}
+CATEGORY_ORDER = {'blue': 0, 'pink': 1, 'unique': 2, 'white': 3}
+UMA_CATEGORIES = ('characters', 'outfits')
+SKILL_CATEGORIES = ('skills_unique', 'skills_normal', 'skills_misc')
+
+# --- Stages ---
+
+class Stage:
+    """
+    One node of the build graph. `build` receives the values of `deps` (by name) and
+    returns either an intermediate value or, for output stages, {path: bytes}.
+    A stage is skipped when any of its `required` sources is missing.
+    """
+    def __init__(self, name: str, build: Callable[..., Any], sources: Callable[[], List[Path]],
+                 deps: Tuple[str, ...] = (), outputs: bool = False, required: Callable[[], List[Path]] = None):
+        self.name = name
+        self.build = build
+        self.sources = sources
+        self.deps = deps
+        self.outputs = outputs
+        self.required = required or (lambda: [])
+
+class Paths:
+    """Every location the pipeline reads from or writes to, so runs can be pointed elsewhere."""
+    def __init__(self, raw_data_dir: Path = RAW_DATA_DIR, data_dir: Path = DATA_DIR,
+                 translations_dir: Path = TRANSLATIONS_DIR, exclusions_path: Path = EXCLUSIONS_PATH,
+                 images_dir: Path = UMA_IMAGES_DIR, cache_dir: Path = CACHE_DIR):
+        self.raw_data_dir = raw_data_dir
+        self.data_dir = data_dir
+        self.translations_dir = translations_dir
+        self.exclusions_path = exclusions_path
+        self.images_dir = images_dir
+        self.cache_dir = cache_dir
+
+    def raw(self, version: str, name: str) -> Path:
+        return self.raw_data_dir / version / f"{name}.json"
+
+def _read_json(path: Path, default: Any) -> Any:
+    try:
+        with phase('load', file=path.name):
+            return decode_json(path.read_bytes())
+    except FileNotFoundError:
+        return default
+
+def _dump_list(data: List[Dict[str, Any]]) -> bytes:
+    # Matches the existing files: two-space indent, raw UTF-8, no trailing newline.
+    # orjson's indented output is byte-identical to json.dumps' here and far faster,
+    # since the stdlib has no C accelerator for indented encoding.
+    try:
+        import orjson
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    except (ImportError, TypeError):
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+def build_game_data(paths: Paths) -> Dict[str, Any]:
+    """Loads every raw file for both servers into one structure."""
+    return {version: {name: _read_json(paths.raw(version, name), default) for name, default in RAW_FILES.items()}
+            for version in VERSIONS}
+
+def build_translations(paths: Paths, categories: Tuple[str, ...]) -> Dict[str, Dict[str, str]]:
+    """Returns category -> id -> community translation, keeping only filled-in entries."""
+    translations = {}
+    for category in categories:
+        entries = _read_json(paths.translations_dir / CATEGORIES[category], {})
+        translations[category] = {entry_id: entry['unofficialTranslation'] for entry_id, entry in entries.items()
+                                  if entry.get('unofficialTranslation')}
+    return translations
+
+def _image_names(paths: Paths) -> List[str]:
+    try:
+        return sorted(p.name for p in paths.images_dir.iterdir() if p.is_file())
+    except FileNotFoundError:
+        return []
+
+def unique_skill_id(outfit_id: str) -> str:
+    """The active unique skill of an outfit, e.g. 101901 -> 100191 (see query_data.display_uma_info)."""
+    char_num, version_num = int(outfit_id[1:4]), int(outfit_id[4:])
+    return str(100000 + 10000 * (version_num - 1) + char_num * 10 + 1)
+
+def build_uma_list(paths: Paths, game_data: Dict[str, Any], translations: Dict[str, Dict[str, str]]) -> Dict[Path, bytes]:
+    jp_umas, gl_umas = game_data['jp']['umas'], game_data['global']['umas']
+    known_skills = set(game_data['jp']['skillnames']) | set(game_data['global']['skillnames'])
+    images = {}
+    for image_name in _image_names(paths):
+        images.setdefault(image_name.rsplit('.', 1)[0], image_name)
+
+    umas = []
+    for char_id in sorted(set(jp_umas) | set(gl_umas)):
+        jp_uma, gl_uma = jp_umas.get(char_id, {}), gl_umas.get(char_id, {})
+        jp_name = (jp_uma.get('name') or [None, None])[0] or (gl_uma.get('name') or [None, None])[0]
+        gl_name = (gl_uma.get('name') or [None, None])[1]
+        base_name_en = gl_name or translations['characters'].get(char_id) or jp_name
+        jp_outfits, gl_outfits = jp_uma.get('outfits') or {}, gl_uma.get('outfits') or {}
+        for outfit_id in sorted(set(jp_outfits) | set(gl_outfits)):
+            outfit_jp = jp_outfits.get(outfit_id) or gl_outfits.get(outfit_id)
+            skill_id = unique_skill_id(outfit_id)
+            uma = {
+                'id': outfit_id,
+                'characterId': char_id,
+                'base_name_jp': jp_name,
+                'base_name_en': base_name_en,
+                'outfit_name_jp': outfit_jp,
+                'outfit_name_en': gl_outfits.get(outfit_id) or translations['outfits'].get(outfit_id) or outfit_jp,
+                'isGlobal': outfit_id in gl_outfits,
+                'activeUniqueSkillId': int(skill_id) if skill_id in known_skills else None,
+            }
+            if outfit_id in images:
+                uma['image'] = f"/images/umas/{images[outfit_id]}"
+            umas.append(uma)
+    umas.sort(key=lambda u: (u['base_name_en'] or '', u['id']))
+    return {paths.data_dir / 'uma-list.json': _dump_list(umas)}
+
+def _factor_category(row: Dict[str, Any]) -> str:
+    # See docs/uma_factors.md: type 1 is blue, 2 is pink, type 3 with grade 2 is a unique.
+    factor_type = row.get('factor_type')
+    if factor_type == 1:
+        return 'blue'
+    if factor_type == 2:
+        return 'pink'
+    if factor_type == 3 and row.get('grade') == 2:
+        return 'unique'
+    return 'white'
+
+def _group_factors(rows: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    groups: Dict[int, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(row['factor_group_id'], []).append(row)
+    for group in groups.values():
+        group.sort(key=lambda r: r['rarity'])
+    return groups
+
+def _community_name(translations: Dict[str, Dict[str, str]], category: str, skill_id: Optional[int],
+                    jp_name: Optional[str]) -> Optional[str]:
+    if skill_id is not None:
+        return translations[skill_category(str(skill_id))].get(str(skill_id))
+    if category == 'white' and jp_name:
+        return translations['skills_misc'].get(scenario_factor_id(jp_name))
+    return None
+
+def build_skill_list(paths: Paths, game_data: Dict[str, Any], translations: Dict[str, Dict[str, str]]) -> Dict[Path, bytes]:
+    jp, gl = game_data['jp'], game_data['global']
+    jp_groups, gl_groups = _group_factors(jp['factors']), _group_factors(gl['factors'])
+    skill_meta = {**jp['skill_meta'], **gl['skill_meta']}
+
+    skills = []
+    for group_id in sorted(set(jp_groups) | set(gl_groups)):
+        rows = jp_groups.get(group_id) or gl_groups[group_id]
+        jp_first = (jp_groups.get(group_id) or [{}])[0]
+        gl_first = (gl_groups.get(group_id) or [{}])[0]
+        first = rows[0]
+        category = _factor_category(first)
+        name_jp = jp_first.get('name') or gl_first.get('name')
+        skill = {
+            'id': group_id,
+            'factorId': first['factor_id'],
+            'factorType': first['factor_type'],
+            'name_jp': name_jp,
+            'name_en': gl_first.get('name') or _community_name(translations, category, first.get('skill_id'), name_jp),
+            'description_jp': jp_first.get('description') or gl_first.get('description'),
+            'description_en': gl_first.get('description'),
+            'category': category,
+            'rarities': [{'rarity': row['rarity'], 'factorId': row['factor_id']} for row in rows],
+            'isGlobal': group_id in gl_groups,
+        }
+        if 'skill_id' in first:
+            skill['activeSkillId'] = first['skill_id']
+            purchasable = '9' + str(first['skill_id'])[1:] if category == 'unique' and first['skill_id'] else None
+            if purchasable not in gl['skillnames'] and purchasable not in jp['skillnames']:
+                purchasable = None
+            skill['purchasableSkillId'] = int(purchasable) if purchasable else None
+            if purchasable:
+                if 'baseCost' in skill_meta.get(purchasable, {}):
+                    skill['sp_cost'] = skill_meta[purchasable]['baseCost']
+                skill['name_jp_skill'] = (jp['skillnames'].get(purchasable) or gl['skillnames'][purchasable])[0]
+                skill['name_en_skill'] = ((gl['skillnames'].get(purchasable) or [None, None])[1]
+                                          or translations['skills_unique'].get(purchasable) or skill['name_jp_skill'])
+                jp_desc = (jp['skilldescs'].get(purchasable) or [None, None])[0]
+                gl_desc = (gl['skilldescs'].get(purchasable) or [None, None])[1]
+                if jp_desc or gl_desc:
+                    skill['description_jp_skill'] = jp_desc or gl_desc
+                    skill['description_en_skill'] = gl_desc or jp_desc
+        skills.append(skill)
+    skills.sort(key=lambda s: (CATEGORY_ORDER[s['category']], s['name_jp'] or ''))
+
+    excluded = {str(skill_id) for skill_id in _read_json(paths.exclusions_path, [])}
+    dev_content = _dump_list(skills)
+    # skill-list-dev.json always lists everything (the dev tools pick exclusions from it);
+    # without exclusions the two files are byte-identical.
+    content = _dump_list([s for s in skills if str(s['id']) not in excluded]) if excluded else dev_content
+    return {paths.data_dir / 'skill-list-dev.json': dev_content, paths.data_dir / 'skill-list.json': content}
+
+def build_affinity(paths: Paths, version: str) -> Dict[Path, bytes]:
+    data = _read_json(paths.raw(version, 'affinity_components'), {})
+    components = {key: data.get(key, {}) for key in ('chara_map', 'relation_points', 'chara_relations')}
+    return {paths.data_dir / f"affinity_{version}.json": json.dumps(components, ensure_ascii=False).encode('utf-8')}
+
+def make_stages(paths: Paths) -> Dict[str, Stage]:
+    """The build graph: raw_data + community translations -> merged data -> app data files."""
+    raw_sources = lambda: [paths.raw(v, name) for v in VERSIONS for name in RAW_FILES]
+    stages = [
+        Stage('game_data', lambda deps: build_game_data(paths), raw_sources,
+              required=lambda: [paths.raw('jp', 'umas')]),
+        # Translations are split by consumer so that editing a character name doesn't
+        # rebuild the skill list and vice versa.
+        Stage('uma_translations', lambda deps: build_translations(paths, UMA_CATEGORIES),
+              lambda: [paths.translations_dir / CATEGORIES[c] for c in UMA_CATEGORIES]),
+        Stage('skill_translations', lambda deps: build_translations(paths, SKILL_CATEGORIES),
+              lambda: [paths.translations_dir / CATEGORIES[c] for c in SKILL_CATEGORIES]),
+        Stage('uma_list', lambda deps: build_uma_list(paths, deps['game_data'], deps['uma_translations']),
+              lambda: [paths.images_dir], deps=('game_data', 'uma_translations'), outputs=True),
+        Stage('skill_list', lambda deps: build_skill_list(paths, deps['game_data'], deps['skill_translations']),
+              lambda: [paths.exclusions_path], deps=('game_data', 'skill_translations'), outputs=True,
+              required=lambda: [paths.raw('jp', 'factors')]),
+    ]
+    for version in VERSIONS:
+        stages.append(Stage(f"affinity_{version}", lambda deps, v=version: build_affinity(paths, v),
+                            lambda v=version: [paths.raw(v, 'affinity_components')], outputs=True,
+                            required=lambda v=version: [paths.raw(v, 'affinity_components')]))
+    return {stage.name: stage for stage in stages}
+
+# --- Content Addressing ---
+
+class DigestIndex:
+    """
+    Content digests of source files, memoized by (mtime, size) like git's index so that
+    unchanged files are never re-read. Directories digest their sorted file listing.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'rb') as f:
+                self.entries = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+    def digest(self, source: Path) -> str:
+        try:
+            stat = source.stat()
+        except FileNotFoundError:
+            return 'missing'
+        key = str(source)
+        with self._lock:
+            cached = self.entries.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        if source.is_dir():
+            content = '\n'.join(p.name for p in sorted(source.iterdir())).encode('utf-8')
+        else:
+            content = source.read_bytes()
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        with self._lock:
+            self.entries[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def save(self):
+        if not self.entries:
+            return
+        write_atomic(self.path, marshal.dumps(self.entries))
+
+class Pipeline:
+    """
+    Runs the stage graph. Every stage gets a key hashed from its name, its sources'
+    content digests and its dependencies' keys; results are cached on disk under that
+    key, so a stage reruns only when something it depends on actually changed. Stages
+    whose dependencies are resolved run in parallel.
+    """
+    def __init__(self, paths: Paths, jobs: Optional[int] = None, force: bool = False):
+        self.paths = paths
+        self.stages = make_stages(paths)
+        self.jobs = jobs or min(len(self.stages), os.cpu_count() or 1)
+        self.force = force
+        self.digests = DigestIndex(paths.cache_dir / 'digests.marshal')
+        self.keys: Dict[str, str] = {}
+        self.status: Dict[str, str] = {}
+        self._values: Dict[str, Any] = {}
+        self._value_locks = {name: threading.Lock() for name in self.stages}
+
+    def _cache_path(self, name: str) -> Path:
+        return self.paths.cache_dir / f"{name}.{self.keys[name]}.marshal"
+
+    def compute_keys(self):
+        for name in self._topological_order():
+            stage = self.stages[name]
+            missing = [p.name for p in stage.required() if not p.exists()]
+            missing += [dep for dep in stage.deps if self.keys.get(dep) is None]
+            if missing:
+                self.keys[name] = None
+                self.status[name] = f"skipped (missing {', '.join(missing)})"
+                continue
+            digest = hashlib.blake2b(f"{PIPELINE_VERSION}:{name}".encode('utf-8'), digest_size=16)
+            for source in stage.sources():
+                digest.update(f"{source}={self.digests.digest(source)};".encode('utf-8'))
+            for dep in stage.deps:
+                digest.update(f"{dep}={self.keys[dep]};".encode('utf-8'))
+            self.keys[name] = digest.hexdigest()
+
+    def _topological_order(self) -> List[str]:
+        order, seen = [], set()
+        def visit(name):
+            if name not in seen:
+                seen.add(name)
+                for dep in self.stages[name].deps:
+                    visit(dep)
+                order.append(name)
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def value(self, name: str) -> Any:
+        """Returns a stage's result, loading it from the cache or building it at most once."""
+        with self._value_locks[name]:
+            if name in self._values:
+                return self._values[name]
+            cache_path = self._cache_path(name)
+            value = None
+            if not self.force and cache_path.exists():
+                with phase('load', file=f"cache/{cache_path.name}"), open(cache_path, 'rb') as f:
+                    value = marshal.loads(f.read())
+                self.status[name] = 'cached'
+            if value is None:
+                stage = self.stages[name]
+                deps = {dep: self.value(dep) for dep in stage.deps}
+                start = time.perf_counter()
+                with phase('build', stage=name):
+                    value = stage.build(deps)
+                if stage.outputs:
+                    value = {str(path): content for path, content in value.items()}
+                self._store(name, value)
+                self.status[name] = f"built in {(time.perf_counter() - start) * 1000:.1f}ms"
+            self._values[name] = value
+            return value
+
+    def _store(self, name: str, value: Any):
+        cache_path = self._cache_path(name)
+        write_atomic(cache_path, marshal.dumps(value))
+        # Keep a few recent results per stage so reverting an edit is also a cache hit.
+        entries = sorted(self.paths.cache_dir.glob(f"{name}.*.marshal"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in entries[CACHE_ENTRIES_PER_STAGE:]:
+            stale.unlink(missing_ok=True)
+
+    def _run_output_stage(self, name: str) -> List[str]:
+        written = []
+        for path_str, content in self.value(name).items():
+            path = Path(path_str)
+            try:
+                if path.read_bytes() == content:
+                    continue
+            except FileNotFoundError:
+                pass
+            with phase('output', file=path.name):
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(content)
+            written.append(path.name)
+        return written
+
+    def run(self) -> Dict[str, Any]:
+        with phase('load', file='source digests'):
+            self.compute_keys()
+        results: Dict[str, Any] = {}
+        # Only output stages are scheduled; intermediate stages are built on demand
+        # (and only once) when an output stage's cache entry is missing.
+        runnable = [name for name in self._topological_order() if self.stages[name].outputs]
+        todo = [name for name in runnable if self.keys[name] is not None]
+        with ThreadPoolExecutor(max_workers=max(1, self.jobs)) as pool:
+            for name, written in zip(todo, pool.map(self._run_output_stage, todo)):
+                results[name] = written
+        self.digests.save()
+        return results
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Builds uma-list.json, skill-list.json, skill-list-dev.json and affinity_*.json from "
+                    "raw_data and the community translations, rebuilding only what changed."
+    )
+    parser.add_argument("-j", "--jobs", type=int, help="Stages to run in parallel (defaults to the CPU count).")
+    parser.add_argument("--force", action="store_true", help="Ignore cached stage results and rebuild everything.")
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    print("--- Preparing app data ---")
+    with instrumented(args, 'prepare_data'):
+        pipeline = Pipeline(Paths(), jobs=args.jobs, force=args.force)
+        results = pipeline.run()
+
+    for name in pipeline.stages:
+        status = pipeline.status.get(name, 'up to date')
+        written = results.get(name)
+        suffix = f" -> wrote {', '.join(written)}" if written else ''
+        print(f"  {name:<16} {status}{suffix}")
+    if not any(results.values()):
+        print("No data files changed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import json
+import sqlite3
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+from snapshots import write_atomic
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+RAW_DATA_DIR = PROJECT_ROOT / 'raw_data'
+VERSIONS = ('jp', 'global')
+JSON_NAME = 'affinity_components.json'
+PACKED_NAME = 'affinity_components.bin'
+FETCH_SIZE = 4096
+# text_data category holding character names, indexed by chara_id.
+CHARA_NAME_CATEGORY = 6
+
+# --- Packed Format ---
+# All integers are little-endian. After the header come, in order:
+#   chara_ids    int32[chara_count]        sorted ascending
+#   offsets      uint32[chara_count + 1]   CSR offsets into `groups`
+#   groups       int32[offsets[-1]]        each character's relation groups, sorted ascending
+#   group_ids    int32[group_count]        sorted ascending
+#   points       int32[group_count]        points of the group at the same index
+#   name_offsets uint32[chara_count + 1]   offsets into the UTF-8 name blob
+#   names        bytes
+PACKED_MAGIC = b'UMAAFF'
+PACKED_FORMAT = 1
+_PACKED_HEADER = struct.Struct('<6sHIII')  # magic, format, chara_count, group_count, names size
+
+# --- Reading master.mdb ---
+
+def stream_rows(conn: sqlite3.Connection, query: str, params: Tuple = ()) -> Iterator[Tuple]:
+    """Yields the rows of a query in batches so large tables are never fully materialized."""
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+def read_components(db_path: Path, names: Dict[int, str]) -> Dict[str, Any]:
+    """
+    Reads the relationship group tables from a master.mdb into the affinity_*.json schema:
+      succession_relation         (relation_type, relation_point)
+      succession_relation_member  (relation_type, chara_id)
+    Characters without a name in `names` fall back to their text_data name.
+    """
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        with phase('query', table='succession_relation'):
+            relation_points = {group: points for group, points in stream_rows(
+                conn, "SELECT relation_type, relation_point FROM succession_relation ORDER BY relation_type")}
+
+        # Ordering by character lets each character's group list be built in one sweep.
+        chara_relations: Dict[int, List[int]] = {}
+        with phase('query', table='succession_relation_member'):
+            current_id, current = None, None
+            for chara_id, group in stream_rows(conn, "SELECT chara_id, relation_type FROM succession_relation_member "
+                                                    "ORDER BY chara_id, relation_type"):
+                if chara_id != current_id:
+                    current_id, current = chara_id, chara_relations.setdefault(chara_id, [])
+                if not current or current[-1] != group:
+                    current.append(group)
+
+        db_names: Dict[int, str] = {}
+        with phase('query', table='text_data'):
+            try:
+                db_names = dict(stream_rows(conn, 'SELECT "index", text FROM text_data WHERE category = ?',
+                                            (CHARA_NAME_CATEGORY,)))
+            except sqlite3.OperationalError:
+                pass
+    finally:
+        conn.close()
+
+    return {
+        'chara_map': {str(cid): names.get(cid) or db_names.get(cid) or str(cid) for cid in chara_relations},
+        'relation_points': {str(group): points for group, points in relation_points.items()},
+        'chara_relations': {str(cid): groups for cid, groups in chara_relations.items()},
+    }
+
+def load_names(raw_data_dir: Path, version: str) -> Dict[int, str]:
+    """
+    English character names from the extracted umas.json files, preferring the official
+    Global name so both versions' affinity files use the same names.
+    """
+    names: Dict[int, str] = {}
+    for source in dict.fromkeys((version, 'global')):
+        try:
+            with open(raw_data_dir / source / 'umas.json', 'r', encoding='utf-8') as f:
+                umas = json.load(f)
+        except FileNotFoundError:
+            continue
+        for chara_id, uma in umas.items():
+            name = (uma.get('name') or [None, None])[1]
+            if name:
+                names[int(chara_id)] = name
+    return names
+
+# --- Packed Encoding ---
+
+class PackedComponents:
+    """
+    Affinity components as flat int32 arrays. A character's groups are the slice
+    groups[offsets[i]:offsets[i + 1]] for its index i in the sorted chara_ids.
+    """
+    def __init__(self, chara_ids: array, offsets: array, groups: array,
+                 group_ids: array, points: array, names: List[str]):
+        self.chara_ids = chara_ids
+        self.offsets = offsets
+        self.groups = groups
+        self.group_ids = group_ids
+        self.points = points
+        self.names = names
+
+    @classmethod
+    def from_components(cls, components: Dict[str, Any]) -> 'PackedComponents':
+        relations = {int(k): sorted(set(v)) for k, v in components['chara_relations'].items()}
+        relation_points = sorted((int(k), v) for k, v in components['relation_points'].items())
+        chara_ids = array('i', sorted(relations))
+        offsets, groups = array('I', [0]), array('i')
+        for chara_id in chara_ids:
+            groups.extend(relations[chara_id])
+            offsets.append(len(groups))
+        names = [components['chara_map'].get(str(cid), '') for cid in chara_ids]
+        return cls(chara_ids, offsets, groups, array('i', (g for g, _ in relation_points)),
+                   array('i', (p for _, p in relation_points)), names)
+
+    def to_bytes(self) -> bytes:
+        name_blob = bytearray()
+        name_offsets = array('I', [0])
+        for name in self.names:
+            name_blob += name.encode('utf-8')
+            name_offsets.append(len(name_blob))
+        parts = [self.chara_ids, self.offsets, self.groups, self.group_ids, self.points, name_offsets]
+        if sys.byteorder == 'big':
+            parts = [array(part.typecode, part) for part in parts]
+            for part in parts:
+                part.byteswap()
+        header = _PACKED_HEADER.pack(PACKED_MAGIC, PACKED_FORMAT, len(self.chara_ids), len(self.group_ids), len(name_blob))
+        return header + b''.join(part.tobytes() for part in parts) + bytes(name_blob)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'PackedComponents':
+        magic, version, chara_count, group_count, names_size = _PACKED_HEADER.unpack_from(data)
+        if magic != PACKED_MAGIC or version != PACKED_FORMAT:
+            raise ValueError("Not a packed affinity components file (or an unsupported format version).")
+        view = memoryview(data)
+        position = _PACKED_HEADER.size
+
+        def take(typecode: str, count: int) -> array:
+            nonlocal position
+            values = array(typecode)
+            values.frombytes(view[position:position + count * values.itemsize])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            position += count * values.itemsize
+            return values
+
+        chara_ids = take('i', chara_count)
+        offsets = take('I', chara_count + 1)
+        groups = take('i', offsets[-1])
+        group_ids = take('i', group_count)
+        points = take('i', group_count)
+        name_offsets = take('I', chara_count + 1)
+        blob = bytes(view[position:position + names_size])
+        names = [blob[name_offsets[i]:name_offsets[i + 1]].decode('utf-8') for i in range(chara_count)]
+        return cls(chara_ids, offsets, groups, group_ids, points, names)
+
+    def to_components(self) -> Dict[str, Any]:
+        return {
+            'chara_map': {str(cid): name for cid, name in zip(self.chara_ids, self.names)},
+            'relation_points': {str(g): p for g, p in zip(self.group_ids, self.points)},
+            'chara_relations': {str(cid): self.groups_of(cid).tolist() for cid in self.chara_ids},
+        }
+
+    def groups_of(self, chara_id: int) -> array:
+        i = bisect_left(self.chara_ids, chara_id)
+        if i == len(self.chara_ids) or self.chara_ids[i] != chara_id:
+            return array('i')
+        return self.groups[self.offsets[i]:self.offsets[i + 1]]
+
+    def group_points(self, group: int) -> int:
+        i = bisect_left(self.group_ids, group)
+        return self.points[i] if i < len(self.group_ids) and self.group_ids[i] == group else 0
+
+    def score(self, *chara_ids: int) -> int:
+        """Sums the points of the groups shared by every character, merging the sorted group arrays."""
+        common = self.groups_of(chara_ids[0]).tolist()
+        for chara_id in chara_ids[1:]:
+            other = self.groups_of(chara_id)
+            merged, j, size = [], 0, len(other)
+            for group in common:
+                while j < size and other[j] < group:
+                    j += 1
+                if j == size:
+                    break
+                if other[j] == group:
+                    merged.append(group)
+            common = merged
+        return sum(self.group_points(group) for group in common)
+
+# --- Verification ---
+
+def find_score_mismatches(components: Dict[str, Any], packed: PackedComponents) -> List[Tuple[Tuple[int, ...], int, int]]:
+    """
+    Scores every pair of characters from the JSON form (set intersection, as
+    AffinityCalculator does) and from the packed form, returning any that disagree.
+    """
+    relation_points = {int(k): v for k, v in components['relation_points'].items()}
+    relations = {int(k): set(v) for k, v in components['chara_relations'].items()}
+    mismatches = []
+    for pair in combinations(sorted(relations), 2):
+        expected = sum(relation_points.get(g, 0) for g in relations[pair[0]] & relations[pair[1]])
+        actual = packed.score(*pair)
+        if expected != actual:
+            mismatches.append((pair, expected, actual))
+    return mismatches
+
+# --- Output ---
+
+def prepare_components(db_path: Path, version: str, out_dir: Optional[Path] = None,
+                       raw_data_dir: Path = RAW_DATA_DIR) -> Dict[str, Any]:
+    """
+    Extracts the affinity components of one game version and writes both forms to
+    `out_dir` (raw_data/<version> by default). Returns a summary; nothing is written
+    if the two forms disagree on any pair score.
+    """
+    out_dir = out_dir or raw_data_dir / version
+    components = read_components(db_path, load_names(raw_data_dir, version))
+    with phase('index build'):
+        packed = PackedComponents.from_components(components)
+        packed_bytes = packed.to_bytes()
+    with phase('verify'):
+        mismatches = find_score_mismatches(components, packed)
+        # The packed file is verified as it will be read back, not just as built.
+        roundtrip = PackedComponents.from_bytes(packed_bytes).to_components()
+        roundtrip_ok = roundtrip == {**components, 'chara_relations': {
+            k: sorted(set(v)) for k, v in components['chara_relations'].items()}}
+
+    summary = {
+        'characters': len(packed.chara_ids),
+        'groups': len(packed.group_ids),
+        'memberships': len(packed.groups),
+        'pairs': len(packed.chara_ids) * (len(packed.chara_ids) - 1) // 2,
+        'mismatches': mismatches,
+        'roundtrip_ok': roundtrip_ok,
+        'json_path': out_dir / JSON_NAME,
+        'packed_path': out_dir / PACKED_NAME,
+    }
+    if mismatches or not roundtrip_ok:
+        return summary
+
+    with phase('output', file=JSON_NAME):
+        # Same serialization as the affinity_*.json files the app loads.
+        write_atomic(out_dir / JSON_NAME, json.dumps(components, ensure_ascii=False).encode('utf-8'))
+    with phase('output', file=PACKED_NAME):
+        write_atomic(out_dir / PACKED_NAME, packed_bytes)
+    summary['json_size'] = (out_dir / JSON_NAME).stat().st_size
+    summary['packed_size'] = len(packed_bytes)
+    return summary
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extracts affinity relationship groups from a master.mdb into affinity_components.json "
+                    "and a packed binary form, verifying that both give the same scores."
+    )
+    parser.add_argument("db_path", type=Path, help="Path to the master.mdb file (JP or Global).")
+    parser.add_argument("--version", choices=VERSIONS, default='jp', help="Game version the database belongs to.")
+    parser.add_argument("--out", type=Path, help="Output directory (defaults to raw_data/<version>).")
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    if not args.db_path.exists():
+        print(f"Error: Database file not found at '{args.db_path}'")
+        raise SystemExit(1)
+
+    with instrumented(args, 'prepare_raw_affinity_components'):
+        try:
+            summary = prepare_components(args.db_path, args.version, args.out)
+        except sqlite3.Error as e:
+            print(f"An error occurred while reading the database: {e}")
+            raise SystemExit(1)
+
+    print(f"Read {summary['characters']} characters, {summary['groups']} relation groups "
+          f"and {summary['memberships']} memberships.")
+    if summary['mismatches']:
+        print(f"Error: {len(summary['mismatches'])} of {summary['pairs']} pair scores differ between the JSON "
+              "and packed forms. Nothing was written.")
+        for pair, expected, actual in summary['mismatches'][:10]:
+            print(f"  {pair}: json={expected} packed={actual}")
+        raise SystemExit(1)
+    if not summary['roundtrip_ok']:
+        print("Error: the packed form does not decode back to the same components. Nothing was written.")
+        raise SystemExit(1)
+
+    print(f"Verified all {summary['pairs']} pair scores match between the two forms.")
+    print(f"  {summary['json_path']} ({summary['json_size']:,} bytes)")
+    print(f"  {summary['packed_path']} ({summary['packed_size']:,} bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from instrumentation import phase, add_instrumentation_args, instrumented
+from prepare_raw_affinity_components import stream_rows
+from snapshots import write_atomic
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+RAW_DATA_DIR = PROJECT_ROOT / 'raw_data'
+VERSIONS = ('jp', 'global')
+FACTORS_NAME = 'factors.json'
+# text_data categories holding factor names and descriptions, indexed by factor_id.
+FACTOR_NAME_CATEGORY = 147
+FACTOR_DESCRIPTION_CATEGORY = 172
+# succession_factor_effect target_type of a skill hint; value_1 is the hinted skill_id.
+SKILL_HINT_TARGET_TYPE = 41
+
+# --- Reading master.mdb ---
+
+def read_factors(db_path: Path) -> List[Dict[str, Any]]:
+    """
+    Reads the spark definitions from a master.mdb into the factors.json rows that
+    prepare_data.py builds skill-list.json from (see RAW_FILES there):
+      succession_factor         (factor_id, factor_group_id, factor_type, rarity, grade)
+      succession_factor_effect  (factor_group_id, target_type, value_1), for skill hints
+      text_data                 names and descriptions by factor_id
+    Factors that hint no skill (stats, aptitudes, races, scenarios) have no skill_id.
+    """
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        with phase('query', table='succession_factor'):
+            factors = list(stream_rows(conn, "SELECT factor_id, factor_group_id, factor_type, rarity, grade "
+                                              "FROM succession_factor ORDER BY factor_id"))
+
+        # A group hints the same skill at every rarity; the lowest effect id is its primary effect.
+        skills: Dict[int, int] = {}
+        with phase('query', table='succession_factor_effect'):
+            for group_id, skill_id in stream_rows(conn, "SELECT factor_group_id, value_1 FROM succession_factor_effect "
+                                                        "WHERE target_type = ? ORDER BY factor_group_id, effect_id",
+                                                  (SKILL_HINT_TARGET_TYPE,)):
+                skills.setdefault(group_id, skill_id)
+
+        with phase('query', table='text_data'):
+            texts: Dict[int, Dict[int, str]] = {FACTOR_NAME_CATEGORY: {}, FACTOR_DESCRIPTION_CATEGORY: {}}
+            for category, index, text in stream_rows(conn, 'SELECT category, "index", text FROM text_data '
+                                                           'WHERE category IN (?, ?)',
+                                                     (FACTOR_NAME_CATEGORY, FACTOR_DESCRIPTION_CATEGORY)):
+                texts[category][index] = text
+    finally:
+        conn.close()
+
+    rows = []
+    for factor_id, group_id, factor_type, rarity, grade in factors:
+        row = {
+            'factor_id': factor_id,
+            'factor_group_id': group_id,
+            'factor_type': factor_type,
+            'rarity': rarity,
+            'grade': grade,
+            'name': texts[FACTOR_NAME_CATEGORY].get(factor_id),
+            'description': texts[FACTOR_DESCRIPTION_CATEGORY].get(factor_id),
+        }
+        if group_id in skills:
+            row['skill_id'] = skills[group_id]
+        rows.append(row)
+    return rows
+
+# --- Output ---
+
+def prepare_factors(db_path: Path, version: str, out_dir: Optional[Path] = None,
+                    raw_data_dir: Path = RAW_DATA_DIR) -> Dict[str, Any]:
+    """
+    Extracts the factors of one game version to `out_dir` (raw_data/<version> by default)
+    and returns a summary.
+    """
+    out_dir = out_dir or raw_data_dir / version
+    rows = read_factors(db_path)
+    with phase('output', file=FACTORS_NAME):
+        write_atomic(out_dir / FACTORS_NAME, json.dumps(rows, ensure_ascii=False).encode('utf-8'))
+    return {
+        'factors': len(rows),
+        'groups': len({row['factor_group_id'] for row in rows}),
+        'skill_hints': sum('skill_id' in row for row in rows),
+        'unnamed': sum(row['name'] is None for row in rows),
+        'path': out_dir / FACTORS_NAME,
+    }
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extracts inheritance factor (spark) definitions from a master.mdb into factors.json, "
+                    "the source prepare_data.py builds skill-list.json from."
+    )
+    parser.add_argument("db_path", type=Path, help="Path to the master.mdb file (JP or Global).")
+    parser.add_argument("--version", choices=VERSIONS, default='jp', help="Game version the database belongs to.")
+    parser.add_argument("--out", type=Path, help="Output directory (defaults to raw_data/<version>).")
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
+
+    if not args.db_path.exists():
+        print(f"Error: Database file not found at '{args.db_path}'")
+        raise SystemExit(1)
+
+    with instrumented(args, 'prepare_raw_factors'):
+        try:
+            summary = prepare_factors(args.db_path, args.version, args.out)
+        except sqlite3.Error as e:
+            print(f"An error occurred while reading the database: {e}")
+            raise SystemExit(1)
+
+    print(f"Read {summary['factors']} factors in {summary['groups']} groups "
+          f"({summary['skill_hints']} skill hints).")
+    if summary['unnamed']:
+        print(f"Warning: {summary['unnamed']} factor(s) have no name in text_data.")
+    print(f"  {summary['path']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,116 @@
-import json
 import argparse
 from pathlib import Path
 import re
 
+from instrumentation import phase, add_instrumentation_args, instrumented
+from snapshots import cached, decode_json, snapshot_path
+
 # --- Constants ---
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
 RAW_DATA_DIR = PROJECT_ROOT / 'raw_data'
 
+_file_loader = None
+
+def _get_file_loader():
+    # JP and Global files are read side by side; one worker is enough since the
+    # calling thread handles the other file. Created on first use so that warm
+    # starts served entirely from snapshots never import concurrent.futures.
+    global _file_loader
+    if _file_loader is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _file_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='query-data-load')
+    return _file_loader
+
 # --- Data Loading and Merging ---
 
 class GameData:
-    """A container for loaded and merged game data from JP and Global sources."""
-    def __init__(self, base_path: Path):
+    """
+    A container for loaded and merged game data from JP and Global sources.
+
+    Merged structures are cached as snapshots under `<base_path>/.snapshots` and
+    reused while their JP and Global sources are unchanged. `skill_data` and
+    `skill_meta` are only loaded when first used. With `compact_skills`,
+    `skill_data` is a CompactSkillData (same lookup API, a fraction of the memory)
+    for long-running callers.
+    """
+    def __init__(self, base_path: Path, use_snapshots: bool = True, compact_skills: bool = False):
         self.base_path = base_path
+        self.use_snapshots = use_snapshots
+        self.compact_skills = compact_skills
+        self._skill_data = None
+        self._skill_meta = None
         print("Loading and merging data...")
-        self.skill_data = self._load_and_merge('skill_data.json')
-        self.skill_meta = self._load_and_merge('skill_meta.json')
-        self.umas = self._load_and_merge('umas.json')
-        self.skill_names = self._load_skill_names()
+        self.umas = self._load_cached('umas.json', lambda: self._load_and_merge('umas.json'))
+        self.skill_names = self._load_cached('skillnames.json', self._load_skill_names)
         print("Data loading complete.")
 
+    @property
+    def skill_data(self):
+        if self._skill_data is None:
+            if self.compact_skills:
+                # Imported here so that callers using plain dicts don't pay for the module.
+                from compact_skills import CompactSkillData
+                state = self._load_cached('skill_data.json', self._build_compact_skill_data, 'skill_data.compact')
+                self._skill_data = CompactSkillData.from_state(state)
+            else:
+                self._skill_data = self._load_cached('skill_data.json', lambda: self._load_and_merge('skill_data.json'))
+        return self._skill_data
+
+    @property
+    def skill_meta(self):
+        if self._skill_meta is None:
+            self._skill_meta = self._load_cached('skill_meta.json', lambda: self._load_and_merge('skill_meta.json'))
+        return self._skill_meta
+
+    def preload(self):
+        """Loads the lazily loaded structures up front, for long-running callers."""
+        return self.skill_data, self.skill_meta
+
+    def _load_cached(self, filename: str, build, snapshot_name: str = None):
+        sources = [self.base_path / version / filename for version in ('jp', 'global')]
+        snapshot_name = snapshot_name or Path(filename).stem
+        return cached(snapshot_path(self.base_path, snapshot_name), sources, build, self.use_snapshots)
+
+    def _build_compact_skill_data(self):
+        skill_data = self._load_and_merge('skill_data.json')
+        from compact_skills import CompactSkillData
+        with phase('index build', structure='compact skill_data'):
+            return CompactSkillData.from_dict(skill_data).to_state()
+
+    # --- Source Files ---
+
     def _load_json(self, version: str, filename: str):
         file_path = self.base_path / version / filename
-        if file_path.exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+        try:
+            return decode_json(file_path.read_bytes())
+        except FileNotFoundError:
+            return {}
+
+    def _load_pair(self, filename: str):
+        """Loads the JP and Global copies of a file concurrently."""
+        with phase('load', file=filename):
+            jp_future = _get_file_loader().submit(self._load_json, 'jp', filename)
+            gl_data = self._load_json('global', filename)
+            return jp_future.result(), gl_data
 
     def _load_and_merge(self, filename: str):
-        jp_data = self._load_json('jp', filename)
-        gl_data = self._load_json('global', filename)
+        jp_data, gl_data = self._load_pair(filename)
         # Global data takes precedence where keys overlap
-        return {**jp_data, **gl_data}
+        with phase('merge', file=filename):
+            return {**jp_data, **gl_data}
 
     def _load_skill_names(self):
-        jp_names = self._load_json('jp', 'skillnames.json')
-        gl_names = self._load_json('global', 'skillnames.json')
+        jp_names, gl_names = self._load_pair('skillnames.json')
         
-        merged = {}
-        all_ids = set(jp_names.keys()) | set(gl_names.keys())
-
-        for skill_id in all_ids:
-            jp_name = jp_names.get(skill_id, ["", ""])[0]
-            gl_name = gl_names.get(skill_id, ["", ""])[1]
-            merged[skill_id] = [jp_name, gl_name or jp_name] # Fallback EN to JP
+        with phase('merge', file='skillnames.json'):
+            merged = {}
+            all_ids = set(jp_names.keys()) | set(gl_names.keys())
+
+            for skill_id in all_ids:
+                jp_name = jp_names.get(skill_id, ["", ""])[0]
+                gl_name = gl_names.get(skill_id, ["", ""])[1]
+                merged[skill_id] = [jp_name, gl_name or jp_name] # Fallback EN to JP
         return merged
 
 # --- Search Functions ---
@@ -153,28 +219,36 @@ def main():
     
     uma_parser = subparsers.add_parser("uma", help="Search for an uma by name.")
     uma_parser.add_argument("name", help="The name of the uma to search for.")
+    parser.add_argument("--no-snapshots", action="store_true",
+                        help="Always parse the raw JSON files instead of using cached snapshots.")
+    add_instrumentation_args(parser)
 
     args = parser.parse_args()
     
-    data = GameData(RAW_DATA_DIR)
-
-    if args.command == "skill":
-        matches = find_skills_by_name(data, args.name)
-        if not matches:
-            print(f"No skills found matching '{args.name}'.")
-        else:
-            print(f"\nFound {len(matches)} skill(s) matching '{args.name}':")
-            for skill_id in matches:
-                display_skill_info(skill_id, data)
-
-    elif args.command == "uma":
-        matches = find_umas_by_name(data, args.name)
-        if not matches:
-            print(f"No umas found matching '{args.name}'.")
-        else:
-            print(f"\nFound {len(matches)} character(s) matching '{args.name}':")
-            for char_id in matches:
-                display_uma_info(char_id, data)
+    with instrumented(args, 'query_data'):
+        data = GameData(RAW_DATA_DIR, use_snapshots=not args.no_snapshots)
+
+        if args.command == "skill":
+            with phase('query', command='skill'):
+                matches = find_skills_by_name(data, args.name)
+            with phase('output'):
+                if not matches:
+                    print(f"No skills found matching '{args.name}'.")
+                else:
+                    print(f"\nFound {len(matches)} skill(s) matching '{args.name}':")
+                    for skill_id in matches:
+                        display_skill_info(skill_id, data)
+
+        elif args.command == "uma":
+            with phase('query', command='uma'):
+                matches = find_umas_by_name(data, args.name)
+            with phase('output'):
+                if not matches:
+                    print(f"No umas found matching '{args.name}'.")
+                else:
+                    print(f"\nFound {len(matches)} character(s) matching '{args.name}':")
+                    for char_id in matches:
+                        display_uma_info(char_id, data)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
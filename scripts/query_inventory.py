@@ -0,0 +1,245 @@
+import argparse
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from inventory_io import load_export, build_inventory_map, resolve_grandparent
+
+# --- Constants ---
+CATEGORIES = ('blue', 'pink', 'unique', 'white', 'lineage')
+SCOPES = ('representative', 'total')
+
+# --- Bitset Helpers ---
+# Bitsets are plain Python ints (bit i = inventory position i). AND/OR/popcount run in C
+# over the whole word array, which is what roaring bitmaps buy you in other languages.
+
+def bitset_from_positions(positions: List[int], size: int) -> int:
+    buf = bytearray((size + 7) >> 3)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, 'little')
+
+def bitset_positions(bits: int) -> List[int]:
+    """Returns the set bit positions in ascending order."""
+    binary = bin(bits)[:1:-1]
+    positions = []
+    pos = binary.find('1')
+    while pos != -1:
+        positions.append(pos)
+        pos = binary.find('1', pos + 1)
+    return positions
+
+# --- Index ---
+
+class SparkIndex:
+    """
+    An inverted index over an inventory implementing the filter semantics of
+    src/utils/filterLogic.ts. Every condition resolves to a bitset of matching
+    inventory positions, so condition groups compile into bitwise AND/OR.
+    """
+    def __init__(self, inventory: List[Dict[str, Any]]):
+        self.inventory = inventory
+        self.size = len(inventory)
+        self.all_bits = (1 << self.size) - 1
+        inventory_map = build_inventory_map(inventory)
+
+        # Positions are collected first and converted to bitsets once at the end.
+        # representative[category][value][stars] -> positions (parent's own sparks)
+        representative = {c: defaultdict(lambda: defaultdict(list)) for c in ('blue', 'pink', 'unique', 'white')}
+        # total[category][value][lineage star sum] -> positions (parent + GP1 + GP2)
+        total = {c: defaultdict(lambda: defaultdict(list)) for c in ('blue', 'pink', 'unique', 'white')}
+        lineage: Dict[str, List[int]] = defaultdict(list)
+        white_count: Dict[int, List[int]] = defaultdict(list)
+        server: Dict[str, List[int]] = defaultdict(list)
+
+        for pos, parent in enumerate(inventory):
+            server[parent.get('server', 'jp')].append(pos)
+            blue, pink = parent.get('blueSpark') or {}, parent.get('pinkSpark') or {}
+            representative['blue'][blue.get('type')][blue.get('stars', 0)].append(pos)
+            representative['pink'][pink.get('type')][pink.get('stars', 0)].append(pos)
+            for spark in parent.get('uniqueSparks') or []:
+                representative['unique'][spark['name']][spark['stars']].append(pos)
+            own_whites = set()
+            for spark in parent.get('whiteSparks') or []:
+                representative['white'][spark['name']][spark['stars']].append(pos)
+                own_whites.add(spark['name'])
+
+            # Lineage totals, mirroring getLineageStats.
+            sums = {c: defaultdict(int) for c in ('blue', 'pink', 'unique', 'white')}
+            gp_whites = []
+            all_whites = set()
+            for member in (parent,
+                           resolve_grandparent(parent.get('grandparent1'), inventory_map),
+                           resolve_grandparent(parent.get('grandparent2'), inventory_map)):
+                if not member:
+                    gp_whites.append(set())
+                    continue
+                m_blue, m_pink = member.get('blueSpark') or {}, member.get('pinkSpark') or {}
+                sums['blue'][m_blue.get('type')] += m_blue.get('stars', 0)
+                sums['pink'][m_pink.get('type')] += m_pink.get('stars', 0)
+                for spark in member.get('uniqueSparks') or []:
+                    sums['unique'][spark['name']] += spark['stars']
+                member_whites = set()
+                for spark in member.get('whiteSparks') or []:
+                    sums['white'][spark['name']] += spark['stars']
+                    member_whites.add(spark['name'])
+                all_whites |= member_whites
+                gp_whites.append(member_whites)
+            for category, values in sums.items():
+                for value, stars in values.items():
+                    total[category][value][stars].append(pos)
+            white_count[len(all_whites)].append(pos)
+            # A lineage-wide spark must be on the parent and both grandparents.
+            for name in own_whites & gp_whites[1] & gp_whites[2]:
+                lineage[name].append(pos)
+
+        def to_bits(tree):
+            return {value: {stars: bitset_from_positions(p, self.size) for stars, p in by_stars.items()}
+                    for value, by_stars in tree.items()}
+
+        self.representative = {c: to_bits(tree) for c, tree in representative.items()}
+        self.total = {c: to_bits(tree) for c, tree in total.items()}
+        self.lineage = {name: bitset_from_positions(p, self.size) for name, p in lineage.items()}
+        self.white_count = {count: bitset_from_positions(p, self.size) for count, p in white_count.items()}
+        self.server = {name: bitset_from_positions(p, self.size) for name, p in server.items()}
+        self._names: Optional[List[str]] = None
+
+    # --- Condition Evaluation ---
+
+    @staticmethod
+    def _at_least(by_stars: Optional[Dict[int, int]], stars: int) -> int:
+        bits = 0
+        for value_stars, value_bits in (by_stars or {}).items():
+            if value_stars >= stars:
+                bits |= value_bits
+        return bits
+
+    def condition_bits(self, condition: Dict[str, Any]) -> int:
+        """Evaluates one FilterCondition (see src/types/index.ts) to a bitset."""
+        category = condition.get('category')
+        value = condition.get('value')
+        stars = condition.get('stars', 0)
+        is_total = condition.get('scope') == 'total'
+
+        if category == 'lineage':
+            return self.lineage.get(value, 0) if value else self.all_bits
+        if category not in self.representative:
+            return 0
+        if category in ('unique', 'white') and not value:
+            return self.all_bits
+        if stars <= 0:
+            # `(x || 0) >= 0` always passes for totals and for parents' own unique/white
+            # sparks; blue/pink still require the representative spark type to match.
+            if is_total or category in ('unique', 'white'):
+                return self.all_bits
+        tree = self.total if is_total else self.representative
+        return self._at_least(tree[category].get(value), stars)
+
+    def search_bits(self, search_term: str) -> int:
+        if not search_term:
+            return self.all_bits
+        if self._names is None:
+            self._names = [(p.get('name') or '').lower() for p in self.inventory]
+        needle = search_term.lower()
+        return bitset_from_positions([i for i, name in enumerate(self._names) if needle in name], self.size)
+
+    def query(self, filters: Dict[str, Any], server: Optional[str] = None) -> int:
+        """
+        Evaluates a Filters object: search term, minimum lineage white spark count,
+        then condition groups (AND between groups, OR within a group).
+        """
+        bits = self.server.get(server, 0) if server else self.all_bits
+        if filters.get('searchTerm'):
+            bits &= self.search_bits(filters['searchTerm'])
+        min_white = filters.get('minWhiteSparks', 0)
+        if min_white > 0:
+            bits &= self._at_least(self.white_count, min_white)
+        for group in filters.get('conditionGroups') or []:
+            if not bits:
+                break
+            group_bits = 0
+            for condition in group:
+                group_bits |= self.condition_bits(condition)
+            bits &= group_bits
+        return bits
+
+    def parents(self, bits: int) -> List[Dict[str, Any]]:
+        return [self.inventory[pos] for pos in bitset_positions(bits)]
+
+# --- Filter Parsing ---
+
+def parse_condition(text: str) -> Dict[str, Any]:
+    """
+    Parses `[total:]category:value[>=stars]`, e.g. `white:Groundwork>=2`,
+    `total:blue:Stamina>=7` or `lineage:Groundwork`.
+    """
+    scope = 'representative'
+    if text.startswith('total:'):
+        scope, text = 'total', text[len('total:'):]
+    category, sep, rest = text.partition(':')
+    if not sep or category not in CATEGORIES:
+        raise ValueError(f"Invalid condition '{text}'. Expected one of {', '.join(CATEGORIES)} followed by ':value'.")
+    value, sep, stars = rest.rpartition('>=')
+    if not sep:
+        value, stars = rest, '1' if category != 'lineage' else '0'
+    return {'category': category, 'value': value.strip(), 'stars': int(stars), 'scope': scope}
+
+def build_filters(args) -> Dict[str, Any]:
+    if args.filters:
+        with open(args.filters, 'r', encoding='utf-8') as f:
+            filters = json.load(f)
+    else:
+        filters = {'searchTerm': '', 'conditionGroups': [], 'minWhiteSparks': 0}
+    if args.search:
+        filters['searchTerm'] = args.search
+    if args.min_white:
+        filters['minWhiteSparks'] = args.min_white
+    for group in args.group or []:
+        filters.setdefault('conditionGroups', []).append([parse_condition(c) for c in group.split('|')])
+    return filters
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Filters an exported inventory using an inverted spark index.")
+    parser.add_argument("export", type=Path, help="Exported data file (v12 JSON).")
+    parser.add_argument("--filters", type=Path, help="JSON file containing a Filters object as used by the app.")
+    parser.add_argument("-g", "--group", action="append",
+                        help="A condition group; conditions are OR'd with '|' and groups are AND'd. "
+                             "Example: -g 'white:Groundwork>=2|total:white:Groundwork>=5'")
+    parser.add_argument("--search", help="Only parents whose name contains this text.")
+    parser.add_argument("--min-white", type=int, default=0, help="Minimum distinct white sparks across the lineage.")
+    parser.add_argument("--server", choices=['jp', 'global'], help="Only parents from this server.")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of matches to print (0 for all).")
+    args = parser.parse_args()
+
+    try:
+        filters = build_filters(args)
+        data = load_export(args.export)
+
+        start = time.perf_counter()
+        index = SparkIndex(data['inventory'])
+        print(f"Indexed {index.size} parent(s) in {time.perf_counter() - start:.2f}s.")
+
+        start = time.perf_counter()
+        bits = index.query(filters, args.server)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        count = bits.bit_count()
+        print(f"\nFound {count} matching parent(s) in {elapsed_ms:.2f}ms.")
+
+        matches = index.parents(bits)
+        shown = matches if args.limit == 0 else matches[:args.limit]
+        for parent in shown:
+            print(f"  - {parent.get('name')} (id {parent.get('id')}, score {parent.get('score', 0)})")
+        if len(shown) < count:
+            print(f"  ... and {count - len(shown)} more.")
+
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+    except ValueError as e:
+        print(f"Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+import argparse
+import asyncio
+import heapq
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from affinity_calculator import AffinityCalculator
+from affinity_index import AffinityIndex
+from compact_skills import as_plain
+from query_data import GameData, find_skills_by_name, find_umas_by_name, RAW_DATA_DIR
+from inventory_io import load_export, build_inventory_map, resolve_grandparent
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+DATA_DIR = PROJECT_ROOT / 'src' / 'data'
+DEFAULT_AFFINITY_PATH = DATA_DIR / 'affinity_jp.json'
+UMA_LIST_PATH = DATA_DIR / 'uma-list.json'
+RAW_DATA_FILES = ('skill_data.json', 'skill_meta.json', 'umas.json', 'skillnames.json')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_RELOAD_INTERVAL = 2.0
+DEFAULT_TOP_K = 10
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# asyncio's default stream limit (64 KiB) already caps the length of each header line.
+MAX_HEADERS = 100
+
+AFFINITY_PARAMS = ('trainee', 'p1', 'p2', 'p1_gp1', 'p1_gp2', 'p2_gp1', 'p2_gp2')
+
+class RequestError(Exception):
+    """An error that maps directly to an HTTP error response."""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# --- Service State ---
+
+class ServiceState:
+    """
+    All data the service answers from. A state is never mutated after it is built;
+    hot reloads build a fresh one and swap the reference.
+    """
+    def __init__(self, affinity_path: Path, raw_data_dir: Path, inventory_path: Optional[Path], cache_size: int = 0):
+        self.affinity_path = affinity_path
+        self.raw_data_dir = raw_data_dir
+        self.inventory_path = inventory_path
+        self.loaded_at = time.time()
+
+        self.calculator = AffinityCalculator(affinity_path, cache_size=cache_size)
+        self.affinity_index = AffinityIndex.load(affinity_path, self.calculator)
+        self.game_data = GameData(raw_data_dir, compact_skills=True)
+        self.game_data.preload()
+        with open(UMA_LIST_PATH, 'r', encoding='utf-8') as f:
+            self.outfit_to_chara = {u['id']: int(u['characterId']) for u in json.load(f)}
+
+        self.inventory: List[Dict[str, Any]] = []
+        self.inventory_map: Dict[int, Dict[str, Any]] = {}
+        if inventory_path:
+            self.inventory = load_export(inventory_path)['inventory']
+            self.inventory_map = build_inventory_map(self.inventory)
+
+        self.source_mtimes = snapshot_mtimes(watched_paths(affinity_path, raw_data_dir, inventory_path))
+
+    def chara_id_of(self, entity: Optional[Dict[str, Any]]) -> int:
+        if not entity:
+            return 0
+        return self.outfit_to_chara.get(str(entity.get('umaId')), 0)
+
+def watched_paths(affinity_path: Path, raw_data_dir: Path, inventory_path: Optional[Path]) -> List[Path]:
+    paths = [affinity_path, UMA_LIST_PATH]
+    paths += [raw_data_dir / version / name for version in ('jp', 'global') for name in RAW_DATA_FILES]
+    if inventory_path:
+        paths.append(inventory_path)
+    return paths
+
+def snapshot_mtimes(paths: List[Path]) -> Dict[Path, Optional[int]]:
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtimes[path] = None
+    return mtimes
+
+# --- Handlers ---
+
+def _int_param(params: Dict[str, List[str]], name: str, default: int = 0) -> int:
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise RequestError(400, f"Parameter '{name}' must be an integer.")
+
+def _affinity_args(source: Dict[str, Any]) -> Tuple[int, ...]:
+    try:
+        return tuple(int(source.get(name) or 0) for name in AFFINITY_PARAMS)
+    except (TypeError, ValueError):
+        raise RequestError(400, f"Affinity parameters ({', '.join(AFFINITY_PARAMS)}) must be integers.")
+
+def handle_affinity(state: ServiceState, params, body) -> Dict[str, Any]:
+    trainee, p1, p2, p1_gp1, p1_gp2, p2_gp1, p2_gp2 = _affinity_args({k: v[0] for k, v in params.items()})
+    if not (trainee and p1 and p2):
+        raise RequestError(400, "trainee, p1 and p2 are required.")
+    return state.calculator.calculate_total_affinity(trainee, p1, p1_gp1, p1_gp2, p2, p2_gp1, p2_gp2)
+
+def handle_affinity_score(state: ServiceState, params, body) -> Dict[str, Any]:
+    try:
+        ids = [int(i) for i in ','.join(params.get('ids', [])).split(',') if i]
+    except ValueError:
+        raise RequestError(400, "ids must be a comma-separated list of character IDs.")
+    return {'ids': ids, 'score': state.calculator.score(*ids)}
+
+def handle_affinity_batch(state: ServiceState, params, body) -> Dict[str, Any]:
+    items = (body or {}).get('items')
+    if not isinstance(items, list):
+        raise RequestError(400, "Request body must be a JSON object with an 'items' array.")
+    calculate = state.calculator.calculate_total_affinity
+    results = []
+    for item in items:
+        trainee, p1, p2, p1_gp1, p1_gp2, p2_gp1, p2_gp2 = _affinity_args(item)
+        results.append(calculate(trainee, p1, p1_gp1, p1_gp2, p2, p2_gp1, p2_gp2)['scores'])
+    return {'results': results}
+
+def handle_affinity_neighbors(state: ServiceState, params, body) -> Dict[str, Any]:
+    """
+    Top-k answers from the precomputed index: the best parents for a trainee, the best
+    grandparents under a given parent, or (with slots=1) the best whole parent slots.
+    """
+    trainee = _int_param(params, 'trainee')
+    if trainee not in state.affinity_index.position:
+        raise RequestError(404 if trainee else 400, f"Unknown trainee {trainee}." if trainee else "trainee is required.")
+    parent = _int_param(params, 'parent')
+    k = _int_param(params, 'k', DEFAULT_TOP_K)
+    try:
+        exclude = {int(i) for i in ','.join(params.get('exclude', [])).split(',') if i}
+    except ValueError:
+        raise RequestError(400, "exclude must be a comma-separated list of character IDs.")
+
+    index = state.affinity_index
+    if _int_param(params, 'slots'):
+        slots = index.top_slots(trainee, k, exclude)
+        for slot in slots:
+            slot['grandparents'] = [{'id': cid, 'score': score} for cid, score in slot['grandparents']]
+        return {'trainee': trainee, 'slots': slots}
+    if parent:
+        rows = index.top_grandparents(trainee, parent, k, exclude)
+        return {'trainee': trainee, 'parent': parent,
+                'grandparents': [{'id': cid, 'score': score} for cid, score in rows]}
+    return {'trainee': trainee, 'parents': [{'id': cid, 'score': score}
+                                            for cid, score in index.top_partners(trainee, k, exclude)]}
+
+def _skill_record(state: ServiceState, skill_id: str) -> Dict[str, Any]:
+    data = state.game_data
+    return {
+        'id': skill_id,
+        'names': data.skill_names.get(skill_id),
+        'meta': data.skill_meta.get(skill_id),
+        'data': as_plain(data.skill_data.get(skill_id)),
+    }
+
+def handle_skill_search(state: ServiceState, params, body) -> Dict[str, Any]:
+    name = (params.get('name') or [''])[0]
+    if not name:
+        raise RequestError(400, "Parameter 'name' is required.")
+    matches = find_skills_by_name(state.game_data, name)
+    return {'matches': [{'id': sid, 'names': state.game_data.skill_names.get(sid)} for sid in matches]}
+
+def handle_skill(state: ServiceState, params, body, skill_id: str) -> Dict[str, Any]:
+    record = _skill_record(state, skill_id)
+    if not any((record['names'], record['meta'], record['data'])):
+        raise RequestError(404, f"Skill {skill_id} not found.")
+    return record
+
+def handle_uma_search(state: ServiceState, params, body) -> Dict[str, Any]:
+    name = (params.get('name') or [''])[0]
+    if not name:
+        raise RequestError(400, "Parameter 'name' is required.")
+    matches = find_umas_by_name(state.game_data, name)
+    return {'matches': [{'id': cid, 'name': state.game_data.umas[cid].get('name')} for cid in matches]}
+
+def handle_uma(state: ServiceState, params, body, char_id: str) -> Dict[str, Any]:
+    uma = state.game_data.umas.get(char_id)
+    if not uma:
+        raise RequestError(404, f"Character {char_id} not found.")
+    return {'id': char_id, **uma}
+
+def handle_top_pairs(state: ServiceState, params, body) -> Dict[str, Any]:
+    """
+    Ranks parent pairs from the loaded inventory like the roster worker's Top Breeding Pair:
+    owned x owned or owned x borrowed, skipping pairs of the same character. Pairs are
+    sorted by average parent score, or by total affinity when a trainee is given.
+    """
+    if not state.inventory:
+        raise RequestError(409, "No inventory loaded; start the service with --inventory.")
+    pair_type = (params.get('type') or ['owned'])[0]
+    if pair_type not in ('owned', 'borrowed'):
+        raise RequestError(400, "type must be 'owned' or 'borrowed'.")
+    server = (params.get('server') or [None])[0]
+    limit = _int_param(params, 'limit', DEFAULT_TOP_K)
+    trainee = _int_param(params, 'trainee')
+
+    pool = [p for p in state.inventory if server is None or p.get('server') == server]
+    owned = [p for p in pool if not p.get('isBorrowed')]
+    partners = owned if pair_type == 'owned' else [p for p in pool if p.get('isBorrowed')]
+
+    def lineage(parent):
+        return (state.chara_id_of(parent),
+                state.chara_id_of(resolve_grandparent(parent.get('grandparent1'), state.inventory_map)),
+                state.chara_id_of(resolve_grandparent(parent.get('grandparent2'), state.inventory_map)))
+    lineages = {id(p): lineage(p) for p in owned + partners}
+
+    def candidates():
+        for i, p1 in enumerate(owned):
+            others = owned[i + 1:] if pair_type == 'owned' else partners
+            c1 = lineages[id(p1)]
+            for p2 in others:
+                c2 = lineages[id(p2)]
+                if c1[0] == c2[0]:
+                    continue
+                avg_score = (p1.get('score', 0) + p2.get('score', 0)) / 2
+                affinity = 0
+                if trainee:
+                    affinity = state.calculator.calculate_total_affinity(
+                        trainee, c1[0], c1[1], c1[2], c2[0], c2[1], c2[2])['scores']['total']
+                key = (affinity, avg_score) if trainee else (avg_score,)
+                yield key, p1, p2, avg_score, affinity
+
+    top = heapq.nlargest(limit, candidates(), key=lambda c: c[0])
+    return {'pairs': [
+        {'p1': {'id': p1.get('id'), 'name': p1.get('name')},
+         'p2': {'id': p2.get('id'), 'name': p2.get('name')},
+         'avgFinalScore': avg_score, 'affinity': affinity if trainee else None}
+        for _, p1, p2, avg_score, affinity in top
+    ]}
+
+def handle_stats(state: ServiceState, params, body) -> Dict[str, Any]:
+    return {'affinity_cache': state.calculator.cache_stats()}
+
+def handle_health(state: ServiceState, params, body) -> Dict[str, Any]:
+    return {
+        'status': 'ok',
+        'loaded_at': state.loaded_at,
+        'characters': len(state.calculator.chara_map),
+        'skills': len(state.game_data.skill_names),
+        'inventory': len(state.inventory),
+    }
+
+# Exact routes, then prefix routes whose remaining path segment is passed to the handler.
+ROUTES = {
+    ('GET', '/health'): handle_health,
+    ('GET', '/stats'): handle_stats,
+    ('GET', '/affinity'): handle_affinity,
+    ('GET', '/affinity/score'): handle_affinity_score,
+    ('POST', '/affinity/batch'): handle_affinity_batch,
+    ('GET', '/affinity/neighbors'): handle_affinity_neighbors,
+    ('GET', '/skills'): handle_skill_search,
+    ('GET', '/umas'): handle_uma_search,
+    ('GET', '/top-pairs'): handle_top_pairs,
+}
+PREFIX_ROUTES = {
+    ('GET', '/skills/'): handle_skill,
+    ('GET', '/umas/'): handle_uma,
+}
+# Handlers that may iterate over the whole inventory run off the event loop.
+SLOW_HANDLERS = {handle_top_pairs, handle_affinity_batch}
+
+# --- HTTP Server ---
+
+class QueryService:
+    """A minimal keep-alive HTTP/1.1 JSON server on top of asyncio streams."""
+    def __init__(self, affinity_path: Path, raw_data_dir: Path, inventory_path: Optional[Path],
+                 reload_interval: float, cache_size: int = 0):
+        self.affinity_path = affinity_path
+        self.raw_data_dir = raw_data_dir
+        self.inventory_path = inventory_path
+        self.reload_interval = reload_interval
+        self.cache_size = cache_size
+        self.state = ServiceState(affinity_path, raw_data_dir, inventory_path, cache_size)
+
+    async def watch_sources(self):
+        """Polls source file mtimes and swaps in a freshly built state when any change."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            current = snapshot_mtimes(list(self.state.source_mtimes))
+            if current == self.state.source_mtimes:
+                continue
+            changed = [str(p) for p, m in current.items() if self.state.source_mtimes.get(p) != m]
+            print(f"Detected changes in {', '.join(changed)}; reloading...")
+            try:
+                self.state = await loop.run_in_executor(
+                    None, ServiceState, self.affinity_path, self.raw_data_dir, self.inventory_path, self.cache_size)
+                print("Reload complete.")
+            except Exception as e:
+                # Keep serving the previous state, but don't retry until the files change again.
+                self.state.source_mtimes = current
+                print(f"Reload failed, keeping previous data: {e}")
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        handler, extra = ROUTES.get((method, url.path)), ()
+        if handler is None:
+            for (route_method, prefix), prefix_handler in PREFIX_ROUTES.items():
+                if method == route_method and url.path.startswith(prefix) and len(url.path) > len(prefix):
+                    handler, extra = prefix_handler, (url.path[len(prefix):],)
+                    break
+        if handler is None:
+            return 404, {'error': f"No route for {method} {url.path}"}
+
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            return 400, {'error': "Request body is not valid JSON."}
+
+        state = self.state
+        try:
+            if handler in SLOW_HANDLERS:
+                result = await asyncio.get_running_loop().run_in_executor(None, handler, state, params, payload, *extra)
+            else:
+                result = handler(state, params, payload, *extra)
+            return 200, result
+        except RequestError as e:
+            return e.status, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f"An unexpected error occurred: {e}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                    if not request_line:
+                        break
+                    headers = await self._read_headers(reader)
+                except ValueError:
+                    # readline raises this when a line exceeds the stream limit.
+                    await self._respond(writer, 431, {'error': 'Request line or header too long.'}, keep_alive=False)
+                    break
+                except RequestError as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Malformed request line.'}, keep_alive=False)
+                    break
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': 'Invalid Content-Length header.'}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': 'Request body too large.'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                status, payload = await self.dispatch(method.upper(), target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+        headers = {}
+        for _ in range(MAX_HEADERS + 1):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        raise RequestError(431, f"More than {MAX_HEADERS} request headers.")
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 409: 'Conflict',
+                  413: 'Payload Too Large', 431: 'Request Header Fields Too Large',
+                  500: 'Internal Server Error'}.get(status, '')
+        head = (
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port} (reload check every {self.reload_interval}s)")
+        watcher = asyncio.create_task(self.watch_sources()) if self.reload_interval > 0 else None
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if watcher:
+                watcher.cancel()
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves affinity, skill, uma and inventory queries over local HTTP/JSON.")
+    parser.add_argument("--affinity", type=Path, default=DEFAULT_AFFINITY_PATH, help="Path to the affinity components JSON file.")
+    parser.add_argument("--raw-data", type=Path, default=RAW_DATA_DIR, help="Directory containing jp/ and global/ raw data.")
+    parser.add_argument("--inventory", type=Path, help="Optional exported inventory (v12 JSON) for top-pair queries.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to bind.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument("--reload-interval", type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help="Seconds between source file checks for hot reload (0 disables).")
+    parser.add_argument("--cache-size", type=int, default=0, help="Memoize up to this many affinity scores (0 disables caching).")
+    args = parser.parse_args()
+
+    try:
+        service = QueryService(args.affinity, args.raw_data, args.inventory, args.reload_interval, args.cache_size)
+        asyncio.run(service.serve(args.host, args.port))
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+
+if __name__ == "__main__":
+    main()
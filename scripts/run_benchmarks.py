@@ -0,0 +1,373 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Tuple
+
+import affinity_calculator
+import generate_translation_file
+import query_data
+import validate_project
+
+# --- Constants ---
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+SRC_DIR = PROJECT_ROOT / 'src'
+AFFINITY_SOURCE = SRC_DIR / 'data' / 'affinity_jp.json'
+# Committed reference timings. Timings only compare within one machine, so re-record the
+# baseline (`python run_benchmarks.py --save-baseline`) on the machine that runs the gate,
+# and again whenever a change is meant to alter performance.
+DEFAULT_BASELINE_PATH = SCRIPT_DIR / 'benchmarks' / 'baseline.json'
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_REPEATS = 5
+
+# Base sizes for synthetic raw data, roughly matching the current game data.
+BASE_SKILLS = 600
+BASE_UMAS = 100
+AFFINITY_SAMPLE_SIZE = 1000
+SEED = 1234
+
+# A benchmark receives (scale, workdir) and returns the zero-argument callable to time,
+# so that data generation and loading are kept out of the measurement.
+BenchmarkFactory = Callable[[int, Path], Callable[[], Any]]
+BENCHMARKS: List[Tuple[str, BenchmarkFactory]] = []
+
+def benchmark(name: str):
+    def register(factory: BenchmarkFactory) -> BenchmarkFactory:
+        BENCHMARKS.append((name, factory))
+        return factory
+    return register
+
+# --- Synthetic Inputs ---
+
+def make_affinity_data(scale: int, workdir: Path) -> Path:
+    """Replicates the real roster `scale` times under new character IDs, sharing relation groups."""
+    path = workdir / f"affinity_{scale}x.json"
+    if path.exists():
+        return path
+    with open(AFFINITY_SOURCE, 'r', encoding='utf-8') as f:
+        source = json.load(f)
+    data = {'chara_map': {}, 'relation_points': source['relation_points'], 'chara_relations': {}}
+    for copy_index in range(scale):
+        offset = copy_index * 10000
+        for char_id, name in source['chara_map'].items():
+            data['chara_map'][str(int(char_id) + offset)] = f"{name} #{copy_index}"
+        for char_id, groups in source['chara_relations'].items():
+            data['chara_relations'][str(int(char_id) + offset)] = groups
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return path
+
+def make_raw_data(scale: int, workdir: Path) -> Path:
+    """Writes a raw_data-style tree with `scale` times the base number of skills and umas."""
+    root = workdir / f"raw_{scale}x"
+    if root.exists():
+        return root
+    rng = random.Random(SEED)
+    skill_count, uma_count = BASE_SKILLS * scale, BASE_UMAS * scale
+    for version in ('jp', 'global'):
+        version_dir = root / version
+        version_dir.mkdir(parents=True)
+        # Global only knows about a subset of the JP data, like the real servers.
+        limit = skill_count if version == 'jp' else skill_count * 2 // 3
+        names, data, meta = {}, {}, {}
+        for i in range(limit):
+            skill_id = str(200000 + i)
+            names[skill_id] = [f"スキル{i}", f"Skill {i}" if version == 'global' else ""]
+            data[skill_id] = {
+                'rarity': rng.randint(1, 3),
+                'alternatives': [{
+                    'precondition': '', 'condition': f"distance_type=={rng.randint(1, 4)}&phase>={rng.randint(0, 2)}",
+                    'baseDuration': rng.randint(10000, 60000),
+                    'effects': [{'type': rng.randint(1, 30), 'modifier': rng.randint(1000, 5000), 'target': 1}],
+                }],
+            }
+            meta[skill_id] = {'groupId': 20000 + i // 2, 'iconId': 10000 + i % 50, 'baseCost': 100 + i % 80}
+        umas = {}
+        for i in range(uma_count if version == 'jp' else uma_count * 2 // 3):
+            char_id = str(1001 + i)
+            umas[char_id] = {
+                'name': [f"ウマ娘{i}", f"Uma {i}" if version == 'global' else ""],
+                'outfits': {f"{char_id}0{v}": f"[Outfit {i}.{v}]" for v in range(1, 3)},
+            }
+        for filename, content in (('skillnames.json', names), ('skill_data.json', data),
+                                  ('skill_meta.json', meta), ('umas.json', umas)):
+            with open(version_dir / filename, 'w', encoding='utf-8') as f:
+                json.dump(content, f, ensure_ascii=False)
+        with open(version_dir / 'scenarios.json', 'w', encoding='utf-8') as f:
+            json.dump([f"シナリオ{i}" for i in range(10 * scale)], f, ensure_ascii=False)
+    return root
+
+def make_source_tree(scale: int, workdir: Path) -> Path:
+    """Copies the app's TSX/CSS sources `scale` times into a project-shaped tree."""
+    root = workdir / f"project_{scale}x"
+    if root.exists():
+        return root
+    src = root / 'src'
+    shutil.copytree(SRC_DIR / 'locales', src / 'locales')
+    shutil.copytree(SRC_DIR / 'css', src / 'css')
+    (src / 'data').mkdir(parents=True)
+    shutil.copy(SRC_DIR / 'data' / 'uma-list.json', src / 'data' / 'uma-list.json')
+    index_lines = [SRC_DIR.joinpath('index.css').read_text(encoding='utf-8')]
+    for copy_index in range(scale):
+        for source_file in list(SRC_DIR.rglob('*.tsx')) + list((SRC_DIR / 'components').rglob('*.css')):
+            relative = source_file.relative_to(SRC_DIR)
+            if copy_index:
+                relative = Path('components') / f"copy{copy_index}" / relative
+                if source_file.suffix == '.css':
+                    index_lines.append(f'@import "./{relative.as_posix()}";')
+            target = src / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(source_file, target)
+    (src / 'index.css').write_text('\n'.join(index_lines) + '\n', encoding='utf-8')
+    (root / 'public').mkdir()
+    return root
+
+@contextlib.contextmanager
+def patched(module, **values):
+    """Temporarily overrides module-level constants such as path roots."""
+    originals = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(module, name, value)
+
+# --- Benchmarks ---
+
+def _affinity_calculator(scale: int, workdir: Path) -> affinity_calculator.AffinityCalculator:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return affinity_calculator.AffinityCalculator(make_affinity_data(scale, workdir))
+
+@benchmark('affinity.score_2way')
+def bench_score_2way(scale: int, workdir: Path):
+    calc = _affinity_calculator(scale, workdir)
+    rng = random.Random(SEED)
+    ids = list(calc.chara_relations)
+    pairs = [tuple(rng.sample(ids, 2)) for _ in range(AFFINITY_SAMPLE_SIZE)]
+    score = calc.score
+    return lambda: [score(a, b) for a, b in pairs]
+
+@benchmark('affinity.score_3way')
+def bench_score_3way(scale: int, workdir: Path):
+    calc = _affinity_calculator(scale, workdir)
+    rng = random.Random(SEED)
+    ids = list(calc.chara_relations)
+    triples = [tuple(rng.sample(ids, 3)) for _ in range(AFFINITY_SAMPLE_SIZE)]
+    score = calc.score
+    return lambda: [score(a, b, c) for a, b, c in triples]
+
+@benchmark('affinity.total')
+def bench_total_affinity(scale: int, workdir: Path):
+    calc = _affinity_calculator(scale, workdir)
+    rng = random.Random(SEED)
+    ids = list(calc.chara_relations)
+    trees = [tuple(rng.sample(ids, 7)) for _ in range(AFFINITY_SAMPLE_SIZE // 10)]
+    total = calc.calculate_total_affinity
+    return lambda: [total(*tree) for tree in trees]
+
+@benchmark('query_data.load')
+def bench_game_data_load(scale: int, workdir: Path):
+    raw = make_raw_data(scale, workdir)
+    return lambda: query_data.GameData(raw, use_snapshots=False).preload()
+
+@benchmark('query_data.load_snapshot')
+def bench_game_data_load_snapshot(scale: int, workdir: Path):
+    raw = make_raw_data(scale, workdir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        query_data.GameData(raw).preload()
+    return lambda: query_data.GameData(raw).preload()
+
+@benchmark('query_data.find_skills')
+def bench_find_skills(scale: int, workdir: Path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = query_data.GameData(make_raw_data(scale, workdir))
+    return lambda: [query_data.find_skills_by_name(data, term) for term in ('skill 1', 'スキル9', 'nothing')]
+
+@benchmark('query_data.find_umas')
+def bench_find_umas(scale: int, workdir: Path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = query_data.GameData(make_raw_data(scale, workdir))
+    return lambda: [query_data.find_umas_by_name(data, term) for term in ('uma 1', 'outfit 3', 'nothing')]
+
+def _validate_paths(scale: int, workdir: Path) -> Dict[str, Path]:
+    root = make_source_tree(scale, workdir)
+    src = root / 'src'
+    return {'PROJECT_ROOT': root, 'SRC_DIR': src, 'PUBLIC_DIR': root / 'public', 'LOCALES_DIR': src / 'locales'}
+
+@benchmark('validate.tsx_checks')
+def bench_validate_tsx(scale: int, workdir: Path):
+    paths = _validate_paths(scale, workdir)
+    def run():
+        with patched(validate_project, **paths):
+            tsx_files = validate_project.find_files(paths['SRC_DIR'], '.tsx')
+            for f in tsx_files:
+                validate_project.check_inline_styles(f)
+                validate_project.check_default_export(f)
+            validate_project.check_pascalcase_filenames(tsx_files)
+            validate_project.check_console_logs(tsx_files)
+    return run
+
+@benchmark('validate.css_checks')
+def bench_validate_css(scale: int, workdir: Path):
+    paths = _validate_paths(scale, workdir)
+    def run():
+        with patched(validate_project, **paths):
+            css_files = validate_project.find_files(paths['SRC_DIR'], '.css')
+            for f in css_files:
+                validate_project.check_id_selectors(f)
+                validate_project.check_hardcoded_colors(f)
+                validate_project.check_bem_syntax(f)
+            validate_project.check_css_imports(css_files)
+    return run
+
+@benchmark('validate.project_checks')
+def bench_validate_project(scale: int, workdir: Path):
+    paths = _validate_paths(scale, workdir)
+    def run():
+        with patched(validate_project, **paths):
+            tsx_files = validate_project.find_files(paths['SRC_DIR'], '.tsx')
+            validate_project.check_unused_assets()
+            css_vars = validate_project.parse_css_variables(paths['SRC_DIR'] / 'css' / 'main.css')
+            validate_project.check_color_contrast(css_vars)
+            validate_project.check_translations()
+            validate_project.check_source_code_keys(tsx_files)
+    return run
+
+@benchmark('generate_translation_file.main')
+def bench_generate_translations(scale: int, workdir: Path):
+    raw = make_raw_data(scale, workdir)
+    translations_dir = workdir / f"translations_{scale}x"
+    def run():
+        with patched(generate_translation_file, PROJECT_ROOT=workdir, RAW_DATA_DIR=raw,
+                     TRANSLATIONS_DIR=translations_dir, FACTOR_MAP_PATH=raw / 'factor-map.json'), \
+                patched(sys, argv=['generate_translation_file.py']):
+            generate_translation_file.main()
+    return run
+
+# --- Measurement ---
+
+def measure(fn: Callable[[], Any], min_time: float, repeats: int) -> Dict[str, Any]:
+    """
+    Times `fn` like timeit: calibrates a loop count so each repeat runs for at least
+    `min_time / repeats` seconds, then reports the best per-call time across repeats.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()  # Warm-up (also creates any on-disk state the first call produces)
+        loops = 1
+        target = min_time / repeats
+        while True:
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            elapsed = time.perf_counter() - start
+            if elapsed >= target:
+                break
+            loops *= 2 if elapsed == 0 else max(2, min(10, int(target / elapsed) + 1))
+        timings = [elapsed / loops]
+        for _ in range(repeats - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            timings.append((time.perf_counter() - start) / loops)
+    timings.sort()
+    return {'best': timings[0], 'median': timings[len(timings) // 2], 'loops': loops}
+
+def environment() -> Dict[str, str]:
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'machine': platform.machine()}
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get('results', {}).get(key)
+        if not previous:
+            continue
+        ratio = result['best'] / previous['best'] if previous['best'] else 1.0
+        result['vs_baseline'] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(f"{key}: {previous['best'] * 1000:.3f}ms -> {result['best'] * 1000:.3f}ms ({ratio:.2f}x)")
+    return regressions
+
+# --- Main CLI Logic ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the scripts' hot paths on synthetic scaled inputs.")
+    parser.add_argument("--scales", default=','.join(map(str, DEFAULT_SCALES)), help="Comma-separated data scale factors.")
+    parser.add_argument("--filter", default='', help="Only run benchmarks whose name contains this text.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE_PATH, help="Baseline JSON file to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's results as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown before failing (0.25 = 25%%).")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="Minimum seconds spent timing each benchmark.")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Number of timed repeats per benchmark.")
+    parser.add_argument("--output", type=Path, help="Also write this run's results to a JSON file.")
+    parser.add_argument("--workdir", type=Path, help="Keep generated inputs in this directory instead of a temp dir.")
+    args = parser.parse_args()
+
+    try:
+        scales = [int(s) for s in args.scales.split(',') if s]
+    except ValueError:
+        parser.error("--scales must be a comma-separated list of integers.")
+
+    baseline = {}
+    if args.baseline.exists():
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != environment():
+            print("Warning: baseline was recorded in a different environment; comparisons may be noisy.")
+
+    print("--- Running Benchmarks ---")
+    results: Dict[str, Dict[str, Any]] = {}
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or Path(stack.enter_context(tempfile.TemporaryDirectory(prefix='uma-bench-')))
+        workdir.mkdir(parents=True, exist_ok=True)
+        for name, factory in BENCHMARKS:
+            if args.filter not in name:
+                continue
+            for scale in scales:
+                key = f"{name}@{scale}x"
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fn = factory(scale, workdir)
+                results[key] = measure(fn, args.min_time, args.repeats)
+                print(f"  {key:<40} {results[key]['best'] * 1000:>10.3f}ms (median {results[key]['median'] * 1000:.3f}ms)")
+
+    regressions = compare(results, baseline, args.threshold)
+    report = {'environment': environment(), 'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    if args.save_baseline:
+        # Merge so that a filtered run only replaces the entries it measured.
+        merged = {**baseline.get('results', {}), **results}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({**report, 'results': merged}, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+
+    print("\n--- Benchmark Summary ---")
+    if not baseline:
+        print("No previous baseline to compare against." +
+              ("" if args.save_baseline else " Run with --save-baseline to record one."))
+    elif regressions:
+        print(f"\033[91mFound {len(regressions)} regression(s) beyond {args.threshold:.0%}:\033[0m")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    else:
+        print(f"\033[92mNo regressions beyond {args.threshold:.0%}.\033[0m")
+
+if __name__ == "__main__":
+    main()
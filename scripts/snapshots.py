@@ -0,0 +1,96 @@
+import json
+import marshal
+import os
+import struct
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+from instrumentation import phase
+
+# --- Constants ---
+SNAPSHOT_DIRNAME = '.snapshots'
+SNAPSHOT_FORMAT = 1
+_HEADER = struct.Struct('<I')
+
+# --- JSON Decoding ---
+
+_json_decoder: Optional[Callable[[bytes], Any]] = None
+
+def decode_json(raw: bytes) -> Any:
+    """
+    Decodes JSON with orjson when it is installed, falling back to the standard library.
+    The import is deferred so warm starts that never parse JSON don't pay for it.
+    """
+    global _json_decoder
+    if _json_decoder is None:
+        try:
+            import orjson
+            _json_decoder = orjson.loads
+        except ImportError:
+            _json_decoder = json.loads
+    return _json_decoder(raw)
+
+# --- Atomic Writes ---
+
+def write_atomic(path: Path, content: bytes):
+    """
+    Writes `content` to a temporary file next to `path` and renames it into place, so
+    readers (and other processes building the same file) never see a partial write.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+# --- Snapshots ---
+# A snapshot file is a 4-byte header length, the marshalled source stamp, then the
+# marshalled data. marshal only handles builtin types but loads them several times
+# faster than JSON or pickle, and the stamp can be checked without reading the data.
+
+def snapshot_path(directory: Path, name: str) -> Path:
+    return directory / SNAPSHOT_DIRNAME / f"{name}.marshal"
+
+def source_stamp(sources: Iterable[Path]) -> Tuple:
+    """Identifies a set of source files by mtime and size; missing files count too."""
+    stamp = [SNAPSHOT_FORMAT, marshal.version]
+    for source in sources:
+        try:
+            stat = source.stat()
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def load_snapshot(path: Path, stamp: Tuple) -> Optional[Any]:
+    """Returns the snapshot's data, or None if it is missing, unreadable or stale."""
+    try:
+        with phase('load', file=f"{SNAPSHOT_DIRNAME}/{path.name}"), open(path, 'rb') as f:
+            (header_size,) = _HEADER.unpack(f.read(_HEADER.size))
+            if marshal.loads(f.read(header_size)) != stamp:
+                return None
+            return marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return None
+
+def save_snapshot(path: Path, stamp: Tuple, data: Any):
+    """Writes a snapshot atomically. Failures are ignored; snapshots are only an optimization."""
+    try:
+        header = marshal.dumps(stamp)
+        write_atomic(path, _HEADER.pack(len(header)) + header + marshal.dumps(data))
+    except (OSError, ValueError):
+        pass
+
+def cached(path: Path, sources: Iterable[Path], build: Callable[[], Any], enabled: bool = True) -> Any:
+    """Returns the snapshot at `path` if it is still valid for `sources`, otherwise builds and saves it."""
+    if not enabled:
+        return build()
+    stamp = source_stamp(sources)
+    data = load_snapshot(path, stamp)
+    if data is None:
+        data = build()
+        save_snapshot(path, stamp, data)
+    return data
@@ -0,0 +1,93 @@
+from itertools import islice
+from pathlib import Path
+
+import pytest
+
+from affinity_calculator import AffinityCalculator
+from affinity_index import AffinityIndex
+from snapshots import SNAPSHOT_DIRNAME
+
+AFFINITY_JP = Path(__file__).resolve().parents[2] / 'src' / 'data' / 'affinity_jp.json'
+
+
+@pytest.fixture(scope='module')
+def calculator():
+    return AffinityCalculator(AFFINITY_JP)
+
+
+@pytest.fixture(scope='module')
+def index(calculator):
+    return AffinityIndex.for_calculator(calculator)
+
+
+def ranked(scores):
+    """(chara_id, score) pairs ordered the way the index promises: score desc, then ID asc."""
+    return sorted(scores, key=lambda item: (-item[1], item[0]))
+
+
+def test_partner_scores_match_calculator(calculator, index):
+    n = len(index.chara_ids)
+    for trainee in index.chara_ids:
+        expected = ranked((p, calculator.score(trainee, p)) for p in index.chara_ids if p != trainee)
+        assert index.top_partners(trainee, k=n) == expected
+
+
+def test_grandparent_scores_match_calculator(calculator, index):
+    n = len(index.chara_ids)
+    for trainee in islice(index.chara_ids, 0, None, 5):
+        for parent in index.chara_ids:
+            if parent == trainee:
+                continue
+            expected = ranked((g, calculator.score(trainee, parent, g))
+                              for g in index.chara_ids if g not in (trainee, parent))
+            assert index.top_grandparents(trainee, parent, k=n) == expected
+
+
+def brute_force_slots(calculator, chara_ids, trainee, exclude=()):
+    slots = []
+    for parent in chara_ids:
+        if parent in (trainee, *exclude):
+            continue
+        grandparents = ranked((g, calculator.score(trainee, parent, g))
+                              for g in chara_ids if g not in (trainee, parent, *exclude))[:2]
+        slots.append((parent, calculator.score(trainee, parent) + sum(s for _, s in grandparents)))
+    return ranked(slots)
+
+
+def test_slots_match_brute_force(calculator, index):
+    for trainee in islice(index.chara_ids, 0, None, 7):
+        expected = brute_force_slots(calculator, index.chara_ids, trainee)[:5]
+        slots = index.top_slots(trainee, k=5)
+        assert [(s['parent'], s['total']) for s in slots] == expected
+        for slot in slots:
+            assert slot['score'] == calculator.score(trainee, slot['parent'])
+
+        exclude = {slot['parent'] for slot in slots[:2]} | {g for g, _ in slots[0]['grandparents']}
+        expected = brute_force_slots(calculator, index.chara_ids, trainee, exclude)[:5]
+        assert [(s['parent'], s['total']) for s in index.top_slots(trainee, k=5, exclude=exclude)] == expected
+
+
+def test_unknown_characters():
+    index = AffinityIndex.build({1: 5}, {10: {1}, 20: {1}})
+    assert index.top_partners(99) == []
+    assert index.top_grandparents(10, 10) == []
+    assert index.top_slots(99) == []
+
+
+def test_state_round_trip(index):
+    restored = AffinityIndex.from_state(index.to_state())
+    trainee = index.chara_ids[0]
+    assert restored.top_slots(trainee) == index.top_slots(trainee)
+
+
+def test_load_writes_no_snapshot_by_default(tmp_path):
+    data_path = tmp_path / AFFINITY_JP.name
+    data_path.write_bytes(AFFINITY_JP.read_bytes())
+    loaded = AffinityIndex.load(data_path)
+    assert not (tmp_path / SNAPSHOT_DIRNAME).exists()
+
+    AffinityIndex.load(data_path, use_snapshots=True)
+    assert (tmp_path / SNAPSHOT_DIRNAME).exists()
+    warm = AffinityIndex.load(data_path, use_snapshots=True)
+    trainee = loaded.chara_ids[0]
+    assert warm.top_slots(trainee) == loaded.top_slots(trainee)
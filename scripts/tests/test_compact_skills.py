@@ -0,0 +1,57 @@
+import marshal
+import random
+
+from compact_skills import CompactSkillData, MIN_MEMORY_RATIO, as_plain, find_mismatches, measure_memory
+
+
+def make_skill_data(count=4000, seed=1):
+    """Synthetic skill_data in the merged skill_data.json shape."""
+    rng = random.Random(seed)
+    conditions = [
+        f"distance_type=={rng.randint(1, 4)}&order_rate>{rng.randint(10, 80)}&phase=={rng.randint(0, 3)}"
+        for _ in range(1500)
+    ]
+    skill_data = {}
+    for i in range(count):
+        alternatives = []
+        for _ in range(rng.randint(1, 2)):
+            alternatives.append({
+                'precondition': rng.choice(['', rng.choice(conditions)]),
+                'condition': rng.choice(conditions),
+                'baseDuration': rng.choice([-1, 30000, 50000]),
+                'baseCooldown': 500000,
+                'effects': [
+                    {'type': rng.randint(1, 30), 'modifier': rng.randint(1000, 5000), 'target': 1}
+                    for _ in range(rng.randint(1, 3))
+                ],
+            })
+        skill_data[str(100000 + i * 7)] = {'rarity': rng.randint(1, 6), 'alternatives': alternatives}
+    return skill_data
+
+
+def test_lookups_match_dicts():
+    skill_data = make_skill_data()
+    # Records that don't fit the columns must still round-trip.
+    skill_data['200001'] = {'rarity': None, 'alternatives': [{'condition': 1.5}], 'extra': [1]}
+    skill_data['not-numeric'] = {'x': 1}
+    compact = CompactSkillData.from_dict(skill_data)
+
+    assert find_mismatches(skill_data, compact) == []
+    assert len(compact) == len(skill_data)
+    assert compact.get(100007)['alternatives'][0]['effects'][0]['type'] == \
+        skill_data['100007']['alternatives'][0]['effects'][0]['type']
+    assert compact.get('100008') is None
+    assert '200001' in compact and 200001 in compact
+    assert as_plain(compact['200001']) == skill_data['200001']
+
+
+def test_snapshot_round_trip():
+    skill_data = make_skill_data(200)
+    compact = CompactSkillData.from_dict(skill_data)
+    restored = CompactSkillData.from_state(marshal.loads(marshal.dumps(compact.to_state())))
+    assert find_mismatches(skill_data, restored) == []
+
+
+def test_memory_reduction():
+    dict_bytes, compact_bytes = measure_memory(make_skill_data())
+    assert dict_bytes / compact_bytes >= MIN_MEMORY_RATIO
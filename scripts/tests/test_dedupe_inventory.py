@@ -0,0 +1,120 @@
+import copy
+from pathlib import Path
+
+from dedupe_inventory import DedupIndex, merge_exports, spark_tokens, jaccard, DEFAULT_THRESHOLD
+
+
+def make_parent(parent_id, whites, **overrides):
+    parent = {
+        'id': parent_id,
+        'umaId': '100101',
+        'name': 'Special Week',
+        'gen': 1,
+        'blueSpark': {'type': 'Speed', 'stars': 3},
+        'pinkSpark': {'type': 'Turf', 'stars': 2},
+        'uniqueSparks': [{'name': 'Shooting Star', 'stars': 1}],
+        'whiteSparks': [{'name': name, 'stars': 1} for name in whites],
+        'score': 0,
+        'server': 'jp',
+        'grandparent1': None,
+        'grandparent2': None,
+    }
+    parent.update(overrides)
+    return parent
+
+
+def make_export(inventory):
+    return {'version': 12, 'activeServer': 'jp', 'inventory': inventory}
+
+
+def build_index(*exports):
+    index = DedupIndex()
+    for i, export in enumerate(exports):
+        index.add_export(Path(f'export{i}.json'), export)
+    return index
+
+
+def test_single_white_spark_difference_matches_by_default():
+    a = make_parent(1, ['Corner Recovery', 'Straightaway Adept'])
+    b = make_parent(2, ['Corner Recovery', 'Pace Strategy'])
+    # Small parents fall below the fixed cutoff on Jaccard alone.
+    assert jaccard(spark_tokens(a), spark_tokens(b)) < DEFAULT_THRESHOLD
+
+    index = build_index(make_export([a, b]))
+    assert index.near_duplicates(threshold=DEFAULT_THRESHOLD) == ([], 0)
+    [pair], _ = index.near_duplicates()
+    assert {pair['a']['id'], pair['b']['id']} == {1, 2}
+    assert sorted(pair['only_in_a'] + pair['only_in_b']) == ['white:Pace Strategy|1', 'white:Straightaway Adept|1']
+
+
+def test_added_white_spark_matches_by_default():
+    a = make_parent(1, ['Corner Recovery'])
+    b = make_parent(2, ['Corner Recovery', 'Pace Strategy'])
+    [pair], _ = build_index(make_export([a, b])).near_duplicates()
+    assert {pair['a']['id'], pair['b']['id']} == {1, 2}
+
+
+def test_two_spark_difference_does_not_match_by_default():
+    a = make_parent(1, ['Corner Recovery', 'Straightaway Adept'])
+    b = make_parent(2, ['Pace Strategy', 'Slipstream'])
+    assert build_index(make_export([a, b])).near_duplicates() == ([], 0)
+
+
+def test_merge_removes_duplicates_within_first_export():
+    first = make_parent(1, ['Corner Recovery'])
+    duplicate = make_parent(2, ['Corner Recovery'])
+    child = make_parent(3, ['Slipstream'], grandparent1=2)
+    exports = [make_export([first, duplicate, child])]
+    merged = merge_exports(build_index(*exports), exports)
+
+    assert [p['id'] for p in merged['inventory']] == [1, 3]
+    assert merged['inventory'][1]['grandparent1'] == 1
+
+
+def test_merge_across_exports_remaps_grandparents_and_ids():
+    base = make_export([make_parent(1, ['Corner Recovery'])])
+    other = make_export([
+        make_parent(7, ['Corner Recovery']),
+        make_parent(1, ['Slipstream'], grandparent1=7),
+    ])
+    exports = [base, copy.deepcopy(other)]
+    merged = merge_exports(build_index(*exports), exports)
+
+    assert [p['id'] for p in merged['inventory']] == [1, 2]
+    assert merged['inventory'][1]['grandparent1'] == 1
+    assert exports[1] == other
+
+
+def test_merge_assigns_ids_to_parents_without_one():
+    parent = make_parent(None, ['Corner Recovery'])
+    del parent['id']
+    exports = [make_export([make_parent(5, ['Slipstream']), parent])]
+    merged = merge_exports(build_index(*exports), exports)
+    assert [p['id'] for p in merged['inventory']] == [5, 6]
+
+
+def test_grandparent_ids_are_scoped_to_their_export():
+    # id 5 is a different parent in each export, so the children are not duplicates.
+    first = make_export([make_parent(5, ['Corner Recovery']), make_parent(6, ['Slipstream'], grandparent1=5)])
+    second = make_export([make_parent(5, ['Pace Strategy']), make_parent(6, ['Slipstream'], grandparent1=5)])
+    index = build_index(first, second)
+    assert index.exact_duplicates() == []
+    merged = merge_exports(index, [first, second])
+    assert len(merged['inventory']) == 4
+
+
+def test_grandparents_match_by_content_across_exports():
+    # The same lineage saved under different ids is one set of duplicates.
+    first = make_export([make_parent(5, ['Corner Recovery']), make_parent(6, ['Slipstream'], grandparent1=5)])
+    second = make_export([make_parent(9, ['Corner Recovery']), make_parent(8, ['Slipstream'], grandparent2=None,
+                                                                             grandparent1=9)])
+    index = build_index(first, second)
+    assert len(index.exact_duplicates()) == 2
+    merged = merge_exports(index, [first, second])
+    assert [p['id'] for p in merged['inventory']] == [5, 6]
+
+
+def test_grandparent_cycles_terminate():
+    exports = [make_export([make_parent(1, ['Corner Recovery'], grandparent1=2),
+                            make_parent(2, ['Slipstream'], grandparent1=1)])]
+    assert len(build_index(*exports).exact_duplicates()) == 0
@@ -0,0 +1,111 @@
+import random
+import time
+
+from import_legacy_data import APP_DATA_VERSION, ID_GENERATION_BASE, FactorTable, convert_legacy_data
+
+CATEGORIES = ['blue', 'pink', 'unique', 'white', 'race', 'scenario']
+
+
+def make_skill_list(count=400, seed=3):
+    rng = random.Random(seed)
+    skills = []
+    for i in range(count):
+        base = 1000 + i * 100
+        skills.append({
+            'name_en': f"Skill {i}",
+            'category': rng.choice(CATEGORIES),
+            'rarities': [{'factorId': base + r, 'rarity': r} for r in (1, 2, 3)],
+        })
+    return skills
+
+
+def reference_parse(factor_ids, skill_list):
+    """`createFactorMap` + `parseFactorArray` from legacyImport.worker.ts, written as plainly as the worker."""
+    factor_map = {}
+    for skill in skill_list:
+        for info in skill.get('rarities') or []:
+            factor_map[info['factorId']] = (skill['name_en'], info['rarity'], skill['category'])
+    sparks = {'blue': [], 'pink': [], 'uniqueSparks': [], 'whiteSparks': []}
+    for factor_id in factor_ids:
+        if factor_id not in factor_map:
+            continue
+        name, stars, category = factor_map[factor_id]
+        if category in ('blue', 'pink'):
+            sparks[category].append({'type': name, 'stars': stars})
+        elif category == 'unique':
+            sparks['uniqueSparks'].append({'name': name, 'stars': stars})
+        elif category == 'white':
+            sparks['whiteSparks'].append({'name': name, 'stars': stars})
+    return sparks
+
+
+def test_batched_decode_matches_worker():
+    skill_list = make_skill_list()
+    table = FactorTable(skill_list)
+    known = [info['factorId'] for skill in skill_list for info in skill['rarities']]
+    rng = random.Random(5)
+    # Unknown, negative and out-of-range IDs are dropped like misses in the worker's Map.
+    arrays = [rng.sample(known, 20) + [0, -1, 10 ** 9] for _ in range(50)] + [[]]
+
+    for ids, records in zip(arrays, table.lookup_sparks(arrays)):
+        grouped = {'blue': [], 'pink': [], 'uniqueSparks': [], 'whiteSparks': []}
+        for record in records:
+            if record is not None:
+                grouped[record[0]].append(record[1])
+        assert grouped == reference_parse(ids, skill_list)
+
+
+def test_convert_output_shape():
+    skill_list = [
+        {'name_en': 'Speed', 'category': 'blue', 'rarities': [{'factorId': 11, 'rarity': 1}, {'factorId': 13, 'rarity': 3}]},
+        {'name_en': 'Turf', 'category': 'pink', 'rarities': [{'factorId': 21, 'rarity': 2}]},
+        {'name_en': 'Groundwork', 'category': 'white', 'rarities': [{'factorId': 31, 'rarity': 1}]},
+    ]
+    uma_map = {'100101': {'id': '100101', 'base_name_en': 'Special Week', 'outfit_name_en': '[Special Dreamer]'}}
+    legacy = {'data': {'trained_chara_array': [
+        # Deliberately out of order; the worker sorts by trained_chara_id.
+        {'trained_chara_id': 9, 'card_id': 100101, 'owner_viewer_id': 0, 'factor_id_array': [11, 13, 31],
+         'succession_trained_chara_id_1': 5, 'succession_trained_chara_id_2': 0,
+         'succession_chara_array': [{'position_id': 20, 'card_id': 100101, 'factor_id_array': [21, 31]}]},
+        {'trained_chara_id': 5, 'card_id': 100101, 'factor_id_array': []},
+        {'trained_chara_id': 7, 'card_id': 999999, 'owner_viewer_id': 0},
+    ]}}
+
+    app_data, stats = convert_legacy_data(legacy, FactorTable(skill_list), uma_map)
+
+    assert app_data['version'] == APP_DATA_VERSION == 12
+    assert stats['factor_ids'] == 5
+    profile = app_data['serverData']['global']['profiles'][0]
+    assert 'roster' not in profile
+    first, second = app_data['inventory']
+    assert (first['id'], second['id']) == (ID_GENERATION_BASE, ID_GENERATION_BASE + 1)
+    # No owner_viewer_id at all: `undefined !== 0` is true in the worker.
+    assert first['isBorrowed'] is True
+    assert first['blueSpark'] == {'type': 'Speed', 'stars': 1}
+    assert second['isBorrowed'] is False
+    assert second['name'] == '[Special Dreamer] Special Week'
+    assert second['blueSpark'] == {'type': 'Speed', 'stars': 3}
+    assert second['whiteSparks'] == [{'name': 'Groundwork', 'stars': 1}]
+    assert second['grandparent1'] == ID_GENERATION_BASE
+    assert second['grandparent2'] == {
+        'umaId': '100101',
+        'blueSpark': {'type': 'Speed', 'stars': 1},
+        'pinkSpark': {'type': 'Turf', 'stars': 2},
+        'uniqueSparks': [],
+        'whiteSparks': [{'name': 'Groundwork', 'stars': 1}],
+    }
+    assert second['hash'].endswith(f"gp1:id:{ID_GENERATION_BASE};gp2:manual:100101:Speed|1:Turf|2::Groundwork|1")
+
+
+def test_decode_throughput():
+    skill_list = make_skill_list(count=2000)
+    table = FactorTable(skill_list)
+    known = [info['factorId'] for skill in skill_list for info in skill['rarities']]
+    rng = random.Random(7)
+    arrays = [[rng.choice(known) for _ in range(50)] for _ in range(20000)]
+
+    start = time.perf_counter()
+    table.lookup_sparks(arrays)
+    rate = sum(map(len, arrays)) / (time.perf_counter() - start)
+    # The target is 1M ids/s; allow headroom for slow or shared CI machines.
+    assert rate > 250_000
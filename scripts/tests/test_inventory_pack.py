@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from inventory_io import canonical_parent_string
+from inventory_pack import CODEC_ZLIB, CODEC_ZSTD, PackedInventory, _zstd, decode_export, encode_export
+
+CODECS = [CODEC_ZLIB, pytest.param(CODEC_ZSTD, marks=pytest.mark.skipif(not _zstd(), reason="zstandard not installed"))]
+
+
+def spark(key, value, stars):
+    return {key: value, 'stars': stars}
+
+
+def make_parent(parent_id, **fields):
+    parent = {
+        'id': parent_id,
+        'umaId': '100101',
+        'name': 'Special Week',
+        'gen': 1,
+        'blueSpark': spark('type', 'Speed', 3),
+        'pinkSpark': spark('type', 'Turf', 2),
+        'uniqueSparks': [spark('name', 'Shooting Star', 1)],
+        'whiteSparks': [spark('name', 'Groundwork', 2), spark('name', 'Corner Recovery', 1)],
+        'score': 120,
+        'server': 'jp',
+        'isBorrowed': False,
+        **fields,
+    }
+    parent['hash'] = canonical_parent_string(parent)
+    return parent
+
+
+MANUAL_GP = {
+    'umaId': '100201',
+    'blueSpark': spark('type', 'Stamina', 1),
+    'pinkSpark': spark('type', 'Long', 3),
+    'uniqueSparks': [],
+    'whiteSparks': [spark('name', 'スタミナキープ', 2)],
+}
+
+
+def make_export(inventory):
+    return {
+        'version': 12,
+        'activeServer': 'jp',
+        'inventory': inventory,
+        'skillPresets': [],
+        'serverData': {'jp': {'activeProfileId': 1, 'profiles': [{'id': 1, 'name': 'Main'}], 'folders': [], 'layout': [1]},
+                       'global': {'activeProfileId': None, 'profiles': [], 'folders': [], 'layout': []}},
+    }
+
+
+def make_inventory():
+    custom_hash = make_parent(5, name='Custom Hash')
+    custom_hash['hash'] = 'hash-from-an-older-app-version'
+    no_hash = make_parent(6)
+    del no_hash['hash']
+    reordered = {key: value for key, value in reversed(make_parent(7).items())}
+    return [
+        make_parent(1),
+        # Grandparents by inventory ID, by an ID not in the inventory, and as manual objects.
+        make_parent(2, grandparent1=1, grandparent2=MANUAL_GP, score=87.5, isBorrowed=True),
+        make_parent(3, grandparent1=999_999, grandparent2=None, server='global', name='サイレンススズカ'),
+        make_parent(4, grandparent1={'umaId': None, 'blueSpark': spark('type', 'Power', 2)}),
+        custom_hash,
+        no_hash,
+        reordered,
+        # Raw parents don't fit the columns and are stored as JSON.
+        make_parent(8, notes='an unknown field'),
+        make_parent(9, score=2 ** 60),
+        {'id': 'not-a-number', 'umaId': 100101},
+    ]
+
+
+def assert_identical(decoded, original):
+    # Key order is part of the round trip, so compare the serialized forms too.
+    assert decoded == original
+    assert json.dumps(decoded, ensure_ascii=False) == json.dumps(original, ensure_ascii=False)
+
+
+@pytest.mark.parametrize('codec', CODECS)
+@pytest.mark.parametrize('block_size', [1, 3, 256])
+def test_round_trip(codec, block_size):
+    data = make_export(make_inventory())
+    packed = encode_export(data, codec, block_size)
+    assert PackedInventory(packed).codec == codec
+    assert_identical(decode_export(packed), data)
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_empty_inventory(codec):
+    data = make_export([])
+    packed = encode_export(data, codec)
+    assert len(PackedInventory(packed)) == 0
+    assert_identical(decode_export(packed), data)
+
+
+def test_random_access():
+    inventory = make_inventory()
+    packed = PackedInventory(encode_export(make_export(inventory), CODEC_ZLIB, block_size=3))
+    assert len(packed) == len(inventory)
+    assert packed.parent_by_id(2) == inventory[1]
+    assert packed.parent_by_id(5)['hash'] == 'hash-from-an-older-app-version'
+    assert packed.parent_by_id(424242) is None
+    assert packed.parent_at(len(inventory) - 1) == inventory[-1]
+    with pytest.raises(IndexError):
+        packed.parent_at(len(inventory))
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        PackedInventory(b'\0' * 64)
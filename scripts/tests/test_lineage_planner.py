@@ -0,0 +1,88 @@
+import random
+from itertools import product
+
+from affinity_index import score_tables
+from lineage_planner import LineagePlanner, plan_all
+
+# Relation groups (points) and members for a hand-checkable roster of four characters.
+RELATION_POINTS = {10: 5, 20: 3, 30: 1, 40: 2}
+CHARA_RELATIONS = {1: {10, 40}, 2: {10, 20}, 3: {10, 20, 30, 40}, 4: {30}}
+
+
+def make_planner(relation_points=RELATION_POINTS, chara_relations=CHARA_RELATIONS, **options):
+    return LineagePlanner(*score_tables(relation_points, chara_relations), **options)
+
+
+def brute_force(relation_points, chara_relations, start, generations, parent=0, allowed=None, no_repeats=False):
+    """Best total over every chain, scored straight from the relation groups."""
+    def score(*ids):
+        if len(set(ids)) < len(ids):
+            return 0
+        return sum(relation_points[g] for g in set.intersection(*(chara_relations[c] for c in ids)))
+
+    candidates = sorted(allowed if allowed is not None else chara_relations)
+    best = None
+    for tail in product(candidates, repeat=generations):
+        chain = ((parent,) if parent else ()) + (start,) + tail
+        if any(a == b for a, b in zip(chain, chain[1:])) or (no_repeats and len(set(chain)) < len(chain)):
+            continue
+        total = 0
+        for i in range(len(chain) - generations, len(chain)):
+            total += score(chain[i], chain[i - 1])
+            if i >= 2:
+                total += score(chain[i], chain[i - 1], chain[i - 2])
+        best = total if best is None else max(best, total)
+    return best
+
+
+def test_hand_built_roster():
+    plan = make_planner().plan(1, 2)
+    # 1 -> 3 earns 5 + 2; 3 -> 2 with 1 as grandparent earns 5 + 3 plus the 5 shared by all three.
+    assert plan['chain'] == [1, 3, 2]
+    assert plan['total'] == 20
+    assert plan['steps'] == [
+        {'trainee': 3, 'parent': 1, 'grandparent': 0, 'score': 7},
+        {'trainee': 2, 'parent': 3, 'grandparent': 1, 'score': 13},
+    ]
+
+
+def test_known_parent_and_unknown_characters():
+    planner = make_planner()
+    plan = planner.plan(3, 1, parent=1)
+    assert plan['chain'] == [3, 2] and plan['steps'][0]['grandparent'] == 1
+    assert plan['total'] == brute_force(RELATION_POINTS, CHARA_RELATIONS, 3, 1, parent=1)
+    assert planner.plan(99, 2) is None
+    assert planner.plan(1, 2, parent=99) is None
+
+
+def test_plans_match_brute_force():
+    rng = random.Random(4)
+    relation_points = {g: rng.randint(1, 9) for g in range(12)}
+    chara_relations = {c: set(rng.sample(range(12), rng.randint(1, 6))) for c in range(1, 8)}
+    allowed = [1, 2, 4, 5, 7]
+
+    for options in ({}, {'no_repeats': True}, {'allowed': allowed}, {'allowed': allowed, 'no_repeats': True}):
+        # A beam as wide as the roster keeps the no-repeat search exhaustive at this size.
+        planner = make_planner(relation_points, chara_relations, beam_width=10_000, **options)
+        for start in chara_relations:
+            for generations in (1, 2, 3):
+                expected = brute_force(relation_points, chara_relations, start, generations, **options)
+                plan = planner.plan(start, generations)
+                assert (plan['total'] if plan else None) == expected, (options, start, generations)
+                if plan:
+                    assert sum(step['score'] for step in plan['steps']) == plan['total']
+
+
+def test_no_chain_satisfies_constraints():
+    planner = make_planner(allowed=[2], no_repeats=True)
+    assert planner.plan(1, 1)['chain'] == [1, 2]
+    assert planner.plan(1, 2) is None
+
+
+def test_plan_all_and_state_round_trip():
+    planner = make_planner()
+    plans = plan_all(planner, [1, 2, 3, 4], 2, jobs=1)
+    assert [plan['total'] for plan in plans] == sorted((plan['total'] for plan in plans), reverse=True)
+
+    restored = LineagePlanner.from_state(planner.to_state())
+    assert [restored.plan(plan['start'], 2) for plan in plans] == plans
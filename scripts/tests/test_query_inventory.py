@@ -0,0 +1,135 @@
+import random
+
+from inventory_io import build_inventory_map, resolve_grandparent
+from query_inventory import SparkIndex, bitset_positions, parse_condition
+
+BLUES = ['Speed', 'Stamina', 'Power']
+PINKS = ['Turf', 'Dirt', 'Mile']
+UNIQUES = ['Shooting Star', 'Red Ace', 'Victory Shot']
+WHITES = ['Groundwork', 'Corner Recovery', 'Straightaway Adept', 'Focus', 'Slipstream']
+
+
+def make_sparks(rng):
+    return {
+        'blueSpark': {'type': rng.choice(BLUES), 'stars': rng.randint(1, 3)},
+        'pinkSpark': {'type': rng.choice(PINKS), 'stars': rng.randint(1, 3)},
+        'uniqueSparks': [{'name': n, 'stars': rng.randint(1, 3)} for n in rng.sample(UNIQUES, rng.randint(0, 1))],
+        'whiteSparks': [{'name': n, 'stars': rng.randint(1, 3)} for n in rng.sample(WHITES, rng.randint(0, 4))],
+    }
+
+
+def make_inventory(count=300, seed=11):
+    rng = random.Random(seed)
+    inventory = []
+    for i in range(count):
+        parent = {'id': i + 1, 'name': rng.choice(['Special Week', 'Silence Suzuka', 'Tokai Teio']),
+                  'server': rng.choice(['jp', 'global']), **make_sparks(rng)}
+        for key in ('grandparent1', 'grandparent2'):
+            roll = rng.random()
+            if roll < 0.4:
+                # Owned grandparent; some IDs point past the inventory and resolve to nothing.
+                parent[key] = rng.randint(1, count + 20)
+            elif roll < 0.8:
+                parent[key] = {'umaId': '100101', **make_sparks(rng)}
+        inventory.append(parent)
+    return inventory
+
+
+def lineage_stats(parent, inventory_map):
+    """`getLineageStats` from src/utils/affinity.ts."""
+    stats = {'blue': {}, 'pink': {}, 'unique': {}, 'white': {}, 'whiteSkillCount': 0}
+    all_whites = set()
+    for member in (parent, resolve_grandparent(parent.get('grandparent1'), inventory_map),
+                   resolve_grandparent(parent.get('grandparent2'), inventory_map)):
+        if not member:
+            continue
+        for category, key in (('blue', 'blueSpark'), ('pink', 'pinkSpark')):
+            spark = member[key]
+            stats[category][spark['type']] = stats[category].get(spark['type'], 0) + spark['stars']
+        for category, key in (('unique', 'uniqueSparks'), ('white', 'whiteSparks')):
+            for spark in member[key]:
+                stats[category][spark['name']] = stats[category].get(spark['name'], 0) + spark['stars']
+        all_whites.update(s['name'] for s in member['whiteSparks'])
+    stats['whiteSkillCount'] = len(all_whites)
+    return stats
+
+
+def evaluate_condition(condition, parent, stats, inventory_map):
+    """`evaluateCondition` from src/utils/filterLogic.ts."""
+    category, value, stars = condition['category'], condition['value'], condition['stars']
+    if category in ('blue', 'pink', 'unique', 'white') and condition['scope'] == 'total':
+        if category in ('unique', 'white') and not value:
+            return True
+        return stats[category].get(value, 0) >= stars
+    if category in ('blue', 'pink'):
+        spark = parent[f"{category}Spark"]
+        return spark['type'] == value and spark['stars'] >= stars
+    if category in ('unique', 'white'):
+        if not value:
+            return True
+        spark = next((s for s in parent[f"{category}Sparks"] if s['name'] == value), None)
+        return (spark['stars'] if spark else 0) >= stars
+    if category == 'lineage':
+        if not value:
+            return True
+        members = (parent, resolve_grandparent(parent.get('grandparent1'), inventory_map),
+                   resolve_grandparent(parent.get('grandparent2'), inventory_map))
+        return all(m and any(s['name'] == value for s in m['whiteSparks']) for m in members)
+    return False
+
+
+def check_parent(parent, filters, inventory_map):
+    """`checkParent` from src/utils/filterLogic.ts, with the parent's name as its display name."""
+    if filters['searchTerm'] and filters['searchTerm'].lower() not in parent['name'].lower():
+        return False
+    stats = lineage_stats(parent, inventory_map)
+    if filters['minWhiteSparks'] > 0 and stats['whiteSkillCount'] < filters['minWhiteSparks']:
+        return False
+    return all(any(evaluate_condition(c, parent, stats, inventory_map) for c in group)
+               for group in filters['conditionGroups'])
+
+
+def random_condition(rng):
+    category = rng.choice(['blue', 'pink', 'unique', 'white', 'lineage', 'unknown'])
+    values = {'blue': BLUES, 'pink': PINKS, 'unique': UNIQUES}.get(category, WHITES)
+    scope = rng.choice(['representative', 'total'])
+    return {
+        'category': category,
+        'value': rng.choice(values + ['']),
+        'stars': rng.randint(0, 9 if scope == 'total' else 3),
+        'scope': scope,
+    }
+
+
+def test_queries_match_filter_logic():
+    inventory = make_inventory()
+    inventory_map = build_inventory_map(inventory)
+    index = SparkIndex(inventory)
+    rng = random.Random(21)
+
+    for _ in range(400):
+        filters = {
+            'searchTerm': rng.choice(['', '', 'week', 'SUZUKA', 'nobody']),
+            'minWhiteSparks': rng.choice([0, 0, 2, 4]),
+            'conditionGroups': [[random_condition(rng) for _ in range(rng.randint(1, 3))]
+                                for _ in range(rng.randint(0, 3))],
+        }
+        expected = [pos for pos, parent in enumerate(inventory) if check_parent(parent, filters, inventory_map)]
+        assert bitset_positions(index.query(filters)) == expected, filters
+
+
+def test_server_filter_and_parents():
+    inventory = make_inventory(count=50)
+    index = SparkIndex(inventory)
+    filters = {'searchTerm': '', 'minWhiteSparks': 0, 'conditionGroups': []}
+
+    matches = index.parents(index.query(filters, 'global'))
+    assert matches == [p for p in inventory if p['server'] == 'global']
+
+
+def test_parse_condition():
+    assert parse_condition('white:Groundwork>=2') == \
+        {'category': 'white', 'value': 'Groundwork', 'stars': 2, 'scope': 'representative'}
+    assert parse_condition('total:blue:Stamina>=7') == \
+        {'category': 'blue', 'value': 'Stamina', 'stars': 7, 'scope': 'total'}
+    assert parse_condition('lineage:Groundwork')['stars'] == 0
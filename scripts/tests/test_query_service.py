@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from query_service import QueryService, MAX_HEADERS
+
+AFFINITY = {
+    'chara_map': {'1001': 'Special Week', '1002': 'Silence Suzuka', '1003': 'Tokai Teio'},
+    'relation_points': {'1': 5, '2': 7},
+    'chara_relations': {'1001': [1, 2], '1002': [1, 2], '1003': [1]},
+}
+
+
+@pytest.fixture
+def service(tmp_path):
+    affinity_path = tmp_path / 'affinity.json'
+    affinity_path.write_text(json.dumps(AFFINITY), encoding='utf-8')
+    (tmp_path / 'raw').mkdir()
+    return QueryService(affinity_path, tmp_path / 'raw', None, reload_interval=0.05)
+
+
+async def send(port, raw: bytes):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(raw)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers['content-length']))
+        return status, json.loads(body)
+    finally:
+        writer.close()
+
+
+def get(path: str) -> bytes:
+    return f"GET {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n".encode('latin-1')
+
+
+def serve(service, scenario):
+    """Runs `scenario(port)` against the service listening on an ephemeral port."""
+    async def main():
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        try:
+            return await scenario(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(main())
+
+
+def test_routes(service):
+    async def scenario(port):
+        assert await send(port, get('/affinity/score?ids=1001,1002')) == (200, {'ids': [1001, 1002], 'score': 12})
+        assert (await send(port, get('/affinity/score?ids=1001,1002,1003')))[1]['score'] == 5
+        status, body = await send(port, get('/affinity?trainee=1001&p1=1002&p2=1003'))
+        assert status == 200 and body['scores']['trainee_p1'] == 12
+        assert (await send(port, get('/health')))[1]['characters'] == 3
+        assert (await send(port, get('/nope')))[0] == 404
+        assert (await send(port, get('/affinity?trainee=1001')))[0] == 400
+        assert (await send(port, get('/affinity/score?ids=x')))[0] == 400
+    serve(service, scenario)
+
+
+def test_rejects_bad_requests(service, monkeypatch):
+    monkeypatch.setattr('query_service.MAX_BODY_BYTES', 10)
+
+    async def scenario(port):
+        assert (await send(port, b"GARBAGE\r\n\r\n"))[0] == 400
+        assert (await send(port, b"POST /affinity/batch HTTP/1.1\r\nContent-Length: abc\r\n\r\n"))[0] == 400
+        assert (await send(port, b"POST /affinity/batch HTTP/1.1\r\nContent-Length: -1\r\n\r\n"))[0] == 400
+        assert (await send(port, b"POST /affinity/batch HTTP/1.1\r\nContent-Length: 11\r\n\r\n")) == \
+            (413, {'error': 'Request body too large.'})
+        long_header = b"GET /health HTTP/1.1\r\nX-Long: " + b"a" * (70 * 1024) + b"\r\n\r\n"
+        assert (await send(port, long_header))[0] == 431
+        many_headers = b"GET /health HTTP/1.1\r\n" + b"X-H: 1\r\n" * (MAX_HEADERS + 1) + b"\r\n"
+        assert (await send(port, many_headers))[0] == 431
+        body = b'{"items": 1'
+        assert (await send(port, b"POST /affinity/batch HTTP/1.1\r\nContent-Length: 10\r\n\r\n" + body[:10]))[0] == 400
+    serve(service, scenario)
+
+
+def test_hot_reload(service):
+    async def scenario(port):
+        watcher = asyncio.create_task(service.watch_sources())
+        try:
+            changed = {**AFFINITY, 'relation_points': {'1': 50, '2': 7}}
+            service.affinity_path.write_text(json.dumps(changed), encoding='utf-8')
+            stat = service.affinity_path.stat()
+            os.utime(service.affinity_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            for _ in range(200):
+                body = (await send(port, get('/affinity/score?ids=1001,1002')))[1]
+                if body['score'] == 57:
+                    return
+                await asyncio.sleep(0.05)
+            pytest.fail(f"service never reloaded, last response {body}")
+        finally:
+            watcher.cancel()
+    serve(service, scenario)
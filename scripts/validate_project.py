@@ -4,6 +4,8 @@ import json
 from pathlib import Path
 from typing import List, Tuple, Set, Dict, Any
 
+from instrumentation import phase, add_instrumentation_args, instrumented
+
 # --- Constants ---
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
@@ -310,27 +312,26 @@ def check_source_code_keys(tsx_files: List[Path]) -> List[str]:
     return sorted(list(missing_keys))
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Validates project files against the style guide conventions.")
-    parser.add_argument("-v", "--verbose", action="store_true", help="Print detailed information for each violation.")
-    args = parser.parse_args()
-
+def run_checks(args) -> int:
+    """Runs every check group, printing results as it goes, and returns the total violation count."""
     print("--- Starting Project Validation ---")
     total_errors = 0
-    tsx_files = find_files(SRC_DIR, '.tsx')
-    css_files = find_files(SRC_DIR, '.css')
+    with phase('load', files='src'):
+        tsx_files = find_files(SRC_DIR, '.tsx')
+        css_files = find_files(SRC_DIR, '.css')
 
     # --- Group 1: TSX/React Checks ---
     print("\n Checking TSX/React files...")
-    inline_style_violations = {f: check_inline_styles(f) for f in tsx_files}
-    pascal_case_violations = check_pascalcase_filenames(tsx_files)
-    console_log_violations = check_console_logs(tsx_files)
-    component_files = [f for f in tsx_files if 'components' in str(f) and f.name != 'App.tsx']
-    missing_export_violations = [f for f in component_files if not check_default_export(f)]
-    inline_style_errors = sum(len(v) for v in inline_style_violations.values())
-    pascal_case_errors = len(pascal_case_violations)
-    console_log_errors = len(console_log_violations)
-    missing_export_errors = len(missing_export_violations)
+    with phase('tsx checks'):
+        inline_style_violations = {f: check_inline_styles(f) for f in tsx_files}
+        pascal_case_violations = check_pascalcase_filenames(tsx_files)
+        console_log_violations = check_console_logs(tsx_files)
+        component_files = [f for f in tsx_files if 'components' in str(f) and f.name != 'App.tsx']
+        missing_export_violations = [f for f in component_files if not check_default_export(f)]
+        inline_style_errors = sum(len(v) for v in inline_style_violations.values())
+        pascal_case_errors = len(pascal_case_violations)
+        console_log_errors = len(console_log_violations)
+        missing_export_errors = len(missing_export_violations)
     if inline_style_errors == 0: print("  \033[92mPASS:\033[0m No forbidden inline styles found.")
     else:
         print(f"  \033[91mFAIL:\033[0m Found {inline_style_errors} instance(s) of inline styles.")
@@ -358,14 +359,15 @@ def main():
 
     # --- Group 2: CSS Checks ---
     print("\n Checking CSS files...")
-    id_selector_violations = {f: check_id_selectors(f) for f in css_files}
-    hardcoded_color_violations = {f: check_hardcoded_colors(f) for f in css_files}
-    bem_syntax_violations = {f: check_bem_syntax(f) for f in css_files}
-    unimported_css_violations = check_css_imports(css_files)
-    id_selector_errors = sum(len(v) for v in id_selector_violations.values())
-    hardcoded_color_errors = sum(len(v) for v in hardcoded_color_violations.values())
-    bem_syntax_errors = sum(len(v) for v in bem_syntax_violations.values())
-    unimported_css_errors = len(unimported_css_violations)
+    with phase('css checks'):
+        id_selector_violations = {f: check_id_selectors(f) for f in css_files}
+        hardcoded_color_violations = {f: check_hardcoded_colors(f) for f in css_files}
+        bem_syntax_violations = {f: check_bem_syntax(f) for f in css_files}
+        unimported_css_violations = check_css_imports(css_files)
+        id_selector_errors = sum(len(v) for v in id_selector_violations.values())
+        hardcoded_color_errors = sum(len(v) for v in hardcoded_color_violations.values())
+        bem_syntax_errors = sum(len(v) for v in bem_syntax_violations.values())
+        unimported_css_errors = len(unimported_css_violations)
     if id_selector_errors == 0: print("  \033[92mPASS:\033[0m No ID selectors found.")
     else:
         print(f"  \033[91mFAIL:\033[0m Found {id_selector_errors} ID selector(s).")
@@ -399,8 +401,9 @@ def main():
 
     # --- Group 3: Project Health ---
     print("\n Checking project health...")
-    unused_asset_violations = check_unused_assets()
-    unused_asset_errors = len(unused_asset_violations)
+    with phase('project checks'):
+        unused_asset_violations = check_unused_assets()
+        unused_asset_errors = len(unused_asset_violations)
     if unused_asset_errors == 0: print("  \033[92mPASS:\033[0m No unused image assets found.")
     else:
         print(f"  \033[91mFAIL:\033[0m Found {unused_asset_errors} unused image asset(s).")
@@ -410,9 +413,10 @@ def main():
 
     # --- Group 4: Accessibility Checks ---
     print("\n Checking Accessibility...")
-    css_vars = parse_css_variables(SRC_DIR / 'css' / 'main.css')
-    contrast_violations = check_color_contrast(css_vars)
-    contrast_errors = len(contrast_violations)
+    with phase('accessibility checks'):
+        css_vars = parse_css_variables(SRC_DIR / 'css' / 'main.css')
+        contrast_violations = check_color_contrast(css_vars)
+        contrast_errors = len(contrast_violations)
     if contrast_errors == 0:
         print(f"  \033[92mPASS:\033[0m All color pairs meet WCAG AA contrast ratio ({WCAG_AA_RATIO}:1).")
     else:
@@ -424,8 +428,9 @@ def main():
 
     # --- Group 5: Localization Checks ---
     print("\n Checking Localization files...")
-    translation_violations = check_translations()
-    translation_errors = len(translation_violations)
+    with phase('localization checks'):
+        translation_violations = check_translations()
+        translation_errors = len(translation_violations)
     if translation_errors == 0:
         print("  \033[92mPASS:\033[0m All translation keys are consistent across languages.")
     else:
@@ -435,8 +440,9 @@ def main():
                 print(f"    - {violation}")
     total_errors += translation_errors
     
-    source_key_violations = check_source_code_keys(tsx_files)
-    source_key_errors = len(source_key_violations)
+    with phase('source key checks'):
+        source_key_violations = check_source_code_keys(tsx_files)
+        source_key_errors = len(source_key_violations)
     if source_key_errors == 0:
         print("  \033[92mPASS:\033[0m All translation keys used in source code are defined.")
     else:
@@ -445,7 +451,16 @@ def main():
             for key in source_key_violations:
                 print(f"    - Missing key definition for: '{key}'")
     total_errors += source_key_errors
+    return total_errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Validates project files against the style guide conventions.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print detailed information for each violation.")
+    add_instrumentation_args(parser)
+    args = parser.parse_args()
 
+    with instrumented(args, 'validate_project'):
+        total_errors = run_checks(args)
 
     # --- Summary ---
     print("\n--- Validation Summary ---")